@@ -0,0 +1,335 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Times the stages of the shader pipeline separately on synthetic glTF assets
+and writes the results as JSON.
+'''
+
+import argparse, contextlib, io, json, os, platform, random, sys, tempfile
+import statistics, time
+from collections import defaultdict
+from pathlib import Path
+
+benchmarks_dir_path = Path(__file__).parent
+repo_root_dir_path = benchmarks_dir_path.parent
+
+# Add these directories to PYTHONPATH
+src_dir_path = (repo_root_dir_path / 'src').resolve()
+metashade_dir_path = (repo_root_dir_path / 'metashade').resolve()
+sys.path += [str(src_dir_path), str(metashade_dir_path)]
+
+from pygltflib import GLTF2
+
+from metashade.hlsl.util import dxc
+from metashade.glsl.util import glslang
+from metashade.util import spirv_cross
+
+import generate, _gltf_metadata
+from _impl.options import Options
+from _impl.vertex_data import VertexData
+import _impl.ps as impl_ps
+
+_materials_per_asset = 10
+
+def _make_synthetic_asset(rng : random.Random, num_materials : int) -> dict:
+    '''
+    Creates a glTF asset with one single-primitive mesh per material and
+    random combinations of material textures, UV sets, vertex attributes and
+    alpha modes.
+    '''
+    materials = []
+    meshes = []
+
+    for material_idx in range(num_materials):
+        uv_set_indices = set()
+
+        def _texture_info():
+            uv_set_idx = rng.choice((0, 0, 0, 1))
+            uv_set_indices.add(uv_set_idx)
+            return {'index' : 0, 'texCoord' : uv_set_idx}
+
+        # The generated pixel shaders always sample the base color texture
+        # with the first UV set
+        pbr = {'baseColorTexture' : {'index' : 0, 'texCoord' : 0}}
+        uv_set_indices.add(0)
+        if rng.random() < 0.5:
+            pbr['metallicRoughnessTexture'] = _texture_info()
+
+        material = {'pbrMetallicRoughness' : pbr}
+        for texture_name in ('normal', 'occlusion', 'emissive'):
+            if rng.random() < 0.5:
+                material[f'{texture_name}Texture'] = _texture_info()
+
+        alpha_mode = rng.choice(('OPAQUE', 'OPAQUE', 'MASK', 'BLEND'))
+        if alpha_mode != 'OPAQUE':
+            material['alphaMode'] = alpha_mode
+        if alpha_mode == 'MASK':
+            material['alphaCutoff'] = rng.choice((0.5, 0.25, 0.75))
+        materials.append(material)
+
+        attributes = {'POSITION' : 0, 'NORMAL' : 0}
+        for uv_set_idx in sorted(uv_set_indices):
+            attributes[f'TEXCOORD_{uv_set_idx}'] = 0
+        if rng.random() < 0.5:
+            attributes['TANGENT'] = 0
+        if rng.random() < 0.25:
+            attributes['COLOR_0'] = 0
+
+        meshes.append({
+            'name' : f'mesh{material_idx}',
+            'primitives' : [
+                {'attributes' : attributes, 'material' : material_idx}
+            ]
+        })
+
+    return {
+        'asset' : {'version' : '2.0'},
+        'materials' : materials,
+        'meshes' : meshes
+    }
+
+def _write_synthetic_assets(
+    gltf_dir_path : Path,
+    num_materials : int,
+    seed : int
+):
+    rng = random.Random(seed)
+    os.makedirs(gltf_dir_path)
+    for asset_idx in range(0, num_materials, _materials_per_asset):
+        asset = _make_synthetic_asset(
+            rng, min(_materials_per_asset, num_materials - asset_idx)
+        )
+        with open(gltf_dir_path / f'asset{asset_idx}.gltf', 'w') as gltf_file:
+            json.dump(asset, gltf_file)
+
+class _StageTimer:
+    def __init__(self):
+        self._samples_ms = defaultdict(list)
+
+    @contextlib.contextmanager
+    def __call__(self, stage_name : str):
+        start_ns = time.perf_counter_ns()
+        yield
+        self._samples_ms[stage_name].append(
+            (time.perf_counter_ns() - start_ns) / 1e6
+        )
+
+    def wrap(self, get_stage_name, func):
+        '''
+        Wraps `func` so that its calls are timed as the stage named by
+        `get_stage_name(**kwargs)`
+        '''
+        def wrapper(**kwargs):
+            with self(get_stage_name(**kwargs)):
+                return func(**kwargs)
+        return wrapper
+
+    def summarize(self) -> dict:
+        return {
+            stage_name : {
+                'count' : len(samples_ms),
+                'total_ms' : sum(samples_ms),
+                'mean_ms' : statistics.mean(samples_ms),
+                'median_ms' : statistics.median(samples_ms),
+                'max_ms' : max(samples_ms)
+            }
+            for stage_name, samples_ms in self._samples_ms.items()
+        }
+
+def _stub_dxc_compile(output_path = None, **kwargs):
+    if output_path is not None:
+        Path(output_path).write_bytes(b'')
+
+def _stub_spirv_to_glsl(glsl_path, **kwargs):
+    Path(glsl_path).write_text('')
+
+def _stub_glslang_compile(output_path = None, **kwargs):
+    if output_path is not None and output_path != os.devnull:
+        Path(output_path).write_bytes(b'')
+
+@contextlib.contextmanager
+def _patch_compilers(timer : _StageTimer, stub_compilers : bool):
+    '''
+    Times the compiler invocations in `_hlsl` and `_glsl`, which call the
+    Metashade wrappers through their modules, optionally replacing the
+    compilers with stubs that just write empty outputs.
+    '''
+    patches = (
+        (dxc, 'compile', _stub_dxc_compile,
+            lambda to_spirv = False, **kwargs:
+                'dxc_spirv' if to_spirv else 'dxc_dxil'
+        ),
+        (spirv_cross, 'spirv_to_glsl', _stub_spirv_to_glsl,
+            lambda **kwargs: 'spirv_cross'
+        ),
+        (glslang, 'compile', _stub_glslang_compile,
+            lambda **kwargs: 'glslang'
+        )
+    )
+
+    originals = []
+    for module, func_name, stub_func, get_stage_name in patches:
+        func = getattr(module, func_name)
+        originals.append((module, func_name, func))
+        setattr(
+            module,
+            func_name,
+            timer.wrap(get_stage_name, stub_func if stub_compilers else func)
+        )
+    try:
+        yield
+    finally:
+        for module, func_name, func in originals:
+            setattr(module, func_name, func)
+
+def _run(
+    num_materials : int,
+    work_dir_path : Path,
+    stub_compilers : bool,
+    options : Options,
+    seed : int
+) -> dict:
+    gltf_dir_path = work_dir_path / f'gltf-{num_materials}'
+    out_dir_path = work_dir_path / f'out-{num_materials}'
+    _write_synthetic_assets(gltf_dir_path, num_materials, seed)
+    os.makedirs(out_dir_path)
+    if options.shared_include:
+        generate._hlsl.generate_shared_includes(
+            out_dir_path, ref_differ = None, options = options
+        )
+
+    timer = _StageTimer()
+    gltf_paths = sorted(gltf_dir_path.glob('*.gltf'))
+
+    for gltf_path in gltf_paths:
+        with timer('gltf_load_pygltflib'):
+            GLTF2().load(gltf_path)
+        with timer('gltf_load'):
+            _gltf_metadata.load(gltf_path)
+
+    shader_dict = dict()
+    for gltf_path in gltf_paths:
+        with timer('process_asset'):
+            asset_result = generate._process_asset(
+                gltf_file_path = gltf_path,
+                out_dir = out_dir_path,
+                options = options
+            )
+        shader_dict |= asset_result.shader_dict
+
+    # Source generation into memory, excluding the file I/O
+    for shader_desc in shader_dict.values():
+        permutation = shader_desc.permutation
+        if isinstance(permutation, VertexData.Desc):
+            with timer('generate_vs'):
+                VertexData(permutation).generate_vs(io.StringIO(), options)
+        elif isinstance(permutation, impl_ps.ps.Desc):
+            with timer('generate_ps'):
+                impl_ps.ps(permutation, options).generate(io.StringIO())
+
+    num_failed = 0
+    with _patch_compilers(timer, stub_compilers):
+        for shader_desc in shader_dict.values():
+            with timer('generate_and_compile'):
+                result = shader_desc.create(
+                    out_dir_path, options
+                ).generate_and_compile(ref_differ = None)
+            if not result.success:
+                num_failed += 1
+
+    return {
+        'num_materials' : num_materials,
+        'num_assets' : len(gltf_paths),
+        'num_shaders' : len(shader_dict),
+        'num_failed' : num_failed,
+        'stages' : timer.summarize()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = (
+            "Benchmark the stages of shader generation and compilation on "
+            "synthetic glTF assets."
+        )
+    )
+    parser.add_argument(
+        "--sizes",
+        type = int,
+        nargs = '+',
+        default = [10, 100, 1000],
+        help = "Numbers of materials in the synthetic asset sets."
+    )
+    parser.add_argument(
+        "--out",
+        help = "Path to the output JSON file. Printed to stdout if omitted."
+    )
+    parser.add_argument(
+        "--stub-compilers",
+        action = 'store_true',
+        help = "Replace dxc, spirv-cross and glslang with stubs."
+    )
+    parser.add_argument(
+        "--shared-include",
+        action = 'store_true',
+        help = "Benchmark with the shared include enabled."
+    )
+    parser.add_argument(
+        "--seed",
+        type = int,
+        default = 0,
+        help = "Random seed for the synthetic assets."
+    )
+    args = parser.parse_args()
+
+    options = Options(shared_include = args.shared_include)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir_path = Path(work_dir)
+        log = io.StringIO()
+        results = []
+        for num_materials in args.sizes:
+            # Silence the pipeline's own logging
+            log, sys.stdout = sys.stdout, log
+            try:
+                results.append(
+                    _run(
+                        num_materials = num_materials,
+                        work_dir_path = work_dir_path,
+                        stub_compilers = args.stub_compilers,
+                        options = options,
+                        seed = args.seed
+                    )
+                )
+            finally:
+                log, sys.stdout = sys.stdout, log
+
+    report = {
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'stub_compilers' : args.stub_compilers,
+        'options' : options._asdict(),
+        'results' : results
+    }
+
+    if args.out is None:
+        json.dump(report, sys.stdout, indent = 4)
+        print()
+    else:
+        with open(args.out, 'w') as out_file:
+            json.dump(report, out_file, indent = 4)
+        print(f'Benchmark results written to {args.out}')
+
+if __name__ == "__main__":
+    main()
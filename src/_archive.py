@@ -0,0 +1,191 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Packs the compiled shaders into a single archive file that the host app can
+memory-map, instead of loading thousands of loose files.
+
+The archive starts with a header, followed by the table of contents sorted by
+the shader index names, the names themselves and the blobs:
+
+    header:  magic b'MSPK', version, number of entries, alignment  (<4sIII)
+    entry:   blob offset, blob size, name offset, name size        (<QQII)
+
+All the offsets are from the start of the file, and each blob starts at a
+multiple of the alignment.
+'''
+
+import json, mmap, os, struct
+from pathlib import Path
+from typing import Collection, Dict, NamedTuple
+
+_magic = b'MSPK'
+_version = 1
+_header_format = '<4sIII'
+_entry_format = '<QQII'
+alignment = 256
+
+class Blob(NamedTuple):
+    offset : int
+    size : int
+
+def _align(offset : int) -> int:
+    return -(-offset // alignment) * alignment
+
+def write(
+    archive_path : Path,
+    blob_paths : Dict[str, Path]
+) -> Dict[str, Blob]:
+    '''
+    Packs the files keyed by their shader index names. The archive is written
+    to a temporary file first, which then replaces any previous archive, so
+    that a host app never maps a partially written one.
+    '''
+    names = sorted(blob_paths)
+    encoded_names = [name.encode() for name in names]
+
+    header_size = struct.calcsize(_header_format)
+    entry_size = struct.calcsize(_entry_format)
+    names_offset = header_size + entry_size * len(names)
+    blob_offset = _align(
+        names_offset + sum(len(encoded) for encoded in encoded_names)
+    )
+
+    blobs = dict()
+    for name in names:
+        blob_size = blob_paths[name].stat().st_size
+        blobs[name] = Blob(blob_offset, blob_size)
+        blob_offset = _align(blob_offset + blob_size)
+
+    temp_path = archive_path.with_name(archive_path.name + '.tmp')
+    with open(temp_path, 'wb') as archive_file:
+        archive_file.write(
+            struct.pack(
+                _header_format, _magic, _version, len(names), alignment
+            )
+        )
+
+        name_offset = names_offset
+        for name, encoded_name in zip(names, encoded_names):
+            archive_file.write(
+                struct.pack(
+                    _entry_format,
+                    blobs[name].offset,
+                    blobs[name].size,
+                    name_offset,
+                    len(encoded_name)
+                )
+            )
+            name_offset += len(encoded_name)
+
+        for encoded_name in encoded_names:
+            archive_file.write(encoded_name)
+
+        for name in names:
+            archive_file.seek(blobs[name].offset)
+            archive_file.write(blob_paths[name].read_bytes())
+
+        # Pad the last blob as well
+        archive_file.truncate(_align(archive_file.tell()))
+
+    os.replace(temp_path, archive_path)
+    return blobs
+
+def read_toc(archive_path : Path) -> Dict[str, Blob]:
+    '''
+    Reads the table of contents, mainly for reference and testing
+    '''
+    with open(archive_path, 'rb') as archive_file, mmap.mmap(
+        archive_file.fileno(), 0, access = mmap.ACCESS_READ
+    ) as data:
+        magic, version, num_entries, _ = struct.unpack_from(
+            _header_format, data
+        )
+        if magic != _magic or version != _version:
+            raise ValueError(f'{archive_path} is not a shader archive')
+
+        toc = dict()
+        entry_offset = struct.calcsize(_header_format)
+        for _ in range(num_entries):
+            offset, size, name_offset, name_size = struct.unpack_from(
+                _entry_format, data, entry_offset
+            )
+            name = data[name_offset : name_offset + name_size].decode()
+            toc[name] = Blob(offset, size)
+            entry_offset += struct.calcsize(_entry_format)
+        return toc
+
+def map_index(shader_index, func):
+    '''
+    Applies `func` to the shader names in a per-asset shader index, which
+    nests dictionaries of shaders per target and stage in lists of primitives
+    per mesh.
+    '''
+    if isinstance(shader_index, str):
+        return func(shader_index)
+    if isinstance(shader_index, dict):
+        return {
+            key : map_index(value, func)
+            for key, value in shader_index.items()
+        }
+    return [map_index(value, func) for value in shader_index]
+
+def pack(
+    archive_path : Path,
+    out_dir_path : Path,
+    shader_indices : Dict[str, list],
+    compiled_shader_names : Collection[str],
+    pipeline_shader_index : Dict[str, dict] = None
+) -> int:
+    '''
+    Packs all the compiled shaders referenced by the per-asset shader indices,
+    keyed by the assets, and writes a combined index next to the archive,
+    mapping each asset, mesh and primitive to the offsets and sizes of the
+    blobs. Shaders that have failed to compile are mapped to null, even if
+    an output of theirs is on disk, e.g. from a previous run or a failed
+    cross-compilation. Returns the number of packed shaders.
+
+    `pipeline_shader_index` maps the passes of the pipeline that don't
+    depend on the assets to their shaders per target and stage, and is
+    mapped to the blobs likewise in the combined index.
+    '''
+    if pipeline_shader_index is None:
+        pipeline_shader_index = dict()
+
+    blob_paths = dict()
+    def _add_blob_path(shader_name : str):
+        if shader_name in compiled_shader_names:
+            blob_paths[shader_name] = out_dir_path / shader_name
+    map_index(shader_indices, _add_blob_path)
+    map_index(pipeline_shader_index, _add_blob_path)
+
+    blobs = write(archive_path, blob_paths)
+
+    def _get_blob_dict(shader_name : str) -> dict:
+        blob = blobs.get(shader_name)
+        return None if blob is None else blob._asdict()
+
+    combined_index_path = archive_path.with_name(archive_path.name + '.json')
+    with open(combined_index_path, 'w') as combined_index_file:
+        json.dump(
+            {
+                'archive' : archive_path.name,
+                'assets' : map_index(shader_indices, _get_blob_dict),
+                'pipeline' : map_index(pipeline_shader_index, _get_blob_dict)
+            },
+            combined_index_file,
+            indent = 4
+        )
+
+    return len(blobs)
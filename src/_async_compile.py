@@ -0,0 +1,115 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Asyncio counterparts of the compiler wrappers in `metashade.hlsl.util.dxc`,
+`metashade.glsl.util.glslang` and `metashade.util.spirv_cross`, which allow a
+single process to keep all the cores busy with compiler subprocesses.
+'''
+
+import asyncio, time
+
+import _trace
+from typing import List, TextIO
+
+def dxc_args(
+    src_path : str,
+    profile : str,
+    entry_point_name : str,
+    output_path : str,
+    to_spirv : bool = False,
+    o0 : bool = False,
+    extra_args : List[str] = ()
+) -> List[str]:
+    args = [
+        'dxc',
+        '-T', profile,
+        str(src_path),
+        '-E', entry_point_name
+    ]
+
+    if to_spirv:
+        args.append('-spirv')
+
+    if o0:
+        # preserves functions from HLSL in GLSL
+        args.append('-O0')
+
+    args += extra_args
+    args += ['-Fo', str(output_path)]
+    return args
+
+def spirv_cross_args(
+    spirv_path : str,
+    glsl_path : str,
+    for_vulkan : bool = True
+) -> List[str]:
+    args = [
+        'spirv-cross',
+        '--output', str(glsl_path),
+        str(spirv_path)
+    ]
+
+    if for_vulkan:
+        args.append('--vulkan-semantics')
+
+    return args
+
+def glslang_args(
+    src_path : str,
+    target_env : str,
+    shader_stage : str,
+    output_path : str
+) -> List[str]:
+    return [
+        'glslang',
+        '--target-env', target_env,
+        '-S', shader_stage,
+        str(src_path),
+        '-o', str(output_path)
+    ]
+
+class ToolRunner:
+    '''
+    Runs compiler executables as asyncio subprocesses, at most `max_jobs` at
+    a time. Must be created in the running event loop.
+    '''
+    def __init__(self, max_jobs : int):
+        self._semaphore = asyncio.Semaphore(max_jobs)
+
+    async def __call__(
+        self,
+        args : List[str],
+        log : TextIO,
+        span_name : str = None
+    ) -> bool:
+        '''
+        Writes the command line, the elapsed time and the output of the tool
+        to `log` and returns True if it has succeeded. The trace span excludes
+        the time spent waiting for a free slot.
+        '''
+        async with self._semaphore:
+            with _trace.span(span_name or args[0], command = ' '.join(args)):
+                start_ns = time.perf_counter_ns()
+                process = await asyncio.create_subprocess_exec(
+                    *args,
+                    stdout = asyncio.subprocess.PIPE,
+                    stderr = asyncio.subprocess.STDOUT
+                )
+                output, _ = await process.communicate()
+                elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+
+        log.write(f'{" ".join(args)}... {elapsed_ms:0.3f}ms\n')
+        log.write(output.decode(errors = 'replace'))
+        return process.returncode == 0
@@ -0,0 +1,150 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools, hashlib, os, shutil, subprocess, uuid
+from pathlib import Path
+from typing import Iterable, List
+
+# The arguments making each compiler print its version. spirv-cross has no
+# --version option, but reports the revision it has been built from.
+_version_args = {
+    'dxc' : ['--version'],
+    'glslang' : ['--version'],
+    'spirv-cross' : ['--revision']
+}
+
+@functools.lru_cache(maxsize = None)
+def get_tool_identity(exe_name : str) -> str:
+    '''
+    Identifies a compiler executable for the purpose of compile cache keys:
+    its resolved path, size and modification time, plus the version it
+    reports, if it has a way to query it.
+    '''
+    exe_path = shutil.which(exe_name)
+    if exe_path is None:
+        return f'{exe_name} (not found)'
+
+    exe_stat = os.stat(exe_path)
+    identity = f'{exe_path} {exe_stat.st_size} {exe_stat.st_mtime_ns}\n'
+
+    version_args = _version_args.get(exe_name)
+    if version_args is None:
+        return identity
+
+    try:
+        result = subprocess.run(
+            [exe_path] + version_args, capture_output = True
+        )
+    except OSError:
+        return identity
+
+    # Older builds may not support the query, and their usage message
+    # isn't a version
+    if result.returncode == 0:
+        identity += result.stdout.decode(errors = 'replace')
+    return identity
+
+class CompileCache:
+    '''
+    On-disk cache of compiler outputs, content-addressed by the generated
+    source code, the identities of the compilers and the compilation flags.
+
+    Each entry is a directory named after its key. Its modification time is
+    updated on every hit so that `trim()` can evict the least recently used
+    entries.
+    '''
+    def __init__(self, cache_dir : Path, max_size_bytes : int):
+        self._cache_dir = cache_dir
+        self._max_size_bytes = max_size_bytes
+
+    @staticmethod
+    def get_key(
+        src_paths : Iterable[Path],
+        key_fields : Iterable[str]
+    ) -> str:
+        hasher = hashlib.sha256()
+        for src_path in src_paths:
+            hasher.update(src_path.read_bytes())
+            hasher.update(b'\0')
+        for key_field in key_fields:
+            hasher.update(str(key_field).encode())
+            hasher.update(b'\0')
+        return hasher.hexdigest()
+
+    def _get_entry_path(self, key : str) -> Path:
+        return self._cache_dir / key[:2] / key
+
+    def fetch(self, key : str, output_paths : List[Path]) -> bool:
+        '''
+        Copies the cached outputs to `output_paths` and returns True on a hit.
+        The outputs are copied rather than hardlinked because the compilers
+        overwrite their outputs in place, which would corrupt the entry.
+        '''
+        entry_path = self._get_entry_path(key)
+        if not entry_path.is_dir():
+            return False
+
+        try:
+            for output_idx, output_path in enumerate(output_paths):
+                shutil.copyfile(entry_path / str(output_idx), output_path)
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # The entry has been evicted by another process in the meantime
+            return False
+
+        return True
+
+    def store(self, key : str, output_paths : List[Path]):
+        entry_path = self._get_entry_path(key)
+        if entry_path.exists():
+            return
+
+        # Populate a staging directory first and then rename it, so that
+        # concurrent workers never observe a partially written entry.
+        staging_path = entry_path.parent / f'.{key}-{uuid.uuid4().hex}'
+        os.makedirs(staging_path)
+        try:
+            for output_idx, output_path in enumerate(output_paths):
+                shutil.copyfile(output_path, staging_path / str(output_idx))
+            os.rename(staging_path, entry_path)
+        except OSError:
+            # Another worker has stored the same entry first
+            shutil.rmtree(staging_path, ignore_errors = True)
+
+    def trim(self) -> int:
+        '''
+        Evicts the least recently used entries until the total size of the
+        cache fits the limit. Returns the number of evicted entries.
+        '''
+        entries = []
+        total_size = 0
+        for entry_path in self._cache_dir.glob('*/*'):
+            if entry_path.name.startswith('.') or not entry_path.is_dir():
+                continue
+
+            entry_size = sum(
+                file_path.stat().st_size for file_path in entry_path.iterdir()
+            )
+            entries.append((entry_path.stat().st_mtime, entry_size, entry_path))
+            total_size += entry_size
+
+        num_evicted = 0
+        for _, entry_size, entry_path in sorted(entries):
+            if total_size <= self._max_size_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors = True)
+            total_size -= entry_size
+            num_evicted += 1
+
+        return num_evicted
@@ -0,0 +1,112 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+
+from _shader_base import Shader
+from _impl.vertex_data import VertexData
+import _impl.ps as impl_ps
+
+def estimate_units(shader_desc : Shader.Desc) -> float:
+    '''
+    Heuristic relative cost of generating and compiling a shader, growing
+    with the number of the material textures and vertex attributes
+    '''
+    permutation = shader_desc.permutation
+    if isinstance(permutation, impl_ps.ps.Desc):
+        texture_names = {
+            texture_name
+            for texture_name, _ in permutation.material_textures.uv_sets
+        }
+        units = 2.0 + len(texture_names)
+        if ( 'normal' in texture_names
+            and not permutation.vertex_data.has_tangent
+        ):
+            # The TBN is derived from the screen-space derivatives
+            units += 2.0
+        return units
+
+    if isinstance(permutation, VertexData.Desc):
+        return 1.0 + 0.25 * len(permutation.passthru_attrs)
+
+    return 1.0
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class CostModel:
+    '''
+    Predicts the time it takes to generate and compile each shader, so that
+    the most expensive ones can be scheduled first instead of holding up the
+    end of the run. The times recorded in the previous runs take precedence,
+    and the heuristic is used for the shaders without a recorded time,
+    converted to seconds with the average ratio of the recorded ones. The
+    recorded times are kept in a JSON file outside the output directory, as
+    they change on every run.
+    '''
+    def __init__(self):
+        self._history = dict()
+        self._seconds_per_unit = 1.0
+
+    @classmethod
+    def load(cls, history_path : Path) -> 'CostModel':
+        cost_model = cls()
+        try:
+            with open(history_path) as history_file:
+                history = json.load(history_file)
+            for entry in history.values():
+                for key in ('seconds', 'units'):
+                    if not _is_number(entry[key]):
+                        raise TypeError(f'Not a number: {entry[key]!r}')
+        except (OSError, ValueError, LookupError, TypeError, AttributeError):
+            # The history is only a hint, so a missing or corrupt file is
+            # started afresh
+            return cost_model
+        cost_model._history = history
+
+        total_seconds = sum(
+            entry['seconds'] for entry in cost_model._history.values()
+        )
+        total_units = sum(
+            entry['units'] for entry in cost_model._history.values()
+        )
+        if total_seconds > 0 and total_units > 0:
+            cost_model._seconds_per_unit = total_seconds / total_units
+        return cost_model
+
+    def save(self, history_path : Path):
+        with open(history_path, 'w') as history_file:
+            json.dump(self._history, history_file, indent = 4, sort_keys = True)
+
+    def predict(self, shader_name : str, shader_desc : Shader.Desc) -> float:
+        '''
+        The predicted time in seconds, or relative units if nothing has been
+        recorded yet
+        '''
+        entry = self._history.get(shader_name)
+        if entry is not None:
+            return entry['seconds']
+        return estimate_units(shader_desc) * self._seconds_per_unit
+
+    def record(
+        self,
+        shader_name : str,
+        shader_desc : Shader.Desc,
+        seconds : float
+    ):
+        self._history[shader_name] = {
+            'seconds' : seconds,
+            'units' : estimate_units(shader_desc)
+        }
@@ -0,0 +1,248 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+'''
+Static cost statistics of the compiled shaders, extracted offline from the
+DXIL disassembly and the SPIR-V binaries, for choosing content budgets and
+tracking the quality of the generated code across changes.
+
+The statistics of each compiled output are:
+
+    instructions     the instructions in the function bodies
+    texture_samples  the texture samples, gathers and loads
+    values           the values produced by the instructions, an upper
+                     bound estimate of the temporary registers
+    cbuffer_loads    the loads from constant buffers
+'''
+
+import csv, json, re, struct, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+stat_names = ('instructions', 'texture_samples', 'values', 'cbuffer_loads')
+
+_dxil_sample_re = re.compile(
+    r'@dx\.op\.(sample|textureGather|textureLoad)\w*\.'
+)
+_dxil_value_re = re.compile(r'^\s*%[\w.]+ = ')
+
+def disassemble_dxil(bin_path : Path) -> str:
+    return subprocess.run(
+        ['dxc', '-dumpbin', str(bin_path)],
+        capture_output = True,
+        check = True
+    ).stdout.decode()
+
+def analyze_dxil(disassembly : str) -> Dict[str, int]:
+    stats = dict.fromkeys(stat_names, 0)
+    in_function = False
+    for line in disassembly.splitlines():
+        if line.startswith('define '):
+            in_function = True
+            continue
+        if not in_function:
+            continue
+        if line.startswith('}'):
+            in_function = False
+            continue
+
+        line = line.strip()
+        # Skipping the comments with the labels of the basic blocks
+        if not line or line.startswith(';') or line.endswith(':'):
+            continue
+
+        stats['instructions'] += 1
+        if _dxil_value_re.match(line):
+            stats['values'] += 1
+        if _dxil_sample_re.search(line):
+            stats['texture_samples'] += 1
+        if '@dx.op.cbufferLoad' in line:
+            stats['cbuffer_loads'] += 1
+    return stats
+
+_spirv_magic = 0x07230203
+_spirv_header_size = 5
+
+# Opcodes
+_op_function = 54
+_op_function_parameter = 55
+_op_function_end = 56
+_op_variable = 59
+_op_load = 61
+_op_access_chain = 65
+_op_in_bounds_access_chain = 66
+_op_label = 248
+
+# From OpImageSampleImplicitLod to OpImageDrefGather
+_sample_opcodes = range(87, 98)
+
+# The instructions without results, among the ones in function bodies
+_no_result_opcodes = frozenset((
+    62,     # OpStore
+    63,     # OpCopyMemory
+    246,    # OpSelectionMerge
+    247,    # OpLoopMerge
+    249,    # OpBranch
+    250,    # OpBranchConditional
+    251,    # OpSwitch
+    252,    # OpKill
+    253,    # OpReturn
+    254,    # OpReturnValue
+    255     # OpUnreachable
+))
+
+# The instructions in function bodies that aren't counted
+_skipped_opcodes = frozenset((
+    8,      # OpLine
+    317,    # OpNoLine
+    _op_function_parameter,
+    _op_label
+))
+
+# Storage classes
+_uniform_storage_classes = (2, 9)   # Uniform, PushConstant
+
+def analyze_spirv(data : bytes) -> Dict[str, int]:
+    if len(data) < _spirv_header_size * 4 or len(data) % 4:
+        raise ValueError('Not a SPIR-V binary')
+    byte_order = '<'
+    if struct.unpack_from('<I', data)[0] != _spirv_magic:
+        byte_order = '>'
+        if struct.unpack_from('>I', data)[0] != _spirv_magic:
+            raise ValueError('Not a SPIR-V binary')
+    words = struct.unpack(f'{byte_order}{len(data) // 4}I', data)
+
+    stats = dict.fromkeys(stat_names, 0)
+    # The constant buffer variables and the pointers into them
+    uniform_ids = set()
+    in_function = False
+
+    offset = _spirv_header_size
+    while offset < len(words):
+        word_count = words[offset] >> 16
+        opcode = words[offset] & 0xffff
+        if word_count == 0:
+            raise ValueError('Malformed SPIR-V instruction')
+        operands = words[offset + 1 : offset + word_count]
+        offset += word_count
+
+        if opcode == _op_function:
+            in_function = True
+            continue
+        if opcode == _op_function_end:
+            in_function = False
+            continue
+
+        if opcode == _op_variable:
+            if operands[2] in _uniform_storage_classes:
+                uniform_ids.add(operands[1])
+            elif in_function:
+                # The function variables are temporaries, not instructions
+                stats['values'] += 1
+            continue
+
+        if not in_function or opcode in _skipped_opcodes:
+            continue
+
+        stats['instructions'] += 1
+        if opcode not in _no_result_opcodes:
+            stats['values'] += 1
+        if opcode in _sample_opcodes:
+            stats['texture_samples'] += 1
+        if (
+            opcode in (_op_access_chain, _op_in_bounds_access_chain)
+            and operands[2] in uniform_ids
+        ):
+            uniform_ids.add(operands[1])
+        elif opcode == _op_load and operands[2] in uniform_ids:
+            stats['cbuffer_loads'] += 1
+    return stats
+
+def _get_format(path : Path) -> str:
+    if path.name.endswith('.hlsl.spv'):
+        # The unoptimized HLSL to SPIR-V compilation only validating the HLSL,
+        # which isn't shipped and mustn't skew the totals of the shipped SPIR-V
+        return 'spirv-validation'
+    return {'.cso' : 'dxil', '.spv' : 'spirv'}.get(path.suffix)
+
+def analyze(path : Path) -> Dict[str, int]:
+    if _get_format(path) == 'dxil':
+        return analyze_dxil(disassemble_dxil(path))
+    return analyze_spirv(path.read_bytes())
+
+def build(
+    out_dir_path : Path,
+    compiled_outputs : Dict[str, List[str]],
+    max_workers : int = None
+) -> dict:
+    '''
+    Analyzes the DXIL and SPIR-V outputs of the shaders, keyed by the shader
+    names, on a pool of threads. Outputs that fail to be analyzed are listed
+    separately.
+    '''
+    rows = [
+        {'shader' : shader_name, 'output' : output_name}
+        for shader_name, output_names in sorted(compiled_outputs.items())
+        for output_name in sorted(output_names)
+        if _get_format(Path(output_name)) is not None
+    ]
+
+    def _analyze(row : dict):
+        try:
+            return analyze(out_dir_path / row['output'])
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return None
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        all_stats = list(executor.map(_analyze, rows))
+
+    report = {'shaders' : [], 'totals' : dict(), 'failed' : []}
+    for row, stats in zip(rows, all_stats):
+        if stats is None:
+            report['failed'].append(row['output'])
+            continue
+
+        output_format = _get_format(Path(row['output']))
+        report['shaders'].append({**row, 'format' : output_format, **stats})
+
+        totals = report['totals'].setdefault(
+            output_format, dict.fromkeys(stat_names, 0)
+        )
+        for stat_name in stat_names:
+            totals[stat_name] += stats[stat_name]
+    return report
+
+def write(report_path : Path, report : dict):
+    '''
+    Writes CSV if the file has the .csv extension, with a row of totals per
+    format at the end, or JSON otherwise
+    '''
+    if report_path.suffix.lower() != '.csv':
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent = 4)
+        return
+
+    with open(report_path, 'w', newline = '') as report_file:
+        writer = csv.DictWriter(
+            report_file,
+            fieldnames = ('shader', 'output', 'format') + stat_names
+        )
+        writer.writeheader()
+        writer.writerows(report['shaders'])
+        for output_format, totals in report['totals'].items():
+            writer.writerow(
+                {'shader' : 'total', 'format' : output_format, **totals}
+            )
@@ -0,0 +1,319 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+In-process HLSL compilation through the COM interface of the dxcompiler
+shared library, which is loaded once per process and then reused for every
+shader, instead of launching a dxc process per compilation.
+'''
+
+import ctypes, ctypes.util, functools, os, shutil, sys
+from ctypes import (
+    POINTER, byref, c_char_p, c_int, c_int32, c_size_t, c_uint8, c_uint16,
+    c_uint32, c_void_p, c_wchar_p
+)
+from pathlib import Path
+from typing import List
+
+_is_windows = sys.platform == 'win32'
+
+# Outside of Windows, IUnknown has a virtual destructor, which takes two
+# vtable slots right after Release()
+_num_iunknown_methods = 3 if _is_windows else 5
+_func_type = ctypes.WINFUNCTYPE if _is_windows else ctypes.CFUNCTYPE
+
+class _Guid(ctypes.Structure):
+    _fields_ = [
+        ('Data1', c_uint32),
+        ('Data2', c_uint16),
+        ('Data3', c_uint16),
+        ('Data4', c_uint8 * 8)
+    ]
+
+    def __init__(self, data1, data2, data3, data4):
+        super().__init__(data1, data2, data3, (c_uint8 * 8)(*data4))
+
+_CLSID_DxcCompiler = _Guid(
+    0x73e22d93, 0xe6ce, 0x47f3,
+    (0xb5, 0xbf, 0xf0, 0x66, 0x4f, 0x39, 0xc1, 0xb0)
+)
+_CLSID_DxcUtils = _Guid(
+    0x6245d6af, 0x66e0, 0x48fd,
+    (0x80, 0xb4, 0x4d, 0x27, 0x17, 0x96, 0x74, 0x8c)
+)
+_IID_IDxcCompiler3 = _Guid(
+    0x228b4687, 0x5a6a, 0x4730,
+    (0x90, 0x0c, 0x97, 0x02, 0xb2, 0x20, 0x3f, 0x54)
+)
+_IID_IDxcUtils = _Guid(
+    0x4605c4cb, 0x2019, 0x492a,
+    (0xad, 0xa4, 0x65, 0xf2, 0x0b, 0xb7, 0xd6, 0x7f)
+)
+_IID_IDxcResult = _Guid(
+    0x58346cda, 0xdde7, 0x4497,
+    (0x94, 0x61, 0x6f, 0x87, 0xaf, 0x5e, 0x06, 0x59)
+)
+
+class _DxcBuffer(ctypes.Structure):
+    _fields_ = [
+        ('Ptr', c_void_p),
+        ('Size', c_size_t),
+        ('Encoding', c_uint32)
+    ]
+
+_DXC_CP_UTF8 = 65001
+
+class _ComPtr:
+    '''
+    Owning reference to a COM object, whose methods are called by their
+    index in the vtable after the ones inherited from IUnknown.
+    '''
+    def __init__(self, ptr : c_void_p):
+        self._ptr = ptr
+
+    def _get_method(self, vtable_idx : int, argtypes, restype = c_int32):
+        vtable = ctypes.cast(self._ptr, POINTER(POINTER(c_void_p))).contents
+        return _func_type(restype, c_void_p, *argtypes)(vtable[vtable_idx])
+
+    def call(self, method_idx : int, argtypes, *args) -> int:
+        return self._get_method(
+            _num_iunknown_methods + method_idx, argtypes
+        )(self._ptr, *args)
+
+    def __del__(self):
+        if self._ptr:
+            self._get_method(2, [])(self._ptr)   # IUnknown::Release()
+
+    def __bool__(self) -> bool:
+        return bool(self._ptr)
+
+def _get_blob_bytes(blob : _ComPtr) -> bytes:
+    if not blob:
+        return b''
+
+    # IDxcBlob::GetBufferPointer() and GetBufferSize()
+    get_pointer = blob._get_method(_num_iunknown_methods, [], c_void_p)
+    get_size = blob._get_method(_num_iunknown_methods + 1, [], c_size_t)
+    return ctypes.string_at(get_pointer(blob._ptr), get_size(blob._ptr))
+
+class CompileError(RuntimeError):
+    pass
+
+def get_args(
+    src_path : Path,
+    profile : str,
+    entry_point_name : str,
+    to_spirv : bool = False,
+    o0 : bool = False,
+    extra_args : List[str] = ()
+) -> List[str]:
+    '''
+    The arguments passed to `IDxcCompiler3::Compile()`, which get the source
+    and return the output in memory rather than through files
+    '''
+    # The source path lets the includes be resolved relative to it
+    args = [str(src_path), '-T', profile, '-E', entry_point_name]
+    if to_spirv:
+        args.append('-spirv')
+    if o0:
+        args.append('-O0')
+    args += extra_args
+    return args
+
+class _DlInfo(ctypes.Structure):
+    _fields_ = [
+        ('dli_fname', c_char_p),
+        ('dli_fbase', c_void_p),
+        ('dli_sname', c_char_p),
+        ('dli_saddr', c_void_p)
+    ]
+
+def _get_loaded_path(dll : ctypes.CDLL, symbol_name : str) -> Path:
+    '''
+    The file the shared library has been loaded from, which may have been
+    found on the library search path by its name. Returns None if it can't be
+    determined.
+    '''
+    if _is_windows:
+        path_buffer = ctypes.create_unicode_buffer(32768)
+        get_module_file_name = ctypes.windll.kernel32.GetModuleFileNameW
+        get_module_file_name.argtypes = [c_void_p, c_wchar_p, c_uint32]
+        get_module_file_name.restype = c_uint32
+        if not get_module_file_name(
+            dll._handle, path_buffer, len(path_buffer)
+        ):
+            return None
+        return Path(path_buffer.value)
+
+    # The file containing the address of one of the library's symbols
+    dladdr = ctypes.CDLL(None).dladdr
+    dladdr.argtypes = [c_void_p, POINTER(_DlInfo)]
+    dladdr.restype = c_int
+    dl_info = _DlInfo()
+    symbol_address = ctypes.cast(getattr(dll, symbol_name), c_void_p)
+    if not dladdr(symbol_address, byref(dl_info)) or not dl_info.dli_fname:
+        return None
+    return Path(os.fsdecode(dl_info.dli_fname)).resolve()
+
+class DxcLibrary:
+    def __init__(self, library_path : Path):
+        self._dll = (
+            ctypes.WinDLL if _is_windows else ctypes.CDLL
+        )(str(library_path))
+        self._path = (
+            _get_loaded_path(self._dll, 'DxcCreateInstance') or library_path
+        )
+
+        create_instance = self._dll.DxcCreateInstance
+        create_instance.restype = c_int32
+        create_instance.argtypes = [
+            POINTER(_Guid), POINTER(_Guid), POINTER(c_void_p)
+        ]
+
+        def _create(clsid : _Guid, iid : _Guid) -> _ComPtr:
+            ptr = c_void_p()
+            hr = create_instance(byref(clsid), byref(iid), byref(ptr))
+            if hr < 0:
+                raise OSError(f'DxcCreateInstance failed: {hr:#x}')
+            return _ComPtr(ptr)
+
+        self._compiler = _create(_CLSID_DxcCompiler, _IID_IDxcCompiler3)
+        utils = _create(_CLSID_DxcUtils, _IID_IDxcUtils)
+
+        # IDxcUtils::CreateDefaultIncludeHandler()
+        include_handler = c_void_p()
+        utils.call(6, [POINTER(c_void_p)], byref(include_handler))
+        self._include_handler = _ComPtr(include_handler)
+
+    def get_identity(self) -> str:
+        '''
+        Identifies the library for the purpose of compile cache keys
+        '''
+        try:
+            library_stat = os.stat(self._path)
+        except OSError:
+            # The loaded file is unknown
+            return str(self._path)
+        return (
+            f'{self._path} {library_stat.st_size} {library_stat.st_mtime_ns}'
+        )
+
+    def compile(
+        self,
+        src_path : Path,
+        profile : str,
+        entry_point_name : str,
+        output_path : Path,
+        to_spirv : bool = False,
+        o0 : bool = False,
+        extra_args : List[str] = ()
+    ):
+        '''
+        Counterpart of `metashade.hlsl.util.dxc.compile()`. Prints the
+        diagnostics and raises `CompileError` on failure.
+        '''
+        source = Path(src_path).read_bytes()
+        source_buffer = _DxcBuffer(
+            ctypes.cast(ctypes.c_char_p(source), c_void_p),
+            len(source),
+            _DXC_CP_UTF8
+        )
+
+        args = get_args(
+            src_path = src_path,
+            profile = profile,
+            entry_point_name = entry_point_name,
+            to_spirv = to_spirv,
+            o0 = o0,
+            extra_args = extra_args
+        )
+        c_args = (c_wchar_p * len(args))(*args)
+
+        result_ptr = c_void_p()
+        # IDxcCompiler3::Compile()
+        hr = self._compiler.call(
+            0,
+            [
+                POINTER(_DxcBuffer), POINTER(c_wchar_p), c_uint32,
+                c_void_p, POINTER(_Guid), POINTER(c_void_p)
+            ],
+            byref(source_buffer), c_args, len(args),
+            self._include_handler._ptr, byref(_IID_IDxcResult),
+            byref(result_ptr)
+        )
+        if hr < 0:
+            raise CompileError(f'IDxcCompiler3::Compile failed: {hr:#x}')
+        result = _ComPtr(result_ptr)
+
+        # IDxcOperationResult::GetStatus()
+        status = c_int32()
+        result.call(0, [POINTER(c_int32)], byref(status))
+
+        # IDxcOperationResult::GetErrorBuffer()
+        errors_ptr = c_void_p()
+        result.call(2, [POINTER(c_void_p)], byref(errors_ptr))
+        errors = _get_blob_bytes(_ComPtr(errors_ptr))
+        if errors:
+            print(errors.decode(errors = 'replace'))
+
+        if status.value < 0:
+            raise CompileError(f'Failed to compile {src_path}')
+
+        # IDxcOperationResult::GetResult()
+        object_ptr = c_void_p()
+        result.call(1, [POINTER(c_void_p)], byref(object_ptr))
+        Path(output_path).write_bytes(_get_blob_bytes(_ComPtr(object_ptr)))
+
+def _get_candidate_paths() -> List[Path]:
+    '''
+    The library is expected next to the dxc executable in the release
+    packages, or on the library search path.
+    '''
+    candidate_paths = []
+
+    dxc_path = shutil.which('dxc')
+    if dxc_path is not None:
+        dxc_dir_path = Path(dxc_path).resolve().parent
+        if _is_windows:
+            candidate_paths.append(dxc_dir_path / 'dxcompiler.dll')
+        else:
+            candidate_paths += [
+                dxc_dir_path / 'libdxcompiler.so',
+                dxc_dir_path.parent / 'lib' / 'libdxcompiler.so'
+            ]
+
+    library_name = ctypes.util.find_library('dxcompiler')
+    if library_name is not None:
+        candidate_paths.append(Path(library_name))
+
+    return candidate_paths
+
+@functools.lru_cache(maxsize = None)
+def load() -> DxcLibrary:
+    '''
+    Loads the library once per process, when it's first needed by a worker.
+    Returns None if it can't be found or loaded, in which case the dxc
+    executable should be used instead.
+    '''
+    for library_path in _get_candidate_paths():
+        try:
+            dxc_library = DxcLibrary(library_path)
+        except (OSError, AttributeError):
+            # Missing or not the expected library
+            continue
+        print(f'Using the dxcompiler library: {dxc_library.get_identity()}')
+        return dxc_library
+
+    print('The dxcompiler library is not found, using dxc instead.')
+    return None
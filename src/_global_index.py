@@ -0,0 +1,240 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+A single compact shader index for all the assets, which the host app can load
+at startup instead of the per-asset shader indices. The shader names are
+stored once in a string table and referenced by their positions in it.
+
+Each primitive is an array with an element per slot, i.e. per target and
+stage, such as `dx.vs`, which is the position of the shader in the string
+table or -1 if the primitive has no shader for the slot:
+
+    {
+        "shaders": ["GltfPbr-LightCulling-CS.cso", "GltfPbr-uv0-VS.cso", ...],
+        "slots": ["dx.ps", "dx.vs", "vk.frag"],
+        "assets": {"asset.gltf": [[[2, 1, 3], ...], ...]},
+        "pipeline": {"light_culling": {"dx.cs": 0}}
+    }
+
+The shaders of the pipeline passes that don't depend on the assets, such as
+the light culling compute shader, are mapped by their slots per pass.
+
+The binary encoding stores the same in little endian, with the strings
+prefixed by their lengths. The slot values are unsigned 16-bit integers, or
+32-bit ones if there are too many shaders, with all the bits set instead of
+-1:
+
+    header:     magic b'MSIX', version, number of shaders, number of slots,
+                number of assets, slot value size in bytes,
+                number of pipeline passes                      (<4sIIIIII)
+    string:     length, UTF-8 bytes                            (<H)
+    shaders:    strings
+    slots:      strings
+    assets:     per asset: its name string, the number of meshes (<I) and,
+                per mesh, the number of primitives (<I), followed by
+                the primitives as arrays of slot values        (<H or <I)
+    pipeline:   per pass: its name string, the number of its shaders (<I)
+                and, per shader, its slot string and position  (<I)
+'''
+
+import json, struct
+from pathlib import Path
+from typing import Dict
+
+import _archive
+
+_magic = b'MSIX'
+_version = 2
+_header_format = '<4sIIIIII'
+
+def build(
+    shader_indices : Dict[str, list],
+    pipeline_shader_index : Dict[str, dict] = None
+) -> dict:
+    '''
+    Builds the index from the per-asset shader indices, keyed by the assets,
+    and the shaders of the pipeline passes, see `_archive.pack()`
+    '''
+    if pipeline_shader_index is None:
+        pipeline_shader_index = dict()
+
+    shader_names = set()
+    _archive.map_index(shader_indices, shader_names.add)
+    _archive.map_index(pipeline_shader_index, shader_names.add)
+    shader_names = sorted(shader_names)
+    shader_ids = {name : idx for idx, name in enumerate(shader_names)}
+
+    slots = sorted({
+        f'{target}.{stage}'
+        for shader_index in shader_indices.values()
+        for per_mesh_shader_index in shader_index
+        for per_primitive_shader_index in per_mesh_shader_index
+        for target, stages in per_primitive_shader_index.items()
+        for stage in stages
+    })
+
+    def _get_primitive(per_primitive_shader_index : dict) -> list:
+        primitive = []
+        for slot in slots:
+            target, stage = slot.split('.')
+            shader_name = per_primitive_shader_index.get(
+                target, dict()
+            ).get(stage)
+            primitive.append(
+                -1 if shader_name is None else shader_ids[shader_name]
+            )
+        return primitive
+
+    return {
+        'shaders' : shader_names,
+        'slots' : slots,
+        'assets' : {
+            asset_key : [
+                [
+                    _get_primitive(per_primitive_shader_index)
+                    for per_primitive_shader_index in per_mesh_shader_index
+                ]
+                for per_mesh_shader_index in shader_index
+            ]
+            for asset_key, shader_index in shader_indices.items()
+        },
+        'pipeline' : {
+            pass_name : {
+                f'{target}.{stage}' : shader_ids[shader_name]
+                for target, stages in sorted(pass_shader_index.items())
+                for stage, shader_name in sorted(stages.items())
+            }
+            for pass_name, pass_shader_index
+                in sorted(pipeline_shader_index.items())
+        }
+    }
+
+def _get_primitive_format(num_slots : int, value_size : int) -> str:
+    return f'<{num_slots}{"H" if value_size == 2 else "I"}'
+
+def _pack_string(string : str) -> bytes:
+    encoded = string.encode()
+    return struct.pack('<H', len(encoded)) + encoded
+
+def write(index_path : Path, index : dict, binary : bool = False):
+    if not binary:
+        with open(index_path, 'w') as index_file:
+            json.dump(index, index_file, separators = (',', ':'))
+        return
+
+    value_size = 2 if len(index['shaders']) < 0xffff else 4
+    no_shader = (1 << (value_size * 8)) - 1
+
+    chunks = [
+        struct.pack(
+            _header_format,
+            _magic,
+            _version,
+            len(index['shaders']),
+            len(index['slots']),
+            len(index['assets']),
+            value_size,
+            len(index['pipeline'])
+        )
+    ]
+    chunks += [_pack_string(name) for name in index['shaders']]
+    chunks += [_pack_string(slot) for slot in index['slots']]
+
+    primitive_format = _get_primitive_format(len(index['slots']), value_size)
+    for asset_key, meshes in index['assets'].items():
+        chunks.append(_pack_string(asset_key))
+        chunks.append(struct.pack('<I', len(meshes)))
+        for primitives in meshes:
+            chunks.append(struct.pack('<I', len(primitives)))
+            chunks += [
+                struct.pack(
+                    primitive_format,
+                    *(no_shader if value < 0 else value for value in primitive)
+                )
+                for primitive in primitives
+            ]
+
+    for pass_name, pass_shaders in index['pipeline'].items():
+        chunks.append(_pack_string(pass_name))
+        chunks.append(struct.pack('<I', len(pass_shaders)))
+        for slot, shader_id in pass_shaders.items():
+            chunks.append(_pack_string(slot))
+            chunks.append(struct.pack('<I', shader_id))
+
+    index_path.write_bytes(b''.join(chunks))
+
+def read_binary(index_path : Path) -> dict:
+    '''
+    Decodes the binary encoding, mainly for reference and testing
+    '''
+    data = index_path.read_bytes()
+    (
+        magic, version, num_shaders, num_slots, num_assets, value_size,
+        num_passes
+    ) = struct.unpack_from(_header_format, data)
+    if magic != _magic or version != _version:
+        raise ValueError(f'{index_path} is not a binary shader index')
+    offset = struct.calcsize(_header_format)
+
+    def _unpack(format : str):
+        nonlocal offset
+        values = struct.unpack_from(format, data, offset)
+        offset += struct.calcsize(format)
+        return values
+
+    def _unpack_string() -> str:
+        nonlocal offset
+        length, = _unpack('<H')
+        string = data[offset : offset + length].decode()
+        offset += length
+        return string
+
+    shader_names = [_unpack_string() for _ in range(num_shaders)]
+    slots = [_unpack_string() for _ in range(num_slots)]
+
+    primitive_format = _get_primitive_format(num_slots, value_size)
+    no_shader = (1 << (value_size * 8)) - 1
+    assets = dict()
+    for _ in range(num_assets):
+        asset_key = _unpack_string()
+        num_meshes, = _unpack('<I')
+        meshes = []
+        for _ in range(num_meshes):
+            num_primitives, = _unpack('<I')
+            meshes.append([
+                [
+                    -1 if value == no_shader else value
+                    for value in _unpack(primitive_format)
+                ]
+                for _ in range(num_primitives)
+            ])
+        assets[asset_key] = meshes
+
+    pipeline = dict()
+    for _ in range(num_passes):
+        pass_name = _unpack_string()
+        num_pass_shaders, = _unpack('<I')
+        pass_shaders = dict()
+        for _ in range(num_pass_shaders):
+            slot = _unpack_string()
+            pass_shaders[slot], = _unpack('<I')
+        pipeline[pass_name] = pass_shaders
+
+    return {
+        'shaders' : shader_names,
+        'slots' : slots,
+        'assets' : assets,
+        'pipeline' : pipeline
+    }
@@ -17,8 +17,12 @@ from pathlib import Path
 
 from metashade.glsl.util import glslang
 
-import _shader_base
+import _shader_base, _async_compile, _trace
 import _impl.ps as impl_ps
+from _impl.options import Options
+from _compile_cache import get_tool_identity
+
+_target_env = 'vulkan1.1'
 
 class Shader(_shader_base.Shader, abc.ABC):
     @staticmethod
@@ -29,21 +33,40 @@ class Shader(_shader_base.Shader, abc.ABC):
     def _get_bin_extension() -> str:
         return 'spv'
     
-    def _compile(self, ref_differ) -> bool:
+    def _get_compile_key_fields(self):
+        return (
+            self._get_stage_name(),
+            _target_env,
+            get_tool_identity('glslang')
+        )
+
+    def _compile(self) -> bool:
         try:
-            glslang.compile(
-                src_path = self._src_path,
-                target_env = 'vulkan1.1',
-                shader_stage = self._get_stage_name(),
-                output_path = self._bin_path
-            )
+            with _trace.span('glslang', shader = self._src_path.name):
+                glslang.compile(
+                    src_path = self._src_path,
+                    target_env = _target_env,
+                    shader_stage = self._get_stage_name(),
+                    output_path = self._bin_path
+                )
             return True
         except subprocess.CalledProcessError as err:
             return False
 
+    async def _compile_async(self, run_tool) -> bool:
+        return await run_tool(
+            _async_compile.glslang_args(
+                src_path = self._src_path,
+                target_env = _target_env,
+                shader_stage = self._get_stage_name(),
+                output_path = self._bin_path
+            ),
+            'glslang'
+        )
+
 class FragmentShader(Shader):
-    def __init__(self, out_dir):
-        super().__init__(out_dir, 'GLTFPbrPass-frag')
+    def __init__(self, out_dir, permutation = None, options = Options()):
+        super().__init__(out_dir, 'GLTFPbrPass-frag', options = options)
 
     def _generate(self, ref_differ):
         self._generate_wrapped(impl_ps.generate_frag, ref_differ)
@@ -0,0 +1,186 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Lightweight glTF loader that only extracts the metadata the shader
+permutations depend on: the vertex attributes and materials of the mesh
+primitives. Buffers, images, accessors, nodes and animations are never
+converted into objects, let alone read from disk. Only the header and the JSON
+chunk of .glb files are read.
+
+The objects mimic the pygltflib classes of the same names, so that they can
+be passed to the `describe()` methods instead. Omitted properties take their
+defaults from the glTF specification.
+'''
+
+import json, mmap, os, struct
+from pathlib import Path
+from typing import List, NamedTuple
+
+class Attributes(NamedTuple):
+    POSITION : int = None
+    NORMAL : int = None
+    TANGENT : int = None
+    TEXCOORD_0 : int = None
+    TEXCOORD_1 : int = None
+    COLOR_0 : int = None
+    JOINTS_0 : int = None
+    WEIGHTS_0 : int = None
+
+class Primitive(NamedTuple):
+    attributes : Attributes = Attributes()
+    material : int = None
+
+class Mesh(NamedTuple):
+    name : str = None
+    primitives : List[Primitive] = []
+
+class TextureInfo(NamedTuple):
+    index : int = None
+    texCoord : int = 0
+
+class PbrMetallicRoughness(NamedTuple):
+    baseColorTexture : TextureInfo = None
+    metallicRoughnessTexture : TextureInfo = None
+    baseColorFactor : List[float] = [1.0, 1.0, 1.0, 1.0]
+    metallicFactor : float = 1.0
+    roughnessFactor : float = 1.0
+
+class MaterialExtensions(NamedTuple):
+    KHR_materials_pbrSpecularGlossiness : dict = None
+
+class Material(NamedTuple):
+    name : str = None
+    pbrMetallicRoughness : PbrMetallicRoughness = None
+    normalTexture : TextureInfo = None
+    occlusionTexture : TextureInfo = None
+    emissiveTexture : TextureInfo = None
+    emissiveFactor : List[float] = [0.0, 0.0, 0.0]
+    alphaMode : str = 'OPAQUE'
+    alphaCutoff : float = None
+    extensions : MaterialExtensions = MaterialExtensions()
+
+class GltfMetadata(NamedTuple):
+    meshes : List[Mesh] = []
+    materials : List[Material] = []
+
+def _from_dict(cls, json_dict : dict):
+    '''
+    Picks the fields of the NamedTuple `cls` out of a JSON object, ignoring
+    everything else.
+    '''
+    return cls(**{
+        field_name : json_dict[field_name]
+        for field_name in cls._fields if field_name in json_dict
+    })
+
+def _texture_info(json_dict : dict, name : str) -> TextureInfo:
+    texture_dict = json_dict.get(name)
+    return None if texture_dict is None else _from_dict(
+        TextureInfo, texture_dict
+    )
+
+def _material(material_dict : dict) -> Material:
+    pbr_dict = material_dict.get('pbrMetallicRoughness')
+    return Material(
+        name = material_dict.get('name'),
+        pbrMetallicRoughness = None if pbr_dict is None else (
+            PbrMetallicRoughness(
+                baseColorTexture = _texture_info(
+                    pbr_dict, 'baseColorTexture'
+                ),
+                metallicRoughnessTexture = _texture_info(
+                    pbr_dict, 'metallicRoughnessTexture'
+                ),
+                **{
+                    field_name : pbr_dict[field_name]
+                    for field_name in (
+                        'baseColorFactor', 'metallicFactor', 'roughnessFactor'
+                    )
+                    if field_name in pbr_dict
+                }
+            )
+        ),
+        normalTexture = _texture_info(material_dict, 'normalTexture'),
+        occlusionTexture = _texture_info(material_dict, 'occlusionTexture'),
+        emissiveTexture = _texture_info(material_dict, 'emissiveTexture'),
+        emissiveFactor = material_dict.get('emissiveFactor', [0.0, 0.0, 0.0]),
+        alphaMode = material_dict.get('alphaMode', 'OPAQUE'),
+        alphaCutoff = material_dict.get('alphaCutoff'),
+        extensions = _from_dict(
+            MaterialExtensions, material_dict.get('extensions', {})
+        )
+    )
+
+def _mesh(mesh_dict : dict) -> Mesh:
+    return Mesh(
+        name = mesh_dict.get('name'),
+        primitives = [
+            Primitive(
+                attributes = _from_dict(
+                    Attributes, primitive_dict.get('attributes', {})
+                ),
+                material = primitive_dict.get('material')
+            )
+            for primitive_dict in mesh_dict.get('primitives', [])
+        ]
+    )
+
+def from_json_dict(json_dict : dict) -> GltfMetadata:
+    return GltfMetadata(
+        meshes = [
+            _mesh(mesh_dict) for mesh_dict in json_dict.get('meshes', [])
+        ],
+        materials = [
+            _material(material_dict)
+            for material_dict in json_dict.get('materials', [])
+        ]
+    )
+
+def read_json_bytes(gltf_file_path : Path) -> bytes:
+    '''
+    Returns the JSON document of a .gltf file or the JSON chunk of a .glb
+    file. The latter is memory-mapped so that the binary chunk is never paged
+    in.
+    '''
+    gltf_file_path = Path(gltf_file_path)
+    with open(gltf_file_path, 'rb') as gltf_file:
+        if gltf_file_path.suffix.lower() != '.glb':
+            return gltf_file.read()
+
+        # The 12-byte header and the 8-byte header of the JSON chunk. Also,
+        # empty files can't be memory-mapped.
+        if os.fstat(gltf_file.fileno()).st_size < 20:
+            raise ValueError(f'{gltf_file_path} is truncated')
+
+        with mmap.mmap(
+            gltf_file.fileno(), 0, access = mmap.ACCESS_READ
+        ) as glb:
+            magic, version, _ = struct.unpack_from('<4sII', glb, 0)
+            if magic != b'glTF' or version != 2:
+                raise ValueError(
+                    f'{gltf_file_path} is not a glTF 2.0 binary file'
+                )
+
+            # The JSON chunk must come first, right after the 12-byte header
+            chunk_length, chunk_type = struct.unpack_from('<I4s', glb, 12)
+            if chunk_type != b'JSON':
+                raise ValueError(f'{gltf_file_path} has no JSON chunk')
+            if 20 + chunk_length > len(glb):
+                raise ValueError(f'{gltf_file_path} is truncated')
+
+            return glb[20 : 20 + chunk_length]
+
+def load(gltf_file_path : Path) -> GltfMetadata:
+    return from_json_dict(json.loads(read_json_bytes(gltf_file_path)))
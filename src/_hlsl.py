@@ -12,25 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import abc, os, subprocess
+import abc, asyncio, os, subprocess
 from pathlib import Path
+from typing import List
 
-import _shader_base
+import _shader_base, _async_compile, _dxc_library, _trace
+from _compile_cache import get_tool_identity
 
 import _impl.ps as impl_ps
 import _impl.common as common
+import _impl.shared_include as shared_include
+import _impl._lights as _lights
+import _impl._precision as _precision
+from _impl.options import Options
+from _impl.vertex_data import VertexData
 
 from metashade.hlsl.util import dxc
 from metashade.glsl.util import glslang
 from metashade.util.tests import RefDiffer
-from metashade.util import spirv_cross
+from metashade.util import spirv_cross, perf
+
+_vk_target_env = 'vulkan1.1'
+
+def generate_shared_includes(
+    out_dir : Path,
+    ref_differ : RefDiffer,
+    options : Options = Options()
+) -> List[Path]:
+    '''
+    Generates the include files shared by all the vertex and pixel shaders
+    when `Options.shared_include` is set.
+    '''
+    include_paths = []
+    for for_ps in (False, True):
+        include_path = out_dir / shared_include.get_file_name(for_ps)
+        with perf.TimedScope(f'Generating {include_path} '), \
+            open(include_path, 'w') as include_file:
+            #
+            shared_include.generate(include_file, for_ps, options)
+
+        if ref_differ is not None:
+            with _trace.span('Ref diff', file = include_path.name):
+                ref_differ(include_path)
+
+        include_paths.append(include_path)
+    return include_paths
 
 class Shader(_shader_base.Shader):
-    @staticmethod
     @abc.abstractmethod
-    def _get_hlsl_profile() -> str:
+    def _get_hlsl_profile(self) -> str:
         pass
 
+    def _get_dxc_extra_args(self) -> List[str]:
+        return []
+
     @staticmethod
     def _get_src_extension() -> str:
         return 'hlsl'
@@ -44,63 +79,206 @@ class Shader(_shader_base.Shader):
     def _get_glslang_stage() -> str:
         pass
 
-    def _compile(self, ref_differ : RefDiffer) -> bool:
+    def _get_spirv_path(self) -> Path:
+        return self._src_path.parent / (self._src_path.name + '.spv')
+
+    def _get_glsl_path(self) -> Path:
+        return self._src_path.parent / (self._src_path.name + '.glsl')
+
+    def _is_glsl_validated(self) -> bool:
+        return self._options.get_pipeline_profile().glsl_validation
+
+    def _get_compiler_output_paths(self):
+        output_paths = [self._bin_path]
+        if self._is_glsl_validated():
+            output_paths += [self._get_spirv_path(), self._get_glsl_path()]
+        return output_paths
+
+    def _get_compile_key_fields(self):
+        extra_args = tuple(self._get_dxc_extra_args())
+        if not self._is_glsl_validated():
+            return (
+                common.entry_point_name,
+                self._get_hlsl_profile(),
+                'dxil',
+                self._get_dxc_identity()
+            ) + extra_args
+
+        return (
+            common.entry_point_name,
+            self._get_hlsl_profile(),
+            'dxil',
+            'spirv -O0',
+            self._get_glslang_stage(),
+            _vk_target_env,
+            self._get_dxc_identity(),
+            get_tool_identity('spirv-cross'),
+            get_tool_identity('glslang')
+        ) + extra_args
+
+    def _get_dxc_library(self) -> _dxc_library.DxcLibrary:
+        return _dxc_library.load() if self._options.dxc_library else None
+
+    def _get_dxc_identity(self) -> str:
+        dxc_library = self._get_dxc_library()
+        if dxc_library is not None:
+            return dxc_library.get_identity()
+        return get_tool_identity('dxc')
+
+    def _get_compiler_ref_paths(self) -> List[Path]:
+        return [self._get_glsl_path()] if self._is_glsl_validated() else []
+
+    def _get_include_paths(self) -> List[Path]:
+        if not self._options.shared_include:
+            return []
+        return [
+            self._src_path.parent / shared_include.get_file_name(
+                for_ps = self._is_pixel_shader
+            )
+        ]
+
+    def _compile(self) -> bool:
+        dxc_library = self._get_dxc_library()
         try:
             def dxc_compile(to_spirv, output_path):
-                dxc.compile(
-                    src_path = self._src_path,
-                    entry_point_name = common.entry_point_name,
-                    profile = self._get_hlsl_profile(),
-                    to_spirv = to_spirv,
-                    o0 = to_spirv,
-                    output_path = output_path
-                )
+                dxc_kwargs = {
+                    'src_path' : self._src_path,
+                    'entry_point_name' : common.entry_point_name,
+                    'profile' : self._get_hlsl_profile(),
+                    'to_spirv' : to_spirv,
+                    'o0' : to_spirv,
+                    'output_path' : output_path
+                }
+                extra_args = self._get_dxc_extra_args()
+                with _trace.span(
+                    'dxc SPIR-V' if to_spirv else 'dxc DXIL',
+                    shader = self._src_path.name
+                ):
+                    if dxc_library is not None:
+                        with perf.TimedScope(
+                            f'DXC library compiling {output_path}'
+                        ):
+                            dxc_library.compile(
+                                **dxc_kwargs, extra_args = extra_args
+                            )
+                    elif extra_args:
+                        # Metashade's wrapper doesn't take extra arguments
+                        with perf.TimedScope(f'DXC compiling {output_path}'):
+                            subprocess.run(
+                                _async_compile.dxc_args(
+                                    **dxc_kwargs, extra_args = extra_args
+                                ),
+                                check = True
+                            )
+                    else:
+                        dxc.compile(**dxc_kwargs)
 
             # Compile to DXIL for consumption by the DX12 host app
             dxc_compile(
                 to_spirv = False,
                 output_path = self._bin_path
             )
+            if not self._is_glsl_validated():
+                return True
 
             # Transpile to GLSL for reference while bringing up the GLSL
             # backend
-            spirv_path = self._src_path.parent / (self._src_path.name + '.spv')
+            spirv_path = self._get_spirv_path()
             dxc_compile(
                 to_spirv = True,
                 output_path = spirv_path
             )
 
-            glsl_path = self._src_path.parent / (self._src_path.name + '.glsl')
-            spirv_cross.spirv_to_glsl(
-                spirv_path = spirv_path,
-                glsl_path = glsl_path
+            glsl_path = self._get_glsl_path()
+            with _trace.span('spirv-cross', shader = self._src_path.name):
+                spirv_cross.spirv_to_glsl(
+                    spirv_path = spirv_path,
+                    glsl_path = glsl_path
+                )
+
+            with _trace.span('glslang', shader = self._src_path.name):
+                glslang.compile(
+                    src_path = glsl_path,
+                    target_env = _vk_target_env,
+                    shader_stage = self._get_glslang_stage(),
+                    output_path = os.devnull
+                )
+            
+            return True
+        except (subprocess.CalledProcessError, _dxc_library.CompileError):
+            return False
+
+    async def _compile_async(self, run_tool) -> bool:
+        def dxc_args(to_spirv, output_path):
+            return _async_compile.dxc_args(
+                src_path = self._src_path,
+                entry_point_name = common.entry_point_name,
+                profile = self._get_hlsl_profile(),
+                to_spirv = to_spirv,
+                o0 = to_spirv,
+                output_path = output_path,
+                extra_args = self._get_dxc_extra_args()
+            )
+
+        if not self._is_glsl_validated():
+            return await run_tool(
+                dxc_args(to_spirv = False, output_path = self._bin_path),
+                'dxc DXIL'
+            )
+
+        # The DXIL and SPIR-V compilations are independent of each other
+        spirv_path = self._get_spirv_path()
+        dxc_results = await asyncio.gather(
+            run_tool(
+                dxc_args(to_spirv = False, output_path = self._bin_path),
+                'dxc DXIL'
+            ),
+            run_tool(
+                dxc_args(to_spirv = True, output_path = spirv_path),
+                'dxc SPIR-V'
             )
+        )
+        if not all(dxc_results):
+            return False
 
-            if ref_differ is not None:
-                ref_differ(glsl_path)
+        glsl_path = self._get_glsl_path()
+        if not await run_tool(
+            _async_compile.spirv_cross_args(
+                spirv_path = spirv_path,
+                glsl_path = glsl_path
+            ),
+            'spirv-cross'
+        ):
+            return False
 
-            glslang.compile(
+        return await run_tool(
+            _async_compile.glslang_args(
                 src_path = glsl_path,
-                target_env = 'vulkan1.1',
+                target_env = _vk_target_env,
                 shader_stage = self._get_glslang_stage(),
                 output_path = os.devnull
-            )
-            
-            return True
-        except subprocess.CalledProcessError as err:
-            return False
+            ),
+            'glslang'
+        )
 
 class VertexShader(Shader):
-    def __init__(self, out_dir, vertex_data):
-        self._vertex_data = vertex_data
+    _is_pixel_shader = False
+
+    def __init__(
+        self,
+        out_dir,
+        vertex_data_desc : VertexData.Desc,
+        options : Options = Options()
+    ):
+        self._vertex_data = VertexData(vertex_data_desc)
         
         shader_name = common.filename_prefix
-        vd_id = vertex_data.get_id()
+        vd_id = self._vertex_data.get_id()
         if vd_id != '':
             shader_name += f'-{vd_id}'
         shader_name += '-VS'
 
-        super().__init__(out_dir, shader_name)
+        super().__init__(out_dir, shader_name, vertex_data_desc, options)
 
     @staticmethod
     def _get_hlsl_profile() -> str:
@@ -112,25 +290,40 @@ class VertexShader(Shader):
     
     def _generate(self, ref_differ):
         self._generate_wrapped(
-            self._vertex_data.generate_vs,
+            lambda vs_file: self._vertex_data.generate_vs(
+                vs_file, self._options
+            ),
             ref_differ
         )
 
 class PixelShader(Shader):
-    def __init__(self, out_dir, material, vertex_data):
-        self._ps_impl = impl_ps.ps(
-            material = material,
-            vertex_data = vertex_data
-        )
+    _is_pixel_shader = True
+
+    def __init__(
+        self,
+        out_dir,
+        ps_desc : impl_ps.ps.Desc,
+        options : Options = Options()
+    ):
+        self._ps_impl = impl_ps.ps(ps_desc, options)
         super().__init__(
             out_dir = out_dir,
-            shader_name = self._ps_impl.get_id()
+            shader_name = self._ps_impl.get_id(),
+            permutation = ps_desc,
+            options = options
         )
 
-    @staticmethod
-    def _get_hlsl_profile():
+    def _get_hlsl_profile(self):
+        # Native 16-bit types require shader model 6.2
+        if _precision.needs_16bit_types(self._options):
+            return 'ps_6_2'
         return 'ps_6_0'
 
+    def _get_dxc_extra_args(self) -> List[str]:
+        if _precision.needs_16bit_types(self._options):
+            return ['-enable-16bit-types']
+        return []
+
     @staticmethod
     def _get_glslang_stage() -> str:
         return 'frag'
@@ -140,3 +333,32 @@ class PixelShader(Shader):
             self._ps_impl.generate,
             ref_differ
         )
+
+class LightCullingShader(Shader):
+    '''
+    The compute shader building the per-tile light lists when
+    `Options.light_mode` is 'tiled'. It doesn't depend on the assets.
+    '''
+    def __init__(self, out_dir, permutation = None, options = Options()):
+        super().__init__(
+            out_dir = out_dir,
+            shader_name = f'{common.filename_prefix}-LightCulling-CS',
+            options = options
+        )
+
+    @staticmethod
+    def _get_hlsl_profile():
+        return 'cs_6_0'
+
+    @staticmethod
+    def _get_glslang_stage() -> str:
+        return 'comp'
+
+    def _get_include_paths(self) -> List[Path]:
+        return []
+
+    def _generate(self, ref_differ):
+        self._generate_wrapped(
+            _lights.generate_light_culling_cs,
+            ref_differ
+        )
@@ -0,0 +1,187 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Iteration over the lights in the pixel shader and the compute shader building
+the per-tile light lists for the tiled light mode.
+
+Metashade has no loop statements and no compute shader stage, so the loops
+and the compute shader are emitted as raw HLSL around the Metashade code.
+'''
+
+import contextlib
+
+from metashade.hlsl.sm6 import ps_6_0
+
+from . import common, _metashade_internals, _uniforms
+from .options import Options
+
+tile_size = 16
+max_lights_per_tile = 32
+
+# Each tile's list starts with the number of its lights
+_tile_list_stride = max_lights_per_tile + 1
+_tile_list_register = 10    # right after the shadow map
+_num_culling_threads = 64
+
+# The number of tile columns, shared by the pixel shaders and the culling
+# shader so that they agree on the layout of the lists. The screen width is
+# only known by its reciprocal, which is rounded back, as truncating it may
+# lose a pixel and with it the last column, e.g. for a width of 1921.
+_num_tiles_x = (
+    f'(uint(round(1.0 / g_fInvScreenResolution.x)) + {tile_size - 1}) '
+    f'/ {tile_size}'
+)
+
+def generate_uniforms(sh, options : Options):
+    if options.light_mode == 'tiled':
+        _metashade_internals.emit(
+            sh,
+            'StructuredBuffer<uint> g_tileLightLists : '
+            f'register(t{_tile_list_register});\n'
+        )
+
+def _get_light(sh):
+    # The loop variable is declared in raw HLSL
+    return sh.g_lights[_metashade_internals.raw_value(sh.Int, 'iLight')]
+
+@contextlib.contextmanager
+def for_each_light(sh, Pclip, options : Options):
+    '''
+    Emits a loop over the lights affecting the pixel and yields the light to
+    be used in the loop body. `Pclip` is the SV_Position input.
+    '''
+    if options.light_mode == 'loop':
+        with _metashade_internals.raw_block(
+            sh, 'for (int iLight = 0; iLight < g_nLights; ++iLight)'
+        ):
+            yield _get_light(sh)
+        return
+
+    if options.light_mode != 'tiled':
+        raise ValueError(f'Unsupported light mode: {options.light_mode}')
+
+    _metashade_internals.raw_statement(
+        sh, f'uint2 u2Tile = uint2({Pclip}.xy) / {tile_size}'
+    )
+    _metashade_internals.raw_statement(sh, f'uint nTilesX = {_num_tiles_x}')
+    _metashade_internals.raw_statement(
+        sh,
+        'uint iTileList = (u2Tile.y * nTilesX + u2Tile.x) * '
+        f'{_tile_list_stride}'
+    )
+    _metashade_internals.raw_statement(
+        sh, 'uint nTileLights = g_tileLightLists[iTileList]'
+    )
+    with _metashade_internals.raw_block(
+        sh,
+        'for (uint iTileLight = 0; iTileLight < nTileLights; ++iTileLight)'
+    ):
+        _metashade_internals.raw_statement(
+            sh, 'uint iLight = g_tileLightLists[iTileList + 1 + iTileLight]'
+        )
+        yield _get_light(sh)
+
+_light_culling_kernel = '''
+RWStructuredBuffer<uint> g_rwTileLightLists : register(u0);
+
+groupshared uint gs_nTileLights;
+
+// Tests the bounding sphere of the light against the tile's rectangle in
+// normalized device coordinates, conservatively
+bool isLightInTile(Light light, float2 f2TileMinNdc, float2 f2TileMaxNdc)
+{
+	float4 p4Clip = mul(g_VpXf, float4(light.Pw, 1.0));
+	if (p4Clip.w <= light.fRange)
+	{
+		// The camera is close to or inside the sphere
+		return p4Clip.w > -light.fRange;
+	}
+
+	float2 f2CenterNdc = p4Clip.xy / p4Clip.w;
+	float2 f2RadiusNdc = (light.fRange / p4Clip.w)
+		* float2(length(g_VpXf[0].xyz), length(g_VpXf[1].xyz));
+	return all(f2CenterNdc + f2RadiusNdc >= f2TileMinNdc)
+		&& all(f2CenterNdc - f2RadiusNdc <= f2TileMaxNdc);
+}
+
+[numthreads({num_threads}, 1, 1)]
+void {entry_point_name}(
+	uint3 u3GroupId : SV_GroupID,
+	uint iThread : SV_GroupIndex
+)
+{
+	if (iThread == 0)
+	{
+		gs_nTileLights = 0;
+	}
+	GroupMemoryBarrierWithGroupSync();
+
+	uint nTilesX = {num_tiles_x};
+
+	// The tiles are numbered from the top, while the NDC y axis points up
+	float2 f2TileMinPx = float2(u3GroupId.xy * {tile_size});
+	float2 f2TileMaxPx = f2TileMinPx + {tile_size};
+	float2 f2NdcScale = g_fInvScreenResolution * float2(2.0, -2.0);
+	float2 f2TileMinNdc = float2(f2TileMinPx.x, f2TileMaxPx.y) * f2NdcScale
+		+ float2(-1.0, 1.0);
+	float2 f2TileMaxNdc = float2(f2TileMaxPx.x, f2TileMinPx.y) * f2NdcScale
+		+ float2(-1.0, 1.0);
+
+	uint iTileList = (u3GroupId.y * nTilesX + u3GroupId.x) * {tile_list_stride};
+	for (uint iLight = iThread; iLight < uint(g_nLights); iLight += {num_threads})
+	{
+		if (isLightInTile(g_lights[iLight], f2TileMinNdc, f2TileMaxNdc))
+		{
+			uint iSlot;
+			InterlockedAdd(gs_nTileLights, 1, iSlot);
+			if (iSlot < {max_lights_per_tile})
+			{
+				g_rwTileLightLists[iTileList + 1 + iSlot] = iLight;
+			}
+		}
+	}
+	GroupMemoryBarrierWithGroupSync();
+
+	if (iThread == 0)
+	{
+		g_rwTileLightLists[iTileList] = min(gs_nTileLights, {max_lights_per_tile});
+	}
+}
+'''
+
+def generate_light_culling_cs(cs_file):
+    '''
+    The compute shader to dispatch with a thread group per tile, which writes
+    the indices of the lights overlapping each tile to its list
+    '''
+    # Only used to emit the declarations shared with the pixel shaders
+    sh = ps_6_0.Generator(
+        cs_file,
+        # the host app supplies transposed matrix uniforms
+        matrix_post_multiplication = True
+    )
+    _uniforms.generate_per_frame(sh)
+
+    kernel = _light_culling_kernel
+    for name, value in {
+        'entry_point_name' : common.entry_point_name,
+        'num_threads' : _num_culling_threads,
+        'tile_size' : tile_size,
+        'num_tiles_x' : _num_tiles_x,
+        'tile_list_stride' : _tile_list_stride,
+        'max_lights_per_tile' : max_lights_per_tile
+    }.items():
+        kernel = kernel.replace(f'{{{name}}}', str(value))
+    _metashade_internals.emit(sh, kernel)
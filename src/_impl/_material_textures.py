@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, NamedTuple
+from typing import Any, NamedTuple, Tuple
 from . import common
 
 class MaterialTextures:
@@ -20,44 +20,40 @@ class MaterialTextures:
         texel_dtype_name : str
         uv_set_idx : int
 
-    def __init__(self, material):
-        self._texture_defs = dict()
-        id_dict = dict()
-
-        def _define(
-            parent,
-            name: str,
-            id : str,
-            texel_dtype_name = None
-        ):
+    # The IDs used in shader names and the texel types of the glTF textures
+    _texture_ids_and_dtypes = {
+        'normal'            : ('n', 'Vector4f'),
+        'occlusion'         : ('o', None),
+        'emissive'          : ('e', 'RgbaF'),
+        'baseColor'         : ('bc', 'RgbaF'),
+        'metallicRoughness' : ('mr', 'RgbaF')
+    }
+
+    class Desc(NamedTuple):
+        '''
+        Pairs of glTF texture names and UV set indices
+        '''
+        uv_sets : Tuple[Tuple[str, int], ...]
+
+    @classmethod
+    def describe(cls, material) -> Desc:
+        uv_sets = []
+
+        def _define(parent, name: str):
             gltf_texture = getattr(parent, name + 'Texture')
             if gltf_texture is not None:
                 uv_set_idx = gltf_texture.texCoord
                 if uv_set_idx is None:
                     uv_set_idx = 0
+                uv_sets.append((name, uv_set_idx))
 
-                self._texture_defs[name] = self._TextureDef(
-                    texel_dtype_name, uv_set_idx
-                )
-
-                if id in id_dict:
-                    raise RuntimeError(f'Material texture IDs must be unique')
-                id_dict[id] = uv_set_idx
-
-        _define(material, 'normal', 'n', 'Vector4f')
-        _define(material, 'occlusion', 'o')
-        _define(material, 'emissive', 'e', 'RgbaF')
+        _define(material, 'normal')
+        _define(material, 'occlusion')
+        _define(material, 'emissive')
 
         if material.pbrMetallicRoughness is not None:
-            _define(
-                material.pbrMetallicRoughness, 'baseColor', 'bc', 'RgbaF'
-            )
-            _define(
-                material.pbrMetallicRoughness,
-                'metallicRoughness',
-                'mr',
-                'RgbaF'
-            )
+            _define(material.pbrMetallicRoughness, 'baseColor')
+            _define(material.pbrMetallicRoughness, 'metallicRoughness')
         elif material.extensions is not None:
             specularGlossiness = \
                 material.extensions.KHR_materials_pbrSpecularGlossiness
@@ -66,6 +62,19 @@ class MaterialTextures:
                     ('KHR_materials_pbrSpecularGlossiness '
                      'is not implemented yet, '
                     'see https://github.com/metashade/metashade/issues/18')
+
+        return cls.Desc(uv_sets = tuple(uv_sets))
+
+    def __init__(self, desc : Desc):
+        self._texture_defs = dict()
+        id_dict = dict()
+
+        for name, uv_set_idx in desc.uv_sets:
+            id, texel_dtype_name = self._texture_ids_and_dtypes[name]
+            self._texture_defs[name] = self._TextureDef(
+                texel_dtype_name, uv_set_idx
+            )
+            id_dict[id] = uv_set_idx
             
         self._id = '_'.join([
             f'{id}{uv_set_idx}' for id, uv_set_idx
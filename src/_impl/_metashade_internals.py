@@ -0,0 +1,129 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+The only module relying on the internals of Metashade, for what its public
+API doesn't cover yet. The internals are checked on import, so that a
+Metashade update changing them fails here with a clear message rather than
+generating broken shaders.
+'''
+
+import contextlib, io
+
+import metashade
+from metashade.hlsl.sm6 import dtypes, ps_6_0
+
+def _check_attrs(owner, attr_names):
+    missing_attr_names = [
+        attr_name for attr_name in attr_names
+        if not hasattr(owner, attr_name)
+    ]
+    if missing_attr_names:
+        raise ImportError(
+            'Unsupported Metashade version '
+            f'{getattr(metashade, "__version__", "(unknown)")}: '
+            f'{owner.__name__} has no {", ".join(missing_attr_names)}'
+        )
+
+# The generators emit the code with `_emit()`, which writes to `_file`
+_check_attrs(
+    ps_6_0.Generator, ('_emit', '_emit_indent', '_push_indent', '_pop_indent')
+)
+# The dtypes are substituted with subclasses emitted as other HLSL types
+_check_attrs(ps_6_0.Generator, ('_DtypeFactory',))
+_check_attrs(dtypes.RgbF, ('_target_name', '_get_value_ref', '_dim'))
+
+def emit(sh, code : str):
+    '''
+    Emits raw HLSL for what Metashade can't generate yet, such as loops,
+    statements with out parameters, buffers and compute shaders. Each line
+    is indented to the current scope.
+    '''
+    for line in code.splitlines():
+        if line:
+            sh._emit_indent()
+        sh._emit(f'{line}\n')
+
+def raw_statement(sh, statement : str):
+    emit(sh, f'{statement};')
+
+@contextlib.contextmanager
+def raw_block(sh, header : str):
+    '''
+    Emits a block statement with a raw header, such as a loop, with the code
+    generated within the scope as its body
+    '''
+    emit(sh, f'{header}\n{{')
+    sh._push_indent()
+    try:
+        yield
+    finally:
+        sh._pop_indent()
+        emit(sh, '}')
+
+def raw_value(dtype_factory, expression : str):
+    '''
+    A value of the Metashade type created by `dtype_factory`, e.g.
+    `sh.Float4`, with a raw HLSL expression, which can refer to the symbols
+    emitted with `emit()`
+    '''
+    return dtype_factory(expression)
+
+@contextlib.contextmanager
+def discard_output(sh):
+    '''
+    Discards the code emitted by `sh` within the scope, while still defining
+    the symbols in it. Metashade has no way to declare symbols without
+    defining them.
+    '''
+    if '_file' not in vars(sh):
+        raise RuntimeError('Unsupported Metashade version: no generator file')
+
+    file, sh._file = sh._file, io.StringIO()
+    try:
+        yield
+    finally:
+        sh._file = file
+
+def derive_vector_dtype(dtype, type_prefix : str):
+    '''
+    A subclass of the Metashade vector type `dtype` emitted as the HLSL
+    vector type starting with `type_prefix`, e.g. `min16float3`, which must
+    convert implicitly to and from the HLSL type of `dtype`. The values of
+    `dtype` are accepted as they are.
+    '''
+    base_dtype = dtype
+
+    def _get_value_ref(cls, value):
+        if isinstance(value, base_dtype):
+            return value
+        return super(cls, cls)._get_value_ref(value)
+
+    return type(
+        dtype.__name__,
+        (dtype,),
+        {
+            # Metashade looks up the related types in the module of the dtype
+            '__module__' : dtype.__module__,
+            '_target_name' : f'{type_prefix}{dtype._dim}',
+            '_get_value_ref' : classmethod(_get_value_ref)
+        }
+    )
+
+def set_dtype(sh, name : str, dtype):
+    '''
+    Makes `sh.<name>()` create values of `dtype` for the rest of the
+    generation
+    '''
+    setattr(sh, name, sh._DtypeFactory(sh, dtype))
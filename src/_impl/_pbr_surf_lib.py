@@ -1,6 +1,7 @@
 """
 Common PBR surface functions that don't change with permutations.
-TODO: generate once and include in all pixel shaders.
+Generated into every pixel shader, or once per run into the shared include
+with `Options.shared_include`.
 """
 
 # Copyright 2020 Pavlo Penenko
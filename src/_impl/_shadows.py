@@ -0,0 +1,115 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+'''
+The filters of the shadow map lookups, generated into `getPcfShadow()`.
+'''
+
+import math
+
+from . import _metashade_internals
+from .options import Options
+
+# Poisson disk points within the unit circle
+_poisson_disk = (
+    (-0.9406, -0.3989), ( 0.9456, -0.7689), (-0.0942, -0.9294),
+    ( 0.3450,  0.2939), (-0.9159,  0.4577), (-0.3828,  0.2768),
+    ( 0.4430, -0.9751), ( 0.5374, -0.4737)
+)
+
+# The radius of the Poisson disk in shadow map texels, covering about the same
+# area as the 5x5 kernel
+_poisson_radius = 2.0
+
+# The kernels extend this many texels in each direction from the center
+_kernel_levels = {'pcf1x1' : 0, 'pcf3x3' : 1, 'pcf5x5' : 2}
+
+def _generate_kernel(sh, kernel_level : int):
+    sh.fResult = sh.Float(0)
+
+    # Unrolling the loop right here in Metashade
+    for i in range(-kernel_level, kernel_level + 1):
+        for j in range(-kernel_level, kernel_level + 1):
+            sh.fResult += (sh.g_sShadowMap @ sh.g_tShadowMap)(
+                tex_coord = sh.uv,
+                offset = sh.Int2((i, j)),
+                cmp_value = sh.fCompareValue,
+                lod = 0
+            )
+
+    kernel_width = 2 * kernel_level + 1
+    sh.fResult /= kernel_width * kernel_width
+    sh.return_(sh.fResult)
+
+def _generate_gather(sh):
+    '''
+    Four fetches of 2x2 comparisons each, covering 4x4 texels
+    '''
+    sh.f4Result = sh.Float4(0.0)
+    for i in (-1, 1):
+        for j in (-1, 1):
+            # Metashade doesn't support gathering
+            sh.f4Result += _metashade_internals.raw_value(
+                sh.Float4,
+                f'{sh.g_tShadowMap}.GatherCmp({sh.g_sShadowMap}, {sh.uv}, '
+                f'{sh.fCompareValue}, {sh.Int2((i, j))})'
+            )
+    sh.return_(sh.f4Result.dot(sh.Float4(1.0 / 16)))
+
+def _generate_poisson(sh):
+    '''
+    Taps on a Poisson disk, rotated randomly per pixel in order to trade
+    banding for noise
+    '''
+    sh.f2ShadowMapSize = sh.Float2(0.0)
+    # Metashade has no texture queries
+    _metashade_internals.raw_statement(
+        sh,
+        f'{sh.g_tShadowMap}.GetDimensions('
+        f'{sh.f2ShadowMapSize}.x, {sh.f2ShadowMapSize}.y)'
+    )
+    sh.f2Radius = sh.Float2(_poisson_radius) / sh.f2ShadowMapSize
+
+    sh.fAngle = (
+        sh.uv.dot(sh.Float2((12.9898, 78.233))).sin() * sh.Float(43758.5453)
+    ).frac() * sh.Float(2.0 * math.pi)
+    sh.fCos = sh.fAngle.cos()
+    sh.fSin = sh.fAngle.sin()
+    sh.f2AxisX = sh.Float2((sh.fCos, sh.fSin)) * sh.f2Radius
+    sh.f2AxisY = sh.Float2((-sh.fSin, sh.fCos)) * sh.f2Radius
+
+    sh.fResult = sh.Float(0)
+    for x, y in _poisson_disk:
+        sh.fResult += (sh.g_sShadowMap @ sh.g_tShadowMap)(
+            tex_coord = sh.uv + sh.f2AxisX * sh.Float(x)
+                + sh.f2AxisY * sh.Float(y),
+            cmp_value = sh.fCompareValue,
+            lod = 0
+        )
+    sh.fResult /= len(_poisson_disk)
+    sh.return_(sh.fResult)
+
+def generate(sh, options : Options):
+    with sh.function('getPcfShadow', sh.Float)(
+        uv = sh.Float2,
+        fCompareValue = sh.Float
+    ):
+        shadow_filter = options.shadow_filter
+        if shadow_filter == 'gather':
+            _generate_gather(sh)
+        elif shadow_filter == 'poisson':
+            _generate_poisson(sh)
+        else:
+            _generate_kernel(sh, kernel_level = _kernel_levels[shadow_filter])
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from .options import Options
+
 def _generate_per_frame_uniform_buffer(sh):
     sh.struct('Light')(
         VpXf = sh.Matrix4x4f,
@@ -44,8 +46,17 @@ def _generate_per_frame_uniform_buffer(sh):
         sh.uniform('g_nLights',                 sh.Int)
         sh.uniform('g_lodBias',                 sh.Float)
 
-def _generate_per_object_uniform_buffer(sh, for_ps : bool):
+def _generate_per_object_uniform_buffer(
+    sh,
+    for_ps : bool,
+    options : Options
+):
     if for_ps:
+        if options.alpha_cutoff_mode == 'uniform':
+            padding = {'fAlphaCutoff' : sh.Float, 'fPadding' : sh.Float}
+        else:
+            padding = {'f2Padding' : sh.Float2}
+
         sh.struct('PbrFactors')(
             rgbaEmissive = sh.RgbaF,
 
@@ -54,7 +65,7 @@ def _generate_per_object_uniform_buffer(sh, for_ps : bool):
             fMetallic = sh.Float,
             fRoughness = sh.Float,
 
-            f2Padding = sh.Float2,
+            **padding,
 
             # KHR_materials_pbrSpecularGlossiness
             rgbaDiffuse = sh.RgbaF,
@@ -68,6 +79,9 @@ def _generate_per_object_uniform_buffer(sh, for_ps : bool):
         if for_ps:
             sh.uniform('g_perObjectPbrFactors', sh.PbrFactors)
 
-def generate(sh, for_ps : bool):
+def generate_per_frame(sh):
+    _generate_per_frame_uniform_buffer(sh)
+
+def generate(sh, for_ps : bool, options : Options = Options()):
     _generate_per_frame_uniform_buffer(sh)
-    _generate_per_object_uniform_buffer(sh, for_ps)
+    _generate_per_object_uniform_buffer(sh, for_ps, options)
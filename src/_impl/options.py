@@ -0,0 +1,107 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List, NamedTuple
+
+class PipelineProfile(NamedTuple):
+    '''
+    The stages of the pipeline that run for the shaders of each target
+    '''
+    # HLSL shaders compiled to DXIL for the DX12 host app
+    dx12 : bool
+
+    # GLSL shaders compiled to SPIR-V for the Vulkan host app
+    vulkan : bool
+
+    # The HLSL shaders are also compiled to SPIR-V, transpiled to GLSL with
+    # spirv-cross and validated with glslang, for reference while bringing up
+    # the GLSL backend
+    glsl_validation : bool
+
+    def get_tool_names(self) -> List[str]:
+        '''
+        The compilers run by the stages, which are the only ones needed
+        '''
+        tool_names = []
+        if self.dx12 or self.glsl_validation:
+            tool_names.append('dxc')
+        if self.glsl_validation:
+            tool_names.append('spirv-cross')
+        if self.vulkan or self.glsl_validation:
+            tool_names.append('glslang')
+        return tool_names
+
+pipeline_profiles = {
+    'full-validation' : PipelineProfile(
+        dx12 = True, vulkan = True, glsl_validation = True
+    ),
+    'dx12-only' : PipelineProfile(
+        dx12 = True, vulkan = False, glsl_validation = False
+    ),
+    'vulkan-only' : PipelineProfile(
+        dx12 = False, vulkan = True, glsl_validation = False
+    )
+}
+
+class Options(NamedTuple):
+    '''
+    Code generation options applying to all the shaders generated in a run.
+    The defaults reproduce the test references.
+    '''
+    # Generate the uniforms and the PBR surface library once per run and
+    # #include them in every vertex and pixel shader
+    shared_include : bool = False
+
+    # 'baked' compiles the alpha cutoff of masked materials into the pixel
+    # shader as a literal, resulting in a permutation per distinct value.
+    # 'uniform' reads it from the per-object PbrFactors instead, in the slot
+    # otherwise taken by padding, which the host app needs to fill in.
+    alpha_cutoff_mode : str = 'baked'
+
+    # Rounds the baked alpha cutoffs to multiples of this step, if specified
+    alpha_cutoff_step : float = None
+
+    # Omit the multiplications by the material factors that are at their
+    # identities, such as a base color factor of 1, and the emissive term
+    # if its factor is 0, resulting in a permutation per combination
+    bake_identity_factors : bool = False
+
+    # Compile HLSL in-process through the dxcompiler library, loaded once
+    # per worker, instead of launching dxc for every compilation. Falls back
+    # to dxc if the library isn't found. Not used by the asyncio backend.
+    dxc_library : bool = False
+
+    # One of `pipeline_profiles`, which decides which shaders are generated
+    # and which compilation stages run for them
+    pipeline_profile : str = 'full-validation'
+
+    # 'single' shades with the first light only. 'loop' loops over all the
+    # lights in the pixel shader. 'tiled' loops over the lights in the
+    # per-tile lists written by the light culling compute shader, which is
+    # generated as well.
+    light_mode : str = 'single'
+
+    # The filter of the shadow map lookups: 'pcf1x1', 'pcf3x3' or 'pcf5x5'
+    # kernels of comparison samples, 'gather' with four GatherCmp fetches
+    # covering 4x4 texels, or 'poisson' with 8 samples on a Poisson disk
+    # rotated per pixel
+    shadow_filter : str = 'pcf5x5'
+
+    # The precision of the color, BRDF and IBL computations in the pixel
+    # shaders: 'float', 'min16float' or 'float16', the latter requiring
+    # shader model 6.2 and native 16-bit types
+    color_precision : str = 'float'
+
+    def get_pipeline_profile(self) -> PipelineProfile:
+        return pipeline_profiles[self.pipeline_profile]
@@ -12,26 +12,97 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, NamedTuple
+from typing import Any, NamedTuple, Tuple
 
 from metashade.hlsl.sm6 import ps_6_0
 from metashade.glsl import frag
 
-from . import common, _pbr_surf_lib, _uniforms
+from . import common, shared_include
+from . import _lights, _pbr_surf_lib, _precision, _shadows, _uniforms
 from ._material_textures import MaterialTextures
+from .options import Options
 from .vertex_data import VertexData
 
 class ps:
-    def __init__(
-        self,
+    class Desc(NamedTuple):
+        '''
+        The pixel shader permutation
+        '''
+        vertex_data : VertexData.Desc
+        material_textures : MaterialTextures.Desc
+        alpha_mode : str
+        alpha_cutoff : float
+        # The codes of the factors at their identities, if baked
+        identity_factors : Tuple[str, ...] = ()
+
+    @classmethod
+    def describe(
+        cls,
         material,
-        vertex_data : VertexData
-    ):
-        self._vertex_data = vertex_data
-        self._material_textures = MaterialTextures(material)
+        vertex_data : VertexData.Desc,
+        options : Options = Options()
+    ) -> Desc:
+        # Only masked materials with a baked cutoff permute on its value
+        alpha_cutoff = None
+        if ( material.alphaMode == 'MASK'
+            and options.alpha_cutoff_mode == 'baked'
+        ):
+            alpha_cutoff = material.alphaCutoff
+            if alpha_cutoff is None:
+                alpha_cutoff = 0.5 # the default per the glTF spec
+
+            step = options.alpha_cutoff_step
+            if step is not None:
+                # The outer rounding drops the floating point noise from the
+                # shader names
+                alpha_cutoff = round(round(alpha_cutoff / step) * step, 6)
+
+        identity_factors = ()
+        if options.bake_identity_factors:
+            identity_factors = cls._get_identity_factors(material)
+
+        return cls.Desc(
+            vertex_data = vertex_data,
+            material_textures = MaterialTextures.describe(material),
+            alpha_mode = material.alphaMode,
+            alpha_cutoff = alpha_cutoff,
+            identity_factors = identity_factors
+        )
+
+    @staticmethod
+    def _get_identity_factors(material) -> Tuple[str, ...]:
+        pbr = material.pbrMetallicRoughness
+
+        def is_identity(factor, identity) -> bool:
+            # Omitted factors take their defaults, which are the identities
+            if factor is None:
+                return True
+            if isinstance(identity, list):
+                return list(factor) == identity
+            return factor == identity
+
+        return tuple(
+            code for code, factor, identity in (
+                (
+                    'bc',
+                    None if pbr is None else pbr.baseColorFactor,
+                    [1.0, 1.0, 1.0, 1.0]
+                ),
+                ('m', None if pbr is None else pbr.metallicFactor, 1.0),
+                ('r', None if pbr is None else pbr.roughnessFactor, 1.0),
+                ('e', material.emissiveFactor, [0.0, 0.0, 0.0])
+            )
+            if is_identity(factor, identity)
+        )
+
+    def __init__(self, desc : Desc, options : Options = Options()):
+        self._options = options
+        self._vertex_data = VertexData(desc.vertex_data)
+        self._material_textures = MaterialTextures(desc.material_textures)
 
-        self._alpha_mode = material.alphaMode
-        self._alpha_cutoff = material.alphaCutoff
+        self._alpha_mode = desc.alpha_mode
+        self._alpha_cutoff = desc.alpha_cutoff
+        self._identity_factors = desc.identity_factors
 
     def get_id(self) -> str:
         shader_name = common.filename_prefix
@@ -40,13 +111,22 @@ class ps:
             if self._alpha_mode == 'BLEND':
                 return self._alpha_mode
             elif self._alpha_mode == 'MASK':
+                if self._alpha_cutoff is None:
+                    # Read from the uniforms
+                    return self._alpha_mode
                 return f'{self._alpha_mode}{self._alpha_cutoff}'
             else:
                 return ''
 
+        def get_identity_factors_id():
+            if not self._identity_factors:
+                return ''
+            return 'I' + '_'.join(self._identity_factors)
+
         for id in (
             self._vertex_data.get_id(),
             self._material_textures.get_id(),
+            get_identity_factors_id(),
             get_alpha_mode_id()
         ):
             if id != '':
@@ -62,13 +142,22 @@ class ps:
             matrix_post_multiplication = True
         )
 
-        _uniforms.generate(sh, for_ps = True)
+        if self._options.shared_include:
+            shared_include.include(
+                sh, for_ps = True, options = self._options
+            )
+        else:
+            _uniforms.generate(sh, for_ps = True, options = self._options)
+
         self._vertex_data.generate_vs_out(sh)
 
         with sh.ps_output('PsOut') as PsOut:
             PsOut.SV_Target('rgbaColor', sh.RgbaF)
 
-        _pbr_surf_lib.generate(sh)
+        if not self._options.shared_include:
+            with _precision.colors(sh, self._options):
+                _pbr_surf_lib.generate(sh)
+
         self._material_textures.generate_uniforms(sh)
 
         # continuing right after the material textures
@@ -96,12 +185,17 @@ class ps:
         shadow_map_register = 9
         sh.uniform('g_tShadowMap', sh.Texture2d, dx_register = shadow_map_register)
         sh.uniform('g_sShadowMap', sh.SamplerCmp, dx_register = shadow_map_register)
+        _lights.generate_uniforms(sh, self._options)
+
+        # The uniforms and the stage interface above keep the full precision
+        _precision.set_colors(sh, self._options)
 
         with sh.function('metallicRoughness', sh.PbrParams)(psIn = sh.VsOut):
             sh.rgbaBaseColor = (sh.g_sBaseColor @ sh.g_tBaseColor)(
                 sh.psIn.uv0, lod_bias = sh.g_lodBias
             )
-            sh.rgbaBaseColor *= sh.g_perObjectPbrFactors.rgbaBaseColor
+            if 'bc' not in self._identity_factors:
+                sh.rgbaBaseColor *= sh.g_perObjectPbrFactors.rgbaBaseColor
             
             if hasattr(sh.psIn, 'rgbaColor0'):
                 sh.rgbaBaseColor *= sh.psIn.rgbaColor0
@@ -109,11 +203,20 @@ class ps:
             if self._alpha_mode == 'BLEND':
                 sh.rgbaBaseColor.a.clip()
             elif self._alpha_mode == 'MASK':
-                sh.fAlphaCutoff = sh.Float(float(self._alpha_cutoff))
+                if self._alpha_cutoff is None:
+                    sh.fAlphaCutoff = sh.g_perObjectPbrFactors.fAlphaCutoff
+                else:
+                    sh.fAlphaCutoff = sh.Float(float(self._alpha_cutoff))
                 (sh.rgbaBaseColor.a - sh.fAlphaCutoff).clip()
             
-            sh.fPerceptualRoughness = sh.g_perObjectPbrFactors.fRoughness
-            sh.fMetallic = sh.g_perObjectPbrFactors.fMetallic
+            sh.fPerceptualRoughness = (
+                sh.Float(1.0) if 'r' in self._identity_factors
+                else sh.g_perObjectPbrFactors.fRoughness
+            )
+            sh.fMetallic = (
+                sh.Float(1.0) if 'm' in self._identity_factors
+                else sh.g_perObjectPbrFactors.fMetallic
+            )
 
             metallicRoughnessSample = self._material_textures.sample_texture(
                 sh, 'metallicRoughness'
@@ -137,26 +240,7 @@ class ps:
             sh.pbrParams.fOpacity = sh.rgbaBaseColor.a
             sh.return_(sh.pbrParams)
 
-        with sh.function('getPcfShadow', sh.Float)(
-            uv = sh.Float2,
-            fCompareValue = sh.Float
-        ):
-            sh.fResult = sh.Float(0)
-            kernel_level = 2
-
-            # Unrolling the loop right here in Metashade
-            for i in range(-kernel_level, kernel_level + 1):
-                for j in range(-kernel_level, kernel_level + 1):
-                    sh.fResult += (sh.g_sShadowMap @ sh.g_tShadowMap)(
-                        tex_coord = sh.uv,
-                        offset = sh.Int2((i, j)),
-                        cmp_value = sh.fCompareValue,
-                        lod = 0
-                    )
-
-            kernel_width = 2 * kernel_level + 1
-            sh.fResult /= kernel_width * kernel_width
-            sh.return_(sh.fResult)
+        _shadows.generate(sh, self._options)
 
         with sh.function('getSpotShadow', sh.Float)(
             light = sh.Light, Pw = sh.Point3f
@@ -275,13 +359,26 @@ class ps:
             sh.psOut = sh.PsOut()
             sh.psOut.rgbaColor.a = sh.pbrParams.fOpacity
 
-            sh.psOut.rgbaColor.rgb = sh.applySpotLight(
-                light = sh.g_lights[0],
-                Pw = sh.psIn.Pw,
-                Nw = sh.Nw,
-                Vw = sh.Vw,
-                pbrParams = sh.pbrParams
-            )
+            if self._options.light_mode == 'single':
+                sh.psOut.rgbaColor.rgb = sh.applySpotLight(
+                    light = sh.g_lights[0],
+                    Pw = sh.psIn.Pw,
+                    Nw = sh.Nw,
+                    Vw = sh.Vw,
+                    pbrParams = sh.pbrParams
+                )
+            else:
+                sh.psOut.rgbaColor.rgb = sh.RgbF(0.0)
+                with _lights.for_each_light(
+                    sh, sh.psIn.Pclip, self._options
+                ) as light:
+                    sh.psOut.rgbaColor.rgb += sh.applySpotLight(
+                        light = light,
+                        Pw = sh.psIn.Pw,
+                        Nw = sh.Nw,
+                        Vw = sh.Vw,
+                        pbrParams = sh.pbrParams
+                    )
             
             sh.psOut.rgbaColor.rgb += sh.getIbl(
                 pbrParams = sh.pbrParams,
@@ -293,13 +390,16 @@ class ps:
             if aoSample is not None:
                 sh.psOut.rgbaColor.rgb *= aoSample.x
 
-            sh.rgbEmissive = ( sh.g_perObjectPbrFactors.rgbaEmissive.rgb
-                * sh.g_fPerFrameEmissiveFactor
-            )
-            emissiveSample = self._material_textures.sample_texture(sh, 'emissive')
-            if emissiveSample is not None:
-                sh.rgbEmissive *= emissiveSample.rgb
-            sh.psOut.rgbaColor.rgb += sh.rgbEmissive
+            if 'e' not in self._identity_factors:
+                sh.rgbEmissive = ( sh.g_perObjectPbrFactors.rgbaEmissive.rgb
+                    * sh.g_fPerFrameEmissiveFactor
+                )
+                emissiveSample = self._material_textures.sample_texture(
+                    sh, 'emissive'
+                )
+                if emissiveSample is not None:
+                    sh.rgbEmissive *= emissiveSample.rgb
+                sh.psOut.rgbaColor.rgb += sh.rgbEmissive
 
             sh.return_(sh.psOut)
 
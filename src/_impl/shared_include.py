@@ -0,0 +1,51 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+The code that doesn't change with permutations, generated once per run into
+include files shared by all the vertex or pixel shaders.
+'''
+
+from metashade.hlsl.sm6 import ps_6_0, vs_6_0
+
+from . import common, _metashade_internals, _pbr_surf_lib, _precision
+from . import _uniforms
+from .options import Options
+
+def get_file_name(for_ps : bool) -> str:
+    return f'{common.filename_prefix}-{"PS" if for_ps else "VS"}.hlsli'
+
+def _generate_declarations(sh, for_ps : bool, options : Options):
+    _uniforms.generate(sh, for_ps = for_ps, options = options)
+    if for_ps:
+        with _precision.colors(sh, options):
+            _pbr_surf_lib.generate(sh)
+
+def generate(include_file, for_ps : bool, options : Options = Options()):
+    generator_module = ps_6_0 if for_ps else vs_6_0
+    sh = generator_module.Generator(
+        include_file,
+        # the host app supplies transposed matrix uniforms
+        matrix_post_multiplication = True
+    )
+    _generate_declarations(sh, for_ps, options)
+
+def include(sh, for_ps : bool, options : Options = Options()):
+    '''
+    Emits the #include directive and defines the included symbols in the
+    generator without emitting their code again.
+    '''
+    sh.include(get_file_name(for_ps))
+    with _metashade_internals.discard_output(sh):
+        _generate_declarations(sh, for_ps, options)
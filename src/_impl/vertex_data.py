@@ -13,10 +13,11 @@
 # limitations under the License.
 
 from collections import OrderedDict
-from typing import NamedTuple
+from typing import NamedTuple, Tuple
 
 from metashade.hlsl.sm6 import vs_6_0
-from . import common, _uniforms
+from . import common, shared_include, _uniforms
+from .options import Options
 
 class VertexData:
     class _PassthruAttrDef(NamedTuple):
@@ -24,7 +25,27 @@ class VertexData:
         hlsl_semantic : str
         dtype : str
 
-    def __init__(self, primitive):
+    _passthru_attr_defs = OrderedDict((
+        ('uv0', _PassthruAttrDef(
+            'TEXCOORD_0',   'texCoord', 'Point2f'
+        )),
+        ('uv1', _PassthruAttrDef(
+            'TEXCOORD_1',   'texCoord', 'Point2f'
+        )),
+        ('rgbaColor0', _PassthruAttrDef(
+            'COLOR_0',     'color',     'RgbaF'
+        ))
+    ))
+
+    class Desc(NamedTuple):
+        '''
+        The vertex attributes of the primitive
+        '''
+        has_tangent : bool
+        passthru_attrs : Tuple[str, ...]
+
+    @classmethod
+    def describe(cls, primitive) -> Desc:
         gltf_attrs = primitive.attributes
 
         for mandatory_attr in ('POSITION', 'NORMAL'):
@@ -35,22 +56,25 @@ class VertexData:
             if getattr(gltf_attrs, unsupported_attr) is not None:
                 raise RuntimeError(f"Unsupported attribute '{unsupported_attr}'")
 
-        self._has_tangent = gltf_attrs.TANGENT is not None
-
-        self._passthru_attrs = OrderedDict()
-        for sl_name, attr_def in (
-            ('uv0', self._PassthruAttrDef(
-                'TEXCOORD_0',   'texCoord', 'Point2f'
-            )),
-            ('uv1', self._PassthruAttrDef(
-                'TEXCOORD_1',   'texCoord', 'Point2f'
-            )),
-            ('rgbaColor0', self._PassthruAttrDef(
-                'COLOR_0',     'color',     'RgbaF'
-            ))
-        ):
-            if getattr(gltf_attrs, attr_def.gltf_name) is not None:
-                self._passthru_attrs[sl_name] = attr_def
+        return cls.Desc(
+            has_tangent = gltf_attrs.TANGENT is not None,
+            passthru_attrs = tuple(
+                sl_name for sl_name, attr_def in cls._passthru_attr_defs.items()
+                if getattr(gltf_attrs, attr_def.gltf_name) is not None
+            )
+        )
+
+    def __init__(self, desc : Desc):
+        self._desc = desc
+        self._has_tangent = desc.has_tangent
+
+        self._passthru_attrs = OrderedDict(
+            (sl_name, self._passthru_attr_defs[sl_name])
+            for sl_name in desc.passthru_attrs
+        )
+
+    def get_desc(self) -> Desc:
+        return self._desc
     
     def get_id(self) -> str:
         optional_attrs = list(self._passthru_attrs.keys())
@@ -114,14 +138,17 @@ class VertexData:
         
         struct_members = OrderedDict()
 
-    def generate_vs(self, vs_file):
+    def generate_vs(self, vs_file, options : Options = Options()):
         sh = vs_6_0.Generator(
             vs_file,
             # the host app supplies transposed matrix uniforms
             matrix_post_multiplication = True
         )
 
-        _uniforms.generate(sh, for_ps = False)
+        if options.shared_include:
+            shared_include.include(sh, for_ps = False, options = options)
+        else:
+            _uniforms.generate(sh, for_ps = False, options = options)
 
         self._generate_vs_in(sh)
         self.generate_vs_out(sh)
@@ -0,0 +1,230 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Streams the logs of the jobs line by line, tagged with the job id, instead of
+buffering them whole until the jobs complete.
+'''
+
+import collections, contextlib, multiprocessing, os, sys, tempfile, threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+class LogRecord(NamedTuple):
+    job_id : str
+    line : str
+
+    def __str__(self):
+        return f'[{self.job_id}] {self.line}'
+
+class LogConfig(NamedTuple):
+    # A queue shared with the main process, see `stream_records()`. The
+    # records are printed directly if None.
+    queue : Any = None
+
+    # Only report the logs of the failed jobs
+    quiet : bool = False
+
+    # Write the log of each shader to a file next to its outputs
+    log_files : bool = False
+
+class JobLog:
+    '''
+    File-like object to redirect the stdout of a job to. Use as a context
+    manager in order to flush the log when the job is done.
+    '''
+    # In quiet mode, only this many of the last lines are kept in case the
+    # job fails
+    _max_quiet_lines = 1000
+
+    # The records are sent to the queue in batches of at most this many,
+    # at most this many seconds after the first record of the batch
+    _max_batch_lines = 64
+    _max_batch_seconds = 0.5
+
+    def __init__(
+        self,
+        job_id : str,
+        config : LogConfig,
+        log_file_path : Path = None
+    ):
+        self._job_id = job_id
+        self._config = config
+        self._stdout = sys.stdout
+        self._partial_line = ''
+        self._quiet_lines = collections.deque(maxlen = self._max_quiet_lines)
+        self._log_file = (
+            None if log_file_path is None else open(log_file_path, 'w')
+        )
+        self._failed = False
+        self._batch = []
+        self._batch_start_time = None
+        self._capture_file = None
+        self._capture_pos = 0
+
+    def _put(self, line : str):
+        record = LogRecord(self._job_id, line)
+        if self._config.queue is None:
+            print(record, file = self._stdout)
+            return
+
+        if not self._batch:
+            self._batch_start_time = time.monotonic()
+        self._batch.append(record)
+        if ( len(self._batch) >= self._max_batch_lines
+            or time.monotonic() - self._batch_start_time
+                >= self._max_batch_seconds
+        ):
+            self._send_batch()
+
+    def _send_batch(self):
+        if self._batch:
+            self._config.queue.put(self._batch)
+            self._batch = []
+
+    def _emit(self, line : str):
+        if self._log_file is not None:
+            self._log_file.write(line + '\n')
+
+        if self._config.quiet:
+            self._quiet_lines.append(line)
+        else:
+            self._put(line)
+
+    def _write_text(self, text : str):
+        # Partial lines, such as the start messages of timed scopes, are held
+        # until they are complete
+        lines = (self._partial_line + text).split('\n')
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._emit(line)
+
+    def _read_captured_output(self):
+        '''
+        Logs what the subprocesses have written since the last call, so that
+        it's ordered correctly relative to the output of the job itself
+        '''
+        if self._capture_file is None:
+            return
+
+        capture_fd = self._capture_file.fileno()
+        end_pos = os.lseek(capture_fd, 0, os.SEEK_END)
+        if end_pos == self._capture_pos:
+            return
+
+        os.lseek(capture_fd, self._capture_pos, os.SEEK_SET)
+        chunks = []
+        while self._capture_pos < end_pos:
+            chunk = os.read(capture_fd, end_pos - self._capture_pos)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._capture_pos += len(chunk)
+        self._write_text(b''.join(chunks).decode(errors = 'replace'))
+
+    def write(self, text : str) -> int:
+        self._read_captured_output()
+        self._write_text(text)
+        return len(text)
+
+    def flush(self):
+        '''
+        Sends the records buffered so far, e.g. before the job blocks on
+        a compiler for a while
+        '''
+        self._read_captured_output()
+        if self._config.queue is not None:
+            self._send_batch()
+
+    @contextlib.contextmanager
+    def capture_subprocess_output(self):
+        '''
+        In quiet mode, also captures the output that the subprocesses launched
+        in the block write directly to the stdout and stderr file descriptors,
+        such as the compilers launched by Metashade, which would otherwise be
+        printed regardless. Only to be used by a job that runs alone in its
+        process.
+        '''
+        if not self._config.quiet:
+            yield
+            return
+
+        std_fds = (sys.__stdout__.fileno(), sys.__stderr__.fileno())
+        with tempfile.TemporaryFile() as capture_file:
+            sys.__stdout__.flush()
+            sys.__stderr__.flush()
+            saved_fds = [os.dup(fd) for fd in std_fds]
+            for fd in std_fds:
+                os.dup2(capture_file.fileno(), fd)
+            self._capture_file = capture_file
+            self._capture_pos = 0
+            try:
+                yield
+            finally:
+                sys.__stdout__.flush()
+                sys.__stderr__.flush()
+                for fd, saved_fd in zip(std_fds, saved_fds):
+                    os.dup2(saved_fd, fd)
+                    os.close(saved_fd)
+                self._read_captured_output()
+                self._capture_file = None
+
+    def mark_failed(self):
+        self._failed = True
+
+    def __enter__(self) -> 'JobLog':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._partial_line:
+            self._emit(self._partial_line)
+            self._partial_line = ''
+
+        if self._log_file is not None:
+            self._log_file.close()
+
+        if self._failed or exc_type is not None:
+            for line in self._quiet_lines:
+                self._put(line)
+
+        if self._config.queue is not None:
+            self._send_batch()
+
+@contextlib.contextmanager
+def stream_records(enabled : bool = True):
+    '''
+    Yields a queue for worker processes to put lists of their log records
+    into, which are printed by a background thread until the block exits, or
+    None if not `enabled`.
+    '''
+    if not enabled:
+        yield None
+        return
+
+    with multiprocessing.Manager() as manager:
+        queue = manager.Queue()
+
+        def _print_records():
+            for batch in iter(queue.get, None):
+                for record in batch:
+                    print(record)
+
+        thread = threading.Thread(target = _print_records, daemon = True)
+        thread.start()
+        try:
+            yield queue
+        finally:
+            queue.put(None)
+            thread.join()
@@ -0,0 +1,255 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib, json, os
+from pathlib import Path
+from typing import Dict, List
+
+import metashade
+
+import _gltf_metadata
+from _compile_cache import get_tool_identity
+from _impl.options import Options
+
+def _hash_asset(asset_path : Path) -> str:
+    '''
+    Only the JSON of the asset affects the shaders, which spares reading the
+    binary chunks of .glb files.
+    '''
+    return hashlib.sha256(
+        _gltf_metadata.read_json_bytes(asset_path)
+    ).hexdigest()
+
+def get_generator_hash(options : Options) -> str:
+    '''
+    Hashes everything that affects the generated shaders besides the glTF
+    assets: the generator options, the Python code of this demo and of
+    Metashade, as well as the identities of the compilers run by the
+    pipeline profile.
+    '''
+    hasher = hashlib.sha256()
+    hasher.update(repr(options).encode())
+
+    code_dir_paths = [Path(__file__).parent]
+    code_dir_paths += [Path(path) for path in metashade.__path__]
+
+    for code_dir_path in code_dir_paths:
+        for code_file_path in sorted(code_dir_path.rglob('*.py')):
+            hasher.update(code_file_path.read_bytes())
+
+    for exe_name in options.get_pipeline_profile().get_tool_names():
+        hasher.update(get_tool_identity(exe_name).encode())
+
+    return hasher.hexdigest()
+
+class Manifest:
+    '''
+    Records the glTF assets processed by a run and the shaders they produced,
+    so that an incremental run can skip the unchanged ones and delete stale
+    outputs precisely.
+    '''
+    _file_name = '.generate-manifest.json'
+
+    def __init__(self, generator_hash : str = None):
+        self._generator_hash = generator_hash
+        self._assets = dict()
+        self._shaders = dict()
+        self._shared_files = []
+
+    @classmethod
+    def load(cls, out_dir_path : Path) -> 'Manifest':
+        try:
+            with open(out_dir_path / cls._file_name) as manifest_file:
+                manifest_dict = json.load(manifest_file)
+
+            manifest = cls(manifest_dict['generator_hash'])
+            manifest._assets = dict(manifest_dict['assets'])
+            manifest._shaders = dict(manifest_dict['shaders'])
+            manifest._shared_files = list(
+                manifest_dict.get('shared_files', [])
+            )
+        except (OSError, ValueError, LookupError, TypeError, AttributeError):
+            # A missing or corrupt manifest just means a full rebuild
+            return cls()
+
+        return manifest
+
+    def save(self, out_dir_path : Path):
+        with open(out_dir_path / self._file_name, 'w') as manifest_file:
+            json.dump(
+                {
+                    'generator_hash' : self._generator_hash,
+                    'assets' : self._assets,
+                    'shaders' : self._shaders,
+                    'shared_files' : self._shared_files
+                },
+                manifest_file,
+                indent = 4
+            )
+
+    def get_up_to_date_asset(
+        self,
+        asset_key : str,
+        asset_path : Path,
+        generator_hash : str,
+        out_dir_path : Path
+    ) -> dict:
+        '''
+        Returns the asset's entry if neither the asset nor the generator have
+        changed since the entry was recorded and all of its outputs are
+        in place, otherwise None.
+        '''
+        if generator_hash != self._generator_hash:
+            return None
+
+        asset_entry = self._assets.get(asset_key)
+        if asset_entry is None:
+            return None
+
+        if not (out_dir_path / asset_entry['index_file']).exists():
+            return None
+
+        for shader_name in asset_entry['shaders']:
+            if not self.is_shader_up_to_date(
+                shader_name, generator_hash, out_dir_path
+            ):
+                return None
+
+        asset_stat = asset_path.stat()
+        if ( asset_stat.st_mtime_ns != asset_entry['mtime_ns']
+            or asset_stat.st_size != asset_entry['size']
+        ):
+            # Touched but possibly not modified
+            if _hash_asset(asset_path) != asset_entry['sha256']:
+                return None
+
+        return asset_entry
+
+    def add_asset(
+        self,
+        asset_key : str,
+        asset_path : Path,
+        index_file : str,
+        shaders : Dict[str, int],
+        sha256 : str = None
+    ):
+        '''
+        `shaders` maps the names of the asset's shaders to the numbers of
+        primitives using them.
+        '''
+        asset_stat = asset_path.stat()
+        self._assets[asset_key] = {
+            'mtime_ns' : asset_stat.st_mtime_ns,
+            'size' : asset_stat.st_size,
+            'sha256' : (
+                sha256 if sha256 is not None else _hash_asset(asset_path)
+            ),
+            'index_file' : index_file,
+            'shaders' : dict(sorted(shaders.items()))
+        }
+
+    def load_shader_indices(self, out_dir_path : Path) -> Dict[str, list]:
+        '''
+        Loads the shader index files of the assets, sorted by the assets
+        '''
+        shader_indices = dict()
+        for asset_key, asset_entry in sorted(self._assets.items()):
+            index_path = out_dir_path / asset_entry['index_file']
+            with open(index_path) as shader_index_file:
+                shader_indices[asset_key] = json.load(shader_index_file)
+        return shader_indices
+
+    def get_shader_usage_by_asset(self) -> Dict[str, Dict[str, int]]:
+        return {
+            asset_key : asset_entry['shaders']
+            for asset_key, asset_entry in self._assets.items()
+        }
+
+    def is_shader_up_to_date(
+        self,
+        shader_name : str,
+        generator_hash : str,
+        out_dir_path : Path
+    ) -> bool:
+        if generator_hash != self._generator_hash:
+            return False
+
+        shader_entry = self._shaders.get(shader_name)
+        return (
+            shader_entry is not None
+            and shader_entry['success']
+            and all(
+                (out_dir_path / output_name).exists()
+                for output_name in shader_entry['outputs']
+            )
+        )
+
+    def add_shader(
+        self,
+        shader_name : str,
+        outputs : List[str],
+        success : bool
+    ):
+        self._shaders[shader_name] = {
+            'outputs' : sorted(outputs),
+            'success' : success
+        }
+
+    def get_compiled_outputs(self) -> Dict[str, List[str]]:
+        '''
+        The outputs of the shaders that have compiled successfully, keyed by
+        the shader names
+        '''
+        return {
+            shader_name : shader_entry['outputs']
+            for shader_name, shader_entry in self._shaders.items()
+            if shader_entry['success']
+        }
+
+    def copy_shader_from(self, other : 'Manifest', shader_name : str):
+        self._shaders[shader_name] = other._shaders[shader_name]
+
+    def add_shared_file(self, file_name : str):
+        '''
+        Records an output that isn't specific to any asset or shader
+        '''
+        self._shared_files.append(file_name)
+
+    def _get_output_names(self) -> set:
+        output_names = {
+            asset_entry['index_file'] for asset_entry in self._assets.values()
+        }
+        output_names.update(self._shared_files)
+        for shader_entry in self._shaders.values():
+            output_names.update(shader_entry['outputs'])
+        return output_names
+
+    def collect_garbage(
+        self,
+        prev_manifest : 'Manifest',
+        out_dir_path : Path
+    ) -> int:
+        '''
+        Deletes the outputs recorded in the previous manifest that this one
+        doesn't reference anymore. Returns the number of deleted files.
+        '''
+        num_deleted = 0
+        for stale_name in (
+            prev_manifest._get_output_names() - self._get_output_names()
+        ):
+            stale_path = out_dir_path / stale_name
+            if stale_path.exists():
+                os.remove(stale_path)
+                num_deleted += 1
+        return num_deleted
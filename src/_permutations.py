@@ -0,0 +1,88 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict
+
+from _shader_base import Shader
+from _impl.options import Options
+
+class PermutationRegistry:
+    '''
+    Maps the primitives of an asset to unique shader permutations, keyed by
+    their compact descriptions, i.e. the vertex attributes, material textures
+    and alpha mode. Each unique permutation is only constructed once, in
+    order to name it, and the number of primitives using it is counted.
+    '''
+    def __init__(self, out_dir : Path, options : Options):
+        self._out_dir = out_dir
+        self._options = options
+        self._index_names = dict()
+        self._shader_dict = dict()
+        self._usage = Counter()
+
+    def register(self, shader_desc : Shader.Desc) -> str:
+        '''
+        Returns the index name of the permutation
+        '''
+        index_name = self._index_names.get(shader_desc)
+        if index_name is None:
+            index_name = shader_desc.create(
+                self._out_dir, self._options
+            ).get_index_name()
+            self._index_names[shader_desc] = index_name
+            self._shader_dict[index_name] = shader_desc
+
+        self._usage[index_name] += 1
+        return index_name
+
+    def get_shader_dict(self) -> Dict[str, Shader.Desc]:
+        return self._shader_dict
+
+    def get_usage(self) -> Dict[str, int]:
+        '''
+        The number of primitives using each permutation
+        '''
+        return dict(self._usage)
+
+def get_report(usage_by_asset : Dict[str, Dict[str, int]]) -> dict:
+    '''
+    Aggregates the permutation usage of all the assets, most used first.
+    Outliers are the permutations used by a single primitive.
+    '''
+    usage = Counter()
+    assets = defaultdict(list)
+    for asset_key, asset_usage in sorted(usage_by_asset.items()):
+        usage.update(asset_usage)
+        for shader_name in asset_usage:
+            assets[shader_name].append(asset_key)
+
+    permutations = [
+        {
+            'name' : shader_name,
+            'primitives' : num_primitives,
+            'assets' : assets[shader_name]
+        }
+        for shader_name, num_primitives in sorted(
+            usage.items(), key = lambda item: (-item[1], item[0])
+        )
+    ]
+    return {
+        'permutations' : permutations,
+        'outliers' : [
+            permutation['name'] for permutation in permutations
+            if permutation['primitives'] == 1
+        ]
+    }
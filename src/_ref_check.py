@@ -0,0 +1,168 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib, filecmp, hashlib, json, os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List
+
+def _hash_file(path : Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+class RefChecker:
+    '''
+    Drop-in replacement for `metashade.util.tests.RefDiffer`, which compares
+    the outputs against the references byte for byte. The files are only
+    diffed textually on a mismatch, in order to report the differences.
+
+    With `index_path`, the outputs are instead compared by their sizes and
+    hashes against an index of the references, which is validated against
+    their sizes and modification times and persisted across the runs, so
+    that unchanged references aren't read at all.
+    '''
+    _max_diff_lines = 50
+
+    def __init__(self, ref_dir : Path, index_path : Path = None):
+        self._ref_dir = ref_dir
+        self._index_path = index_path
+        self._index = None
+
+    def __getstate__(self):
+        # Worker processes load the index themselves rather than receive it
+        # with every job
+        return {
+            '_ref_dir' : self._ref_dir,
+            '_index_path' : self._index_path,
+            '_index' : None
+        }
+
+    def _get_index(self) -> dict:
+        if self._index is None:
+            self._index = dict()
+            if self._index_path is not None:
+                try:
+                    with open(self._index_path) as index_file:
+                        self._index = json.load(index_file)
+                except (OSError, ValueError):
+                    pass
+        return self._index
+
+    def _get_ref_entry(self, ref_path : Path) -> dict:
+        '''
+        Returns None if the reference doesn't exist
+        '''
+        try:
+            ref_stat = ref_path.stat()
+        except OSError:
+            return None
+
+        index = self._get_index()
+        ref_entry = index.get(ref_path.name)
+        if ( ref_entry is None
+            or ref_entry['mtime_ns'] != ref_stat.st_mtime_ns
+            or ref_entry['size'] != ref_stat.st_size
+        ):
+            ref_entry = {
+                'mtime_ns' : ref_stat.st_mtime_ns,
+                'size' : ref_stat.st_size,
+                'sha256' : _hash_file(ref_path)
+            }
+            index[ref_path.name] = ref_entry
+        return ref_entry
+
+    def update_index(self):
+        '''
+        Hashes the new and modified references and saves the index to
+        `index_path`. Meant to be called once in the main process, before the
+        index is loaded by the worker processes.
+        '''
+        if self._index_path is None:
+            return
+
+        index = self._get_index()
+        ref_names = set()
+        for ref_path in self._ref_dir.iterdir():
+            if ref_path.is_file():
+                self._get_ref_entry(ref_path)
+                ref_names.add(ref_path.name)
+
+        for stale_name in set(index) - ref_names:
+            del index[stale_name]
+
+        os.makedirs(self._index_path.parent, exist_ok = True)
+        with open(self._index_path, 'w') as index_file:
+            json.dump(index, index_file, indent = 4, sort_keys = True)
+
+    def _get_diff(self, path : Path, ref_path : Path) -> str:
+        diff_lines = list(
+            difflib.unified_diff(
+                ref_path.read_text(errors = 'replace').splitlines(),
+                path.read_text(errors = 'replace').splitlines(),
+                fromfile = str(ref_path),
+                tofile = str(path),
+                lineterm = ''
+            )
+        )
+        if len(diff_lines) > self._max_diff_lines:
+            num_omitted = len(diff_lines) - self._max_diff_lines
+            diff_lines = diff_lines[:self._max_diff_lines]
+            diff_lines.append(f'... {num_omitted} more lines')
+        return '\n'.join(diff_lines)
+
+    def __call__(self, path : Path):
+        '''
+        Raises `AssertionError` if the file doesn't match its reference
+        '''
+        ref_path = self._ref_dir / path.name
+        if not ref_path.is_file():
+            raise AssertionError(f'No reference for {path} in {self._ref_dir}')
+
+        if self._index_path is None:
+            if filecmp.cmp(path, ref_path, shallow = False):
+                return
+        else:
+            ref_entry = self._get_ref_entry(ref_path)
+            if ( ref_entry is not None
+                and path.stat().st_size == ref_entry['size']
+                and _hash_file(path) == ref_entry['sha256']
+            ):
+                return
+
+        raise AssertionError(
+            f'{path} differs from the reference:\n'
+            + self._get_diff(path, ref_path)
+        )
+
+def check_all(
+    ref_differ : Callable[[Path], None],
+    paths : Iterable[Path],
+    max_workers : int = None
+) -> List[str]:
+    '''
+    Checks the files against the references on a pool of threads, as a
+    separate pass after the generation. Returns the error messages of the
+    mismatches.
+    '''
+    def _check(path : Path) -> str:
+        try:
+            ref_differ(path)
+        except (AssertionError, OSError) as e:
+            return str(e) or f'{path} differs from the reference'
+        return None
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        return [
+            error for error in executor.map(_check, paths)
+            if error is not None
+        ]
@@ -13,19 +13,42 @@
 # limitations under the License.
 
 import abc
-import io
+import contextlib
 from pathlib import Path
-import sys
-from typing import NamedTuple
+from typing import Any, List, NamedTuple, Sequence, Tuple
 from metashade.util.tests import RefDiffer
 from metashade.util import perf
 
+import _trace
+from _compile_cache import CompileCache
+from _job_log import JobLog, LogConfig
+from _impl.options import Options
+
 class Shader(abc.ABC):
+    class Desc(NamedTuple):
+        '''
+        Compact, immutable description of a shader, which is cheap to send to
+        worker processes, as opposed to the shader itself.
+        '''
+        shader_class : type
+        permutation : Any
+
+        def create(
+            self,
+            out_dir : Path,
+            options : Options = Options()
+        ) -> 'Shader':
+            return self.shader_class(out_dir, self.permutation, options)
+
     def __init__(
         self,
         out_dir : Path,
-        shader_name : str
+        shader_name : str,
+        permutation : Any = None,
+        options : Options = Options()
     ):
+        self._permutation = permutation
+        self._options = options
         self._src_path = out_dir / f'{shader_name}.{self._get_src_extension()}'
         self._bin_path = out_dir / f'{shader_name}.{self._get_bin_extension()}'
 
@@ -35,6 +58,41 @@ class Shader(abc.ABC):
         '''
         return self._bin_path.name
 
+    def get_desc(self) -> Desc:
+        return Shader.Desc(self.__class__, self._permutation)
+
+    def get_output_paths(self) -> List[Path]:
+        '''
+        All the files written by `generate_and_compile()`
+        '''
+        return [self._src_path] + self._get_compiler_output_paths()
+
+    def get_ref_paths(self, compiled : bool = True) -> List[Path]:
+        '''
+        The outputs that are diffed against the references, only including
+        the compiler outputs if the shader has `compiled` successfully
+        '''
+        ref_paths = [self._src_path]
+        if compiled:
+            ref_paths += self._get_compiler_ref_paths()
+        return ref_paths
+
+    def get_log_path(self) -> Path:
+        '''
+        The log file written by `generate_and_compile()` if
+        `LogConfig.log_files` is set
+        '''
+        return self._src_path.parent / (self._src_path.name + '.log')
+
+    def _create_job_log(self, log_config : LogConfig) -> JobLog:
+        return JobLog(
+            job_id = self.get_index_name(),
+            config = log_config,
+            log_file_path = (
+                self.get_log_path() if log_config.log_files else None
+            )
+        )
+
     @staticmethod
     @abc.abstractmethod
     def _get_src_extension() -> str:
@@ -54,31 +112,157 @@ class Shader(abc.ABC):
         generate_func,
         ref_differ : RefDiffer
     ):
-        with perf.TimedScope(f'Generating {self._src_path} '), \
+        with _trace.span('Generate', shader = self._src_path.name), \
+            perf.TimedScope(f'Generating {self._src_path} '), \
             open(self._src_path, 'w') as shader_file:
             #
             generate_func(shader_file)
 
         if ref_differ is not None:
-            ref_differ(self._src_path)
+            with _trace.span('Ref diff', file = self._src_path.name):
+                ref_differ(self._src_path)
 
     class GenerateAndCompileResult(NamedTuple):
-        log : str
+        index_name : str
         success : bool
+        cache_hit : bool = False
+        trace_events : Sequence[dict] = ()
+        # Wall-clock time of the job in seconds, if measured
+        duration : float = None
 
     @abc.abstractmethod
-    def _compile(self, ref_differ : RefDiffer) -> bool:
+    def _compile(self) -> bool:
+        pass
+
+    @abc.abstractmethod
+    async def _compile_async(self, run_tool) -> bool:
+        '''
+        Asyncio counterpart of `_compile()`. `run_tool` is a coroutine function
+        taking the command line arguments of a compiler executable and the
+        name of its trace span and returning True if it has succeeded.
+        '''
         pass
 
+    def _get_compiler_output_paths(self) -> List[Path]:
+        '''
+        All the files written by `_compile()`, to be stored in and restored
+        from the compile cache.
+        '''
+        return [self._bin_path]
+
+    @abc.abstractmethod
+    def _get_compile_key_fields(self) -> Tuple[str, ...]:
+        '''
+        Everything besides the source code that affects the outputs of
+        `_compile()`: compiler identities, profiles and flags.
+        '''
+        pass
+
+    def _get_compiler_ref_paths(self) -> List[Path]:
+        '''
+        The compiler outputs that are diffed against the references
+        '''
+        return []
+
+    def _diff_compiler_outputs(self, ref_differ : RefDiffer):
+        for ref_path in self._get_compiler_ref_paths():
+            with _trace.span('Ref diff', file = ref_path.name):
+                ref_differ(ref_path)
+
+    def _get_include_paths(self) -> List[Path]:
+        '''
+        The files included by the generated source
+        '''
+        return []
+
+    def _fetch_from_cache(self, compile_cache : CompileCache) -> Tuple[str, bool]:
+        '''
+        Returns the cache key and whether the compiler outputs have been
+        restored from the cache.
+        '''
+        if compile_cache is None:
+            return None, False
+
+        cache_key = compile_cache.get_key(
+            src_paths = [self._src_path] + self._get_include_paths(),
+            key_fields = self._get_compile_key_fields()
+        )
+        cache_hit = compile_cache.fetch(
+            cache_key, self._get_compiler_output_paths()
+        )
+        if cache_hit:
+            print(f'Compile cache hit for {self._src_path}')
+        return cache_key, cache_hit
+
     def generate_and_compile(
         self,
-        ref_differ : RefDiffer
+        ref_differ : RefDiffer,
+        compile_cache : CompileCache = None,
+        log_config : LogConfig = LogConfig()
     ) -> GenerateAndCompileResult:
-        log = io.StringIO()
-        log, sys.stdout = sys.stdout, log
+        with self._create_job_log(log_config) as log, \
+            log.capture_subprocess_output(), \
+            contextlib.redirect_stdout(log):
+            #
+            self._generate(ref_differ)
+            cache_key, cache_hit = self._fetch_from_cache(compile_cache)
+
+            if cache_hit:
+                success = True
+            else:
+                # Make the log visible in case the compilers get stuck
+                log.flush()
+                success = self._compile()
+                if success and compile_cache is not None:
+                    compile_cache.store(
+                        cache_key, self._get_compiler_output_paths()
+                    )
+
+            if success and ref_differ is not None:
+                self._diff_compiler_outputs(ref_differ)
+
+            if not success:
+                log.mark_failed()
+
+        return Shader.GenerateAndCompileResult(
+            self.get_index_name(), success, cache_hit
+        )
+
+    async def generate_and_compile_async(
+        self,
+        run_tool,
+        ref_differ : RefDiffer,
+        compile_cache : CompileCache = None,
+        log_config : LogConfig = LogConfig()
+    ) -> GenerateAndCompileResult:
+        '''
+        Asyncio counterpart of `generate_and_compile()`. `run_tool` is called
+        as `run_tool(args, log, span_name)`, see `_async_compile.ToolRunner`.
+        '''
+        with self._create_job_log(log_config) as log:
+            # Other shaders' coroutines may run while the compilers are
+            # awaited, so stdout is only redirected while nothing is awaited.
+            with contextlib.redirect_stdout(log):
+                self._generate(ref_differ)
+                cache_key, cache_hit = self._fetch_from_cache(compile_cache)
+
+            if cache_hit:
+                success = True
+            else:
+                success = await self._compile_async(
+                    lambda args, span_name: run_tool(args, log, span_name)
+                )
+                if success and compile_cache is not None:
+                    compile_cache.store(
+                        cache_key, self._get_compiler_output_paths()
+                    )
+
+            if success and ref_differ is not None:
+                self._diff_compiler_outputs(ref_differ)
 
-        self._generate(ref_differ)
-        success = self._compile(ref_differ)
+            if not success:
+                log.mark_failed()
 
-        log, sys.stdout = sys.stdout, log
-        return Shader.GenerateAndCompileResult(log.getvalue(), success)
+        return Shader.GenerateAndCompileResult(
+            self.get_index_name(), success, cache_hit
+        )
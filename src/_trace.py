@@ -0,0 +1,108 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Records the spans of the pipeline stages in every process, so that the main
+process can merge them and write them in the Chrome trace event format,
+which can be viewed in Perfetto or chrome://tracing.
+'''
+
+import asyncio, contextlib, json, os, threading, time
+from pathlib import Path
+from typing import Iterable, List
+
+_events = None  # None while tracing is disabled
+_task_tids = dict()
+
+def enable(enabled : bool):
+    global _events
+    if not enabled:
+        _events = None
+    elif _events is None:
+        _events = []
+
+def _get_tid() -> int:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        # No running event loop
+        task = None
+
+    if task is None:
+        return threading.get_native_id()
+
+    # Concurrent asyncio tasks get a track each, so that their spans nest
+    return _task_tids.setdefault(id(task), len(_task_tids) + 1)
+
+@contextlib.contextmanager
+def span(name : str, **args):
+    '''
+    Records the execution of the enclosed block as a complete event with the
+    given name and arguments if tracing is enabled in this process.
+    '''
+    if _events is None:
+        yield
+        return
+
+    tid = _get_tid()
+    start_ns = time.time_ns()
+    try:
+        yield
+    finally:
+        # Wall-clock time is comparable across processes
+        _events.append({
+            'name' : name,
+            'ph' : 'X',
+            'ts' : start_ns / 1e3,
+            'dur' : (time.time_ns() - start_ns) / 1e3,
+            'pid' : os.getpid(),
+            'tid' : tid,
+            'args' : args
+        })
+
+def collect() -> List[dict]:
+    '''
+    Returns the events recorded in this process since the previous call,
+    to be sent to the main process along with the results of a job.
+    '''
+    global _events
+    if _events is None:
+        return []
+
+    events, _events = _events, []
+    return events
+
+def write(events : Iterable[dict], trace_path : Path):
+    events = list(events)
+    main_pid = os.getpid()
+    metadata_events = [
+        {
+            'name' : 'process_name',
+            'ph' : 'M',
+            'pid' : pid,
+            'args' : {
+                'name' : 'Main' if pid == main_pid else f'Worker {pid}'
+            }
+        }
+        for pid in sorted({event['pid'] for event in events})
+    ]
+
+    with open(trace_path, 'w') as trace_file:
+        json.dump(
+            {
+                'traceEvents' : metadata_events + events,
+                'displayTimeUnit' : 'ms'
+            },
+            trace_file
+        )
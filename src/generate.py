@@ -12,46 +12,113 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import argparse, functools, io, json, os, shutil, sys
+import argparse, asyncio, contextlib, functools, heapq, itertools, json, os
+import shutil, sys, time
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+)
 from pathlib import Path
-import multiprocessing as mp
-from typing import List, NamedTuple
-from pygltflib import GLTF2
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Sequence, Tuple
 
 from metashade.util import perf
 from metashade.hlsl.util import dxc
 from metashade.glsl.util import glslang
 from metashade.util.tests import RefDiffer
 
-import _shader_base, _hlsl, _glsl
+import _shader_base, _hlsl, _glsl, _async_compile, _gltf_metadata, _trace
+import _archive, _cost_report, _global_index, _ref_check
+from _job_log import JobLog, LogConfig, stream_records
+from _compile_cache import CompileCache
+from _cost_model import CostModel
+from _manifest import Manifest, get_generator_hash
+from _permutations import PermutationRegistry, get_report
+from _impl.options import Options, pipeline_profiles
 from _impl.vertex_data import VertexData
+import _impl.ps as impl_ps
 
 def _generate_and_compile(
-    shader,
-    ref_differ : RefDiffer
+    shader_desc : _shader_base.Shader.Desc,
+    out_dir : Path,
+    options : Options,
+    ref_differ : RefDiffer,
+    compile_cache : CompileCache,
+    log_config : LogConfig = LogConfig(),
+    trace : bool = False
 ) -> _shader_base.Shader.GenerateAndCompileResult:
     '''
     Helper function to compile a shader in a process pool.
-    Without it, the pool would not be able to pickle the method.
+    The shader is recreated from its compact description, which is all that
+    needs to be pickled.
     '''
-    return shader.generate_and_compile(ref_differ)
+    _trace.enable(trace)
+    start_time = time.perf_counter()
+    shader = shader_desc.create(out_dir, options)
+    result = shader.generate_and_compile(ref_differ, compile_cache, log_config)
+    return result._replace(
+        trace_events = _trace.collect(),
+        duration = time.perf_counter() - start_time
+    )
+
+async def _generate_and_compile_async(
+    shader_desc : _shader_base.Shader.Desc,
+    run_tool : _async_compile.ToolRunner,
+    out_dir : Path,
+    options : Options,
+    ref_differ : RefDiffer,
+    compile_cache : CompileCache,
+    log_config : LogConfig = LogConfig()
+) -> _shader_base.Shader.GenerateAndCompileResult:
+    '''
+    Asyncio counterpart of `_generate_and_compile()`, running the compilers
+    with `run_tool`.
+    '''
+    shader = shader_desc.create(out_dir, options)
+    return await shader.generate_and_compile_async(
+        run_tool = run_tool,
+        ref_differ = ref_differ,
+        compile_cache = compile_cache,
+        log_config = log_config
+    )
 
 class _AssetResult(NamedTuple):
-    log : io.StringIO
-    shader_dict : List[_shader_base.Shader]
+    gltf_file_path : Path
+    shader_dict : Dict[str, _shader_base.Shader.Desc]
+    shader_usage : Dict[str, int]
+    shader_index_file_name : str
+    trace_events : Sequence[dict] = ()
 
 def _process_asset(
     gltf_file_path : str,
-    out_dir : Path
+    out_dir : Path,
+    options : Options,
+    log_config : LogConfig = LogConfig(),
+    trace : bool = False
 ) -> _AssetResult:
-    log = io.StringIO()
-    log, sys.stdout = sys.stdout, log
+    _trace.enable(trace)
+    with JobLog(gltf_file_path.name, log_config) as log, \
+        contextlib.redirect_stdout(log):
+        #
+        return _process_asset_impl(gltf_file_path, out_dir, options)
 
-    shader_dict = dict()    # Dictionary of shaders to compile by this script
+def _get_shader_index_file_name(gltf_file_path : Path) -> str:
+    # Foo.gltf and Foo.glb may sit side by side
+    if gltf_file_path.suffix.lower() == '.gltf':
+        return gltf_file_path.with_suffix('.json').name
+    return gltf_file_path.name + '.json'
+
+def _process_asset_impl(
+    gltf_file_path : str,
+    out_dir : Path,
+    options : Options
+) -> _AssetResult:
+    registry = PermutationRegistry(out_dir, options)
+    pipeline_profile = options.get_pipeline_profile()
     shader_index = []       # Dictionary of shaders per mesh and primitive
 
-    with perf.TimedScope(f'Loading glTF asset {gltf_file_path} '):
-        gltf_asset = GLTF2().load(gltf_file_path)
+    with _trace.span('Load glTF asset', asset = gltf_file_path.name), \
+        perf.TimedScope(f'Loading glTF asset {gltf_file_path} '):
+        #
+        gltf_asset = _gltf_metadata.load(gltf_file_path)
 
     for mesh in gltf_asset.meshes:
         per_mesh_shader_index = []
@@ -60,32 +127,38 @@ def _process_asset(
             per_primitive_shader_index = dict()
 
             material = gltf_asset.materials[primitive.material]
-            vertex_data = VertexData(primitive)
-
-            dx_vs = _hlsl.VertexShader(out_dir, vertex_data)
-            dx_ps = _hlsl.PixelShader(
-                out_dir = out_dir,
-                material = material,
-                vertex_data = vertex_data
-            )
-
-            per_primitive_shader_index['dx'] = {
-                'vs': dx_vs.get_index_name(),
-                'ps': dx_ps.get_index_name(),
-            }
+            vertex_data_desc = VertexData.describe(primitive)
 
-            vk_frag = _glsl.FragmentShader(out_dir)
-            per_primitive_shader_index['vk'] = { 'frag' : vk_frag.get_index_name() }
+            if pipeline_profile.dx12:
+                per_primitive_shader_index['dx'] = {
+                    'vs': registry.register(
+                        _shader_base.Shader.Desc(
+                            _hlsl.VertexShader, vertex_data_desc
+                        )
+                    ),
+                    'ps': registry.register(
+                        _shader_base.Shader.Desc(
+                            _hlsl.PixelShader,
+                            impl_ps.ps.describe(
+                                material, vertex_data_desc, options
+                            )
+                        )
+                    ),
+                }
 
-            for shader in (dx_vs, dx_ps, vk_frag):
-                shader_dict[shader.get_index_name()] = shader
+            if pipeline_profile.vulkan:
+                per_primitive_shader_index['vk'] = {
+                    'frag' : registry.register(
+                        _shader_base.Shader.Desc(_glsl.FragmentShader, None)
+                    )
+                }
 
             per_mesh_shader_index.append(per_primitive_shader_index)
 
         shader_index.append(per_mesh_shader_index)
 
-    shader_index_file_path = (
-        out_dir / gltf_file_path.with_suffix('.json').name
+    shader_index_file_path = out_dir / _get_shader_index_file_name(
+        gltf_file_path
     )
     with open(shader_index_file_path, 'w') as shader_index_file:
         json.dump(
@@ -93,90 +166,750 @@ def _process_asset(
             shader_index_file,
             indent = 4
         )
-    print(f'Shader index written to {shader_index_file_path}\n')
+    print(f'Shader index written to {shader_index_file_path}')
 
-    log, sys.stdout = sys.stdout, log
     return _AssetResult(
-        log = log.getvalue(),
-        shader_dict = shader_dict
+        gltf_file_path = gltf_file_path,
+        shader_dict = registry.get_shader_dict(),
+        shader_usage = registry.get_usage(),
+        shader_index_file_name = shader_index_file_path.name,
+        trace_events = _trace.collect()
+    )
+
+def _get_num_workers() -> int:
+    # ProcessPoolExecutor doesn't support more workers on Windows
+    if sys.platform == 'win32':
+        return min(os.cpu_count(), 61)
+    return os.cpu_count()
+
+def _identify_tools(options : Options):
+    # Only the compilers used by the pipeline profile need to be installed
+    tool_names = options.get_pipeline_profile().get_tool_names()
+    if 'dxc' in tool_names:
+        dxc.identify()
+    if 'glslang' in tool_names:
+        glslang.identify()
+
+def _find_gltf_paths(gltf_dir_path : Path) -> List[Path]:
+    return sorted(
+        path for path in gltf_dir_path.glob('**/*')
+        if path.suffix.lower() in ('.gltf', '.glb')
+    )
+
+class _Run:
+    '''
+    The state of a `generate()` run, which is updated with the results of
+    the asset and shader jobs as they complete, whichever backend runs them
+    '''
+    def __init__(
+        self,
+        gltf_dir_path : Path,
+        out_dir_path : Path,
+        options : Options,
+        prev_manifest : Manifest,
+        generator_hash : str,
+        cost_model : CostModel,
+        log_files : bool
+    ):
+        self._gltf_dir_path = gltf_dir_path
+        self._out_dir_path = out_dir_path
+        self._options = options
+        self._prev_manifest = prev_manifest
+        self._generator_hash = generator_hash
+        self._cost_model = cost_model
+        self._log_files = log_files
+
+        self.manifest = Manifest(generator_hash)
+        # The shaders compiled in this run, keyed by their names
+        self.shader_dict = dict()
+        self.num_failed = 0
+        self.num_cache_hits = 0
+        self.trace_events = []
+        # The outputs to check against the references in a separate pass
+        self.ref_check_paths = []
+
+    def _get_asset_key(self, gltf_path : Path) -> str:
+        return gltf_path.relative_to(self._gltf_dir_path).as_posix()
+
+    def get_out_of_date_assets(
+        self,
+        gltf_paths : Sequence[Path]
+    ) -> List[Path]:
+        '''
+        Carries the up-to-date assets and their shaders over from the previous
+        manifest and returns the other ones.
+        '''
+        out_of_date_paths = []
+        for gltf_path in gltf_paths:
+            asset_key = self._get_asset_key(gltf_path)
+            asset_entry = self._prev_manifest.get_up_to_date_asset(
+                asset_key = asset_key,
+                asset_path = gltf_path,
+                generator_hash = self._generator_hash,
+                out_dir_path = self._out_dir_path
+            )
+            if asset_entry is None:
+                out_of_date_paths.append(gltf_path)
+                continue
+
+            self.manifest.add_asset(
+                asset_key = asset_key,
+                asset_path = gltf_path,
+                index_file = asset_entry['index_file'],
+                shaders = asset_entry['shaders'],
+                sha256 = asset_entry['sha256']
+            )
+            for shader_name in asset_entry['shaders']:
+                self.manifest.copy_shader_from(
+                    self._prev_manifest, shader_name
+                )
+
+        return out_of_date_paths
+
+    def handle_asset_result(
+        self,
+        asset_result : _AssetResult
+    ) -> Dict[str, _shader_base.Shader.Desc]:
+        '''
+        Returns the shaders that haven't been seen in the previous assets and
+        need to be compiled, keyed by their names.
+        '''
+        self.trace_events.extend(asset_result.trace_events)
+        self.manifest.add_asset(
+            asset_key = self._get_asset_key(asset_result.gltf_file_path),
+            asset_path = asset_result.gltf_file_path,
+            index_file = asset_result.shader_index_file_name,
+            shaders = asset_result.shader_usage
+        )
+
+        return self.add_shaders(asset_result.shader_dict)
+
+    def add_shaders(
+        self,
+        shader_descs : Dict[str, _shader_base.Shader.Desc]
+    ) -> Dict[str, _shader_base.Shader.Desc]:
+        '''
+        Returns the shaders out of `shader_descs` that need to be compiled
+        '''
+        new_shader_dict = dict()
+        for shader_name, shader_desc in shader_descs.items():
+            if shader_name in self.shader_dict:
+                continue
+
+            if self._prev_manifest.is_shader_up_to_date(
+                shader_name, self._generator_hash, self._out_dir_path
+            ):
+                self.manifest.copy_shader_from(
+                    self._prev_manifest, shader_name
+                )
+            else:
+                self.shader_dict[shader_name] = shader_desc
+                new_shader_dict[shader_name] = shader_desc
+
+        return new_shader_dict
+
+    def predict_cost(
+        self,
+        shader_name : str,
+        shader_desc : _shader_base.Shader.Desc
+    ) -> float:
+        return self._cost_model.predict(shader_name, shader_desc)
+
+    def handle_result(
+        self,
+        result : _shader_base.Shader.GenerateAndCompileResult
+    ):
+        if not result.success:
+            self.num_failed += 1
+        if result.cache_hit:
+            self.num_cache_hits += 1
+        self.trace_events.extend(result.trace_events)
+
+        shader_desc = self.shader_dict[result.index_name]
+        if result.duration is not None and result.success \
+            and not result.cache_hit:
+            #
+            self._cost_model.record(
+                result.index_name, shader_desc, result.duration
+            )
+
+        shader = shader_desc.create(self._out_dir_path, self._options)
+        self.ref_check_paths.extend(
+            shader.get_ref_paths(compiled = result.success)
+        )
+        output_paths = shader.get_output_paths()
+        if self._log_files:
+            output_paths.append(shader.get_log_path())
+
+        self.manifest.add_shader(
+            shader_name = result.index_name,
+            outputs = [output_path.name for output_path in output_paths],
+            success = result.success
+        )
+
+def _get_pipeline_shaders(
+    out_dir_path : Path,
+    options : Options
+) -> Tuple[Dict[str, _shader_base.Shader.Desc], dict]:
+    '''
+    The shaders that don't depend on the assets, keyed by their names, and
+    their index per pipeline pass, target and stage
+    '''
+    pipeline_shader_descs = dict()
+    pipeline_shader_index = dict()
+    if options.light_mode == 'tiled' and options.get_pipeline_profile().dx12:
+        light_culling_shader = _hlsl.LightCullingShader(
+            out_dir_path, options = options
+        )
+        light_culling_shader_name = light_culling_shader.get_index_name()
+        pipeline_shader_descs[light_culling_shader_name] = (
+            light_culling_shader.get_desc()
+        )
+        pipeline_shader_index['light_culling'] = {
+            'dx' : {'cs' : light_culling_shader_name}
+        }
+    return pipeline_shader_descs, pipeline_shader_index
+
+def _run_serially(
+    run : _Run,
+    gltf_paths : Sequence[Path],
+    shader_descs : Dict[str, _shader_base.Shader.Desc],
+    process_asset : Callable[..., _AssetResult],
+    generate_and_compile : Callable[
+        [_shader_base.Shader.Desc],
+        _shader_base.Shader.GenerateAndCompileResult
+    ]
+):
+    for shader_desc in shader_descs.values():
+        run.handle_result(generate_and_compile(shader_desc))
+    for gltf_path in gltf_paths:
+        for shader_desc in run.handle_asset_result(
+            process_asset(gltf_file_path = gltf_path)
+        ).values():
+            run.handle_result(generate_and_compile(shader_desc))
+
+async def _run_async(
+    run : _Run,
+    gltf_paths : Sequence[Path],
+    shader_descs : Dict[str, _shader_base.Shader.Desc],
+    process_asset : Callable[..., _AssetResult],
+    generate_and_compile : Callable[
+        [_shader_base.Shader.Desc, _async_compile.ToolRunner],
+        Awaitable[_shader_base.Shader.GenerateAndCompileResult]
+    ]
+):
+    '''
+    A single process generates the shaders and drives the compilers as asyncio
+    subprocesses, as many at a time as there are cores. The assets are parsed
+    in the same process, between the launches of the compilers.
+    '''
+    run_tool = _async_compile.ToolRunner(max_jobs = os.cpu_count())
+    tasks = []
+
+    for shader_descs_batch in itertools.chain(
+        [shader_descs],
+        (
+            run.handle_asset_result(process_asset(gltf_file_path = gltf_path))
+            for gltf_path in gltf_paths
+        )
+    ):
+        for shader_desc in shader_descs_batch.values():
+            tasks.append(
+                asyncio.create_task(generate_and_compile(shader_desc, run_tool))
+            )
+            # Let the new task generate the shader and launch the compilers
+            # before moving on to the next one
+            await asyncio.sleep(0)
+
+    for task in asyncio.as_completed(tasks):
+        run.handle_result(await task)
+
+def _run_on_pool(
+    run : _Run,
+    executor : Executor,
+    num_workers : int,
+    gltf_paths : Sequence[Path],
+    shader_descs : Dict[str, _shader_base.Shader.Desc],
+    process_asset : Callable[..., _AssetResult],
+    generate_and_compile : Callable[
+        [_shader_base.Shader.Desc],
+        _shader_base.Shader.GenerateAndCompileResult
+    ]
+):
+    '''
+    A single pool runs both the asset and the shader jobs. The shaders are
+    scheduled as soon as the asset using them is parsed, so that the phases
+    overlap. The number of asset jobs in flight is capped in order to
+    interleave them with the shader jobs. `shader_descs` are the shaders that
+    don't depend on the assets.
+
+    The shader jobs wait in a heap and the ones predicted to take the longest
+    are submitted first, so that they don't end up holding up the end of the
+    run. Only a few more shader jobs than there are workers are in flight, so
+    that the order of the submissions is the order of the execution.
+    '''
+    gltf_path_iter = iter(gltf_paths)
+    num_asset_jobs = 0
+    shader_heap = []
+    shader_seq = itertools.count()     # Breaks the ties in the heap
+    num_shader_jobs = 0
+    pending = set()
+
+    def _submit_asset_jobs():
+        nonlocal num_asset_jobs
+        while num_asset_jobs < num_workers:
+            gltf_path = next(gltf_path_iter, None)
+            if gltf_path is None:
+                break
+            pending.add(
+                executor.submit(process_asset, gltf_file_path = gltf_path)
+            )
+            num_asset_jobs += 1
+
+    def _push_shader_jobs(
+        shader_descs : Dict[str, _shader_base.Shader.Desc]
+    ):
+        for shader_name, shader_desc in shader_descs.items():
+            heapq.heappush(
+                shader_heap,
+                (
+                    -run.predict_cost(shader_name, shader_desc),
+                    next(shader_seq),
+                    shader_desc
+                )
+            )
+
+    def _submit_shader_jobs():
+        nonlocal num_shader_jobs
+        while shader_heap and num_shader_jobs < 2 * num_workers:
+            _, _, shader_desc = heapq.heappop(shader_heap)
+            pending.add(executor.submit(generate_and_compile, shader_desc))
+            num_shader_jobs += 1
+
+    try:
+        _push_shader_jobs(shader_descs)
+        _submit_asset_jobs()
+        _submit_shader_jobs()
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if isinstance(result, _AssetResult):
+                    num_asset_jobs -= 1
+                    _push_shader_jobs(run.handle_asset_result(result))
+                else:
+                    num_shader_jobs -= 1
+                    run.handle_result(result)
+            _submit_asset_jobs()
+            _submit_shader_jobs()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        # The jobs that have already started would keep writing the outputs
+        # while a shared pool runs the next run
+        wait(pending)
+        raise
+
+def _write_reports(
+    manifest : Manifest,
+    out_dir_path : Path,
+    permutation_report_path : Path,
+    cost_report_path : Path
+):
+    # The manifest also covers the assets that haven't been reprocessed
+    permutation_report = get_report(manifest.get_shader_usage_by_asset())
+    print(
+        f'\n{len(permutation_report["permutations"])} unique shader '
+        f'permutations, {len(permutation_report["outliers"])} of them used '
+        'by a single primitive.'
     )
+    if permutation_report_path is not None:
+        with open(permutation_report_path, 'w') as report_file:
+            json.dump(permutation_report, report_file, indent = 4)
+        print(f'Permutation report written to {permutation_report_path}')
+
+    if cost_report_path is not None:
+        # Including the shaders that haven't been recompiled
+        with _trace.span('Cost report'), \
+            perf.TimedScope('Analyzing the compiled shaders '):
+            #
+            cost_report = _cost_report.build(
+                out_dir_path, manifest.get_compiled_outputs()
+            )
+        _cost_report.write(cost_report_path, cost_report)
+        print(f'Cost report written to {cost_report_path}')
+        if cost_report['failed']:
+            print(
+                f'{len(cost_report["failed"])} compiled outputs could not be '
+                'analyzed.'
+            )
+
+def _write_archive_and_global_index(
+    manifest : Manifest,
+    out_dir_path : Path,
+    pipeline_shader_index : dict,
+    archive_path : Path,
+    global_index_path : Path,
+    global_index_binary : bool
+):
+    if archive_path is None and global_index_path is None:
+        return
+
+    # Including the assets that haven't been reprocessed
+    shader_indices = manifest.load_shader_indices(out_dir_path)
+
+    if archive_path is not None:
+        with _trace.span('Write archive'), \
+            perf.TimedScope(f'Writing shader archive {archive_path} '):
+            #
+            num_packed = _archive.pack(
+                archive_path,
+                out_dir_path,
+                shader_indices,
+                manifest.get_compiled_outputs(),
+                pipeline_shader_index
+            )
+        print(f'{num_packed} shaders packed into {archive_path}')
+
+    if global_index_path is not None:
+        _global_index.write(
+            global_index_path,
+            _global_index.build(shader_indices, pipeline_shader_index),
+            binary = global_index_binary
+        )
+        print(f'Global shader index written to {global_index_path}')
 
 def generate(
     gltf_dir_path : Path,
     out_dir_path : Path,
     serial : bool,
-    ref_differ : RefDiffer
+    ref_differ : RefDiffer,
+    compile_cache : CompileCache = None,
+    incremental : bool = False,
+    backend : str = 'process',
+    options : Options = Options(),
+    trace_path : Path = None,
+    permutation_report_path : Path = None,
+    quiet : bool = False,
+    log_files : bool = False,
+    executor : ProcessPoolExecutor = None,
+    ref_check_pass : bool = False,
+    archive_path : Path = None,
+    global_index_path : Path = None,
+    global_index_binary : bool = False,
+    cost_report_path : Path = None,
+    cost_history_path : Path = None,
+    generator_hash : str = None
 ):
+    '''
+    `generator_hash` overrides the hash of the generator code and tools on
+    disk, for a resident process that keeps running the code it was started
+    with.
+    '''
     if not gltf_dir_path.is_dir():
         raise NotADirectoryError(gltf_dir_path)
 
-    # Delete the output directory in order to delete any stale files
-    if os.path.exists(out_dir_path):
-        shutil.rmtree(out_dir_path)
-    os.makedirs(out_dir_path)
+    # Checked before any jobs are submitted, rather than failing in each
+    step = options.alpha_cutoff_step
+    if step is not None and not step > 0:
+        raise ValueError(f'The alpha cutoff step must be positive: {step}')
 
-    shader_dict = dict()
+    # The spans recorded by the workers are sent back with their results
+    trace = trace_path is not None
+    _trace.enable(trace)
 
-    with perf.TimedScope(
-        start_message = 'Parsing glTF assets',
-        end_message = 'Parsed all glTF assets'
-    ):
+    if incremental:
+        # Only the outputs recorded in the previous manifest that aren't
+        # produced anymore will be deleted
+        prev_manifest = Manifest.load(out_dir_path)
+    else:
+        prev_manifest = Manifest()
+
+        # Delete the output directory in order to delete any stale files
+        if os.path.exists(out_dir_path):
+            shutil.rmtree(out_dir_path)
+    os.makedirs(out_dir_path, exist_ok = True)
+
+    # The manifest is only kept in memory unless it's needed by the next
+    # incremental run
+    if incremental and generator_hash is None:
+        generator_hash = get_generator_hash(options)
+
+    # The compile times recorded by the previous runs, if kept
+    if cost_history_path is not None:
+        cost_model = CostModel.load(cost_history_path)
+    else:
+        cost_model = CostModel()
+
+    run = _Run(
+        gltf_dir_path = gltf_dir_path,
+        out_dir_path = out_dir_path,
+        options = options,
+        prev_manifest = prev_manifest,
+        generator_hash = generator_hash,
+        cost_model = cost_model,
+        log_files = log_files
+    )
+
+    # The outputs are checked against the references in a separate pass
+    # after the generation, rather than inline in the jobs
+    if ref_differ is not None and ref_check_pass:
+        inline_ref_differ = None
+    else:
+        inline_ref_differ = ref_differ
+
+    if isinstance(ref_differ, _ref_check.RefChecker):
+        ref_differ.update_index()
+
+    if options.shared_include and options.get_pipeline_profile().dx12:
+        for include_path in _hlsl.generate_shared_includes(
+            out_dir_path, inline_ref_differ, options
+        ):
+            run.manifest.add_shared_file(include_path.name)
+            run.ref_check_paths.append(include_path)
+
+    gltf_paths = run.get_out_of_date_assets(_find_gltf_paths(gltf_dir_path))
+    if incremental:
+        print(f'{len(gltf_paths)} glTF assets are out of date')
+
+    pipeline_shader_descs, pipeline_shader_index = _get_pipeline_shaders(
+        out_dir_path, options
+    )
+
+    _identify_tools(options)
+
+    with _trace.span('Parse, generate and compile'), perf.TimedScope(
+        start_message = 'Parsing glTF assets, generating and compiling shaders',
+        end_message = 'Done generating and compiling shaders'
+    ), stream_records(
+        # Worker processes stream their log records back over a queue
+        enabled = not serial and backend == 'process'
+    ) as log_queue:
+        log_config = LogConfig(
+            queue = log_queue,
+            quiet = quiet,
+            log_files = log_files
+        )
         process_asset_partial = functools.partial(
             _process_asset,
-            out_dir = out_dir_path
+            out_dir = out_dir_path,
+            options = options,
+            log_config = log_config,
+            trace = trace
+        )
+        generate_and_compile_partial = functools.partial(
+            _generate_and_compile,
+            out_dir = out_dir_path,
+            options = options,
+            ref_differ = inline_ref_differ,
+            compile_cache = compile_cache,
+            log_config = log_config,
+            trace = trace
         )
-        gltf_files_glob = gltf_dir_path.glob('**/*.gltf')
+        shader_descs = run.add_shaders(pipeline_shader_descs)
 
         if serial:
-            for gltf_path in gltf_files_glob:
-                asset_result = process_asset_partial(gltf_file_path = gltf_path)
-                print(asset_result.log)
-                shader_dict |= asset_result.shader_dict
+            _run_serially(
+                run = run,
+                gltf_paths = gltf_paths,
+                shader_descs = shader_descs,
+                process_asset = process_asset_partial,
+                generate_and_compile = generate_and_compile_partial
+            )
+        elif backend == 'asyncio':
+            asyncio.run(
+                _run_async(
+                    run = run,
+                    gltf_paths = gltf_paths,
+                    shader_descs = shader_descs,
+                    process_asset = process_asset_partial,
+                    generate_and_compile = functools.partial(
+                        _generate_and_compile_async,
+                        out_dir = out_dir_path,
+                        options = options,
+                        ref_differ = inline_ref_differ,
+                        compile_cache = compile_cache,
+                        log_config = log_config
+                    )
+                )
+            )
         else:
-            with mp.Pool() as pool:
-                for asset_result in pool.imap_unordered(
-                    process_asset_partial,
-                    gltf_files_glob
-                ):
-                    print(asset_result.log)
-                    shader_dict |= asset_result.shader_dict
-
-    with perf.TimedScope(
-        start_message = 'Generating and compiling shaders',
-        end_message = 'Done generating and compiling shaders'
-    ):
-        print()
-        dxc.identify()
-        glslang.identify()
+            # The pool may be kept alive across runs by the caller
+            num_workers = _get_num_workers()
+            with (
+                contextlib.nullcontext(executor) if executor is not None
+                else ProcessPoolExecutor(max_workers = num_workers)
+            ) as executor:
+                _run_on_pool(
+                    run = run,
+                    executor = executor,
+                    num_workers = num_workers,
+                    gltf_paths = gltf_paths,
+                    shader_descs = shader_descs,
+                    process_asset = process_asset_partial,
+                    generate_and_compile = generate_and_compile_partial
+                )
+
+        if compile_cache is not None:
+            num_evicted = compile_cache.trim()
+            print(
+                f'\nCompile cache: {run.num_cache_hits} hits, '
+                f'{len(run.shader_dict) - run.num_cache_hits} misses, '
+                f'{num_evicted} entries evicted.'
+            )
 
-        num_failed = 0
+    ref_check_errors = []
+    if inline_ref_differ is None and ref_differ is not None:
+        with _trace.span('Ref check'), perf.TimedScope(
+            f'Checking {len(run.ref_check_paths)} files against the references '
+        ):
+            ref_check_errors = _ref_check.check_all(
+                ref_differ, run.ref_check_paths
+            )
+        for error in ref_check_errors:
+            print(f'\n{error}')
 
-        if serial:
-            for shader in shader_dict.values():
-                result = shader.generate_and_compile(ref_differ = ref_differ)
-                if not result.success:
-                    num_failed += 1
-                print(result.log, end = '')
-        else:
-            with mp.Pool() as pool:
-                for result in pool.imap_unordered(
-                    functools.partial(
-                        _generate_and_compile,
-                        ref_differ = ref_differ
-                    ),
-                    shader_dict.values()
-                ):
-                    if not result.success:
-                        num_failed += 1
-                    print(result.log, end = '')
+    _write_reports(
+        run.manifest, out_dir_path, permutation_report_path, cost_report_path
+    )
+    _write_archive_and_global_index(
+        manifest = run.manifest,
+        out_dir_path = out_dir_path,
+        pipeline_shader_index = pipeline_shader_index,
+        archive_path = archive_path,
+        global_index_path = global_index_path,
+        global_index_binary = global_index_binary
+    )
+
+    num_deleted = run.manifest.collect_garbage(prev_manifest, out_dir_path)
+    if cost_history_path is not None:
+        cost_model.save(cost_history_path)
+    if incremental:
+        run.manifest.save(out_dir_path)
+        print(f'Deleted {num_deleted} stale output files.')
+
+    if trace:
+        _trace.write(run.trace_events + _trace.collect(), trace_path)
+        _trace.enable(False)
+        print(f'Trace written to {trace_path}')
+
+    if ref_check_errors:
+        raise AssertionError(
+            f'{len(ref_check_errors)} files differ from the references - see '
+            'the log above.'
+        )
+
+    if run.num_failed > 0:
+        raise RuntimeError(
+            f'{run.num_failed} out of {len(run.shader_dict)} shaders failed to '
+            'compile - see the log above.'
+        )
+    else:
+        print(f'\nAll {len(run.shader_dict)} shaders compiled successfully.')
+
+def _positive_float(value : str) -> float:
+    result = float(value)
+    if not result > 0:
+        raise argparse.ArgumentTypeError(f'{value} is not positive')
+    return result
+
+def _get_gltf_dir_snapshot(
+    gltf_dir_path : Path
+) -> Dict[Path, Tuple[int, int]]:
+    snapshot = dict()
+    for gltf_path in _find_gltf_paths(gltf_dir_path):
+        try:
+            gltf_stat = gltf_path.stat()
+        except OSError:
+            # Deleted since listed
+            continue
+        snapshot[gltf_path] = (gltf_stat.st_mtime_ns, gltf_stat.st_size)
+    return snapshot
 
-        if num_failed > 0:
-            raise RuntimeError(
-                f'{num_failed} out of {len(shader_dict)} shaders failed to '
-                'compile - see the log above.'
+class _Watcher:
+    '''
+    Polls the glTF assets and reruns `generate()` incrementally once they have
+    changed
+    '''
+    def __init__(self, gltf_dir_path : Path, **generate_kwargs):
+        self._gltf_dir_path = gltf_dir_path
+        self._generate_kwargs = generate_kwargs
+        self._options = generate_kwargs.get('options', Options())
+        self._generator_hash = get_generator_hash(self._options)
+        self._prev_snapshot = _get_gltf_dir_snapshot(gltf_dir_path)
+        self._generated_snapshot = None
+
+    def poll(self) -> bool:
+        '''
+        Regenerates if the assets have changed since the last run and then
+        stayed unchanged since the previous poll, so that assets that are
+        still being written aren't processed. Returns False if the generator
+        code or the compilers have changed, in which case the process should
+        exit.
+        '''
+        snapshot = _get_gltf_dir_snapshot(self._gltf_dir_path)
+        is_settled = snapshot == self._prev_snapshot
+        self._prev_snapshot = snapshot
+        if not is_settled or snapshot == self._generated_snapshot:
+            return True
+
+        if get_generator_hash(self._options) != self._generator_hash:
+            print(
+                '\nThe generator code or the compilers have changed, '
+                'exiting. Restart to regenerate with the new code.'
             )
-        else:
-            print(f'\nAll {len(shader_dict)} shaders compiled successfully.')
+            return False
+
+        self._generated_snapshot = snapshot
+        try:
+            generate(
+                gltf_dir_path = self._gltf_dir_path,
+                incremental = True,
+                generator_hash = self._generator_hash,
+                **self._generate_kwargs
+            )
+        except Exception as e:
+            # E.g. a shader failing to compile or a malformed asset, which the
+            # next change may fix
+            print(f'\n{type(e).__name__}: {e}')
+        print(f'\nWatching {self._gltf_dir_path} for changes...')
+        return True
+
+def watch(
+    gltf_dir_path : Path,
+    out_dir_path : Path,
+    serial : bool,
+    backend : str = 'process',
+    poll_interval : float = 0.5,
+    **kwargs
+):
+    '''
+    Stays resident and reruns `generate()` incrementally whenever the glTF
+    assets change, so that only the affected assets and shaders are
+    processed. The worker pool is kept alive across the runs.
+
+    The generator code is only hashed once, as the edits to it don't affect
+    the process and its pool, which keep running the code they have started
+    with. The process exits when the code is edited, so that it can be
+    restarted with the new code.
+    '''
+    with contextlib.ExitStack() as exit_stack:
+        executor = None
+        if not serial and backend == 'process':
+            executor = exit_stack.enter_context(
+                ProcessPoolExecutor(max_workers = _get_num_workers())
+            )
+
+        watcher = _Watcher(
+            gltf_dir_path,
+            out_dir_path = out_dir_path,
+            serial = serial,
+            backend = backend,
+            executor = executor,
+            **kwargs
+        )
+        while watcher.poll():
+            time.sleep(poll_interval)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -185,7 +918,204 @@ if __name__ == "__main__":
     parser.add_argument("--gltf-dir", help = "Path to the source glTF assets")
     parser.add_argument("--out-dir", help = "Path to the output directory")
     parser.add_argument("--ref-dir", help = "Path to the test references")
-    
+    parser.add_argument(
+        "--ref-index",
+        help = (
+            "Path to a JSON file to keep the hashes of the test references "
+            "in across runs."
+        )
+    )
+    parser.add_argument(
+        "--ref-check-pass",
+        action = 'store_true',
+        help = (
+            "Check the outputs against the test references in a separate "
+            "parallel pass after the generation."
+        )
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help = "Path to the compile cache. Caching is disabled if omitted."
+    )
+    parser.add_argument(
+        "--cache-size",
+        type = int,
+        default = 1024,
+        help = "Compile cache size limit in MB."
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action = 'store_true',
+        help = (
+            "Only process the glTF assets and compile the shaders that have "
+            "changed since the previous run instead of wiping the output "
+            "directory."
+        )
+    )
+    parser.add_argument(
+        "--watch",
+        action = 'store_true',
+        help = (
+            "Stay resident and incrementally regenerate the shaders whenever "
+            "the glTF assets change."
+        )
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type = float,
+        default = 0.5,
+        help = "Interval in seconds at which the glTF assets are polled."
+    )
+    parser.add_argument(
+        "--backend",
+        choices = ['process', 'asyncio'],
+        default = 'process',
+        help = (
+            "Parallelize compilation with a pool of worker processes or "
+            "with asyncio subprocesses driven by a single process."
+        )
+    )
+    parser.add_argument(
+        "--profile",
+        choices = list(pipeline_profiles),
+        default = 'full-validation',
+        help = (
+            "The pipeline profile, deciding which targets the shaders are "
+            "generated for and whether the HLSL shaders are also validated "
+            "through GLSL."
+        )
+    )
+    parser.add_argument(
+        "--lights",
+        choices = ['single', 'loop', 'tiled'],
+        default = 'single',
+        help = (
+            "How the pixel shaders iterate over the lights: 'single' shades "
+            "with the first light only, 'loop' loops over all of them and "
+            "'tiled' over the per-tile light lists written by the generated "
+            "light culling compute shader."
+        )
+    )
+    parser.add_argument(
+        "--shadow-filter",
+        choices = ['pcf1x1', 'pcf3x3', 'pcf5x5', 'gather', 'poisson'],
+        default = 'pcf5x5',
+        help = (
+            "The filter of the shadow map lookups: a kernel of comparison "
+            "samples, four GatherCmp fetches covering 4x4 texels or 8 "
+            "samples on a Poisson disk rotated per pixel."
+        )
+    )
+    parser.add_argument(
+        "--color-precision",
+        choices = ['float', 'min16float', 'float16'],
+        default = 'float',
+        help = (
+            "The precision of the color, BRDF and IBL computations in the "
+            "pixel shaders. 'float16' compiles them for shader model 6.2 "
+            "with native 16-bit types."
+        )
+    )
+    parser.add_argument(
+        "--shared-include",
+        action = 'store_true',
+        help = (
+            "Generate the uniforms and the PBR surface library once and "
+            "#include them in all vertex and pixel shaders."
+        )
+    )
+    parser.add_argument(
+        "--dxc-library",
+        action = 'store_true',
+        help = (
+            "Compile HLSL in-process through the dxcompiler library instead "
+            "of launching dxc for every compilation."
+        )
+    )
+    parser.add_argument(
+        "--alpha-cutoff",
+        choices = ['baked', 'uniform'],
+        default = 'baked',
+        help = (
+            "Bake the alpha cutoffs of masked materials into the pixel "
+            "shaders or read them from the per-object uniforms, which avoids "
+            "a permutation per distinct value."
+        )
+    )
+    parser.add_argument(
+        "--bake-identity-factors",
+        action = 'store_true',
+        help = (
+            "Omit the multiplications by the material factors that are at "
+            "their identities, and the emissive term if its factor is 0, "
+            "resulting in a pixel shader permutation per combination."
+        )
+    )
+    parser.add_argument(
+        "--alpha-cutoff-step",
+        type = _positive_float,
+        help = "Round the baked alpha cutoffs to multiples of this step."
+    )
+    parser.add_argument(
+        "--trace",
+        help = (
+            "Path to a Chrome trace JSON file to write the timings of the "
+            "pipeline stages to, viewable in Perfetto."
+        )
+    )
+    parser.add_argument(
+        "--permutation-report",
+        help = (
+            "Path to a JSON file to write the number of primitives using "
+            "each shader permutation to."
+        )
+    )
+    parser.add_argument(
+        "--cost-report",
+        help = (
+            "Path to a CSV or JSON file to write the static costs of the "
+            "compiled DXIL and SPIR-V shaders to, such as their instruction "
+            "and texture sample counts."
+        )
+    )
+    parser.add_argument(
+        "--cost-history",
+        help = (
+            "Path to a JSON file outside the output directory to keep the "
+            "compile times of the shaders in across runs, in order to "
+            "schedule the slowest ones first."
+        )
+    )
+    parser.add_argument(
+        "--archive",
+        help = (
+            "Path to a single archive file to pack the compiled shaders into, "
+            "along with a combined index of all the assets."
+        )
+    )
+    parser.add_argument(
+        "--global-index",
+        help = (
+            "Path to a single compact shader index for all the assets to "
+            "write in addition to the per-asset ones."
+        )
+    )
+    parser.add_argument(
+        "--global-index-binary",
+        action = 'store_true',
+        help = "Write the global shader index in the binary encoding."
+    )
+    parser.add_argument(
+        "--quiet",
+        action = 'store_true',
+        help = "Only print the logs of the jobs that fail."
+    )
+    parser.add_argument(
+        "--log-files",
+        action = 'store_true',
+        help = "Write the log of each shader to a file next to its outputs."
+    )
     parser.add_argument(
         "--serial",
         action = 'store_true',
@@ -193,9 +1123,55 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
-    generate(
+    if args.watch:
+        run = functools.partial(watch, poll_interval = args.watch_interval)
+    else:
+        run = functools.partial(generate, incremental = args.incremental)
+
+    run(
         gltf_dir_path = Path(args.gltf_dir),
         out_dir_path = Path(args.out_dir),
         serial = args.serial,
-        ref_differ = RefDiffer(Path(args.ref_dir)) if args.ref_dir else None
+        backend = args.backend,
+        options = Options(
+            shared_include = args.shared_include,
+            alpha_cutoff_mode = args.alpha_cutoff,
+            alpha_cutoff_step = args.alpha_cutoff_step,
+            bake_identity_factors = args.bake_identity_factors,
+            dxc_library = args.dxc_library,
+            pipeline_profile = args.profile,
+            light_mode = args.lights,
+            shadow_filter = args.shadow_filter,
+            color_precision = args.color_precision
+        ),
+        trace_path = Path(args.trace) if args.trace else None,
+        archive_path = Path(args.archive) if args.archive else None,
+        global_index_path = (
+            Path(args.global_index) if args.global_index else None
+        ),
+        global_index_binary = args.global_index_binary,
+        cost_report_path = (
+            Path(args.cost_report) if args.cost_report else None
+        ),
+        cost_history_path = (
+            Path(args.cost_history) if args.cost_history else None
+        ),
+        quiet = args.quiet,
+        log_files = args.log_files,
+        permutation_report_path = (
+            Path(args.permutation_report) if args.permutation_report else None
+        ),
+        ref_differ = (
+            _ref_check.RefChecker(
+                ref_dir = Path(args.ref_dir),
+                index_path = Path(args.ref_index) if args.ref_index else None
+            ) if args.ref_dir else None
+        ),
+        ref_check_pass = args.ref_check_pass,
+        compile_cache = (
+            CompileCache(
+                cache_dir = Path(args.cache_dir),
+                max_size_bytes = args.cache_size * 1024 * 1024
+            ) if args.cache_dir else None
+        )
     )
\ No newline at end of file
@@ -0,0 +1,224 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io, json, struct, sys, zipfile
+from pathlib import Path
+
+import pytest
+
+tests_dir_path = Path(__file__).parent
+repo_root_dir_path = tests_dir_path.parent
+
+# Add these directories to PYTHONPATH
+src_dir_path = (repo_root_dir_path / 'src').resolve()
+metashade_dir_path = (repo_root_dir_path / 'metashade').resolve()
+sys.path += [str(src_dir_path), str(metashade_dir_path)]
+
+# The fixtures import the modules depending on Metashade when they are used,
+# so that the tests that don't need it can run without it.
+
+@pytest.fixture
+def describe_ps():
+    '''
+    Describes the pixel shader of a material with a base color texture,
+    sampled with the first UV set, unless another `material` is passed
+    '''
+    import _gltf_metadata
+    from _impl.options import Options
+    from _impl.vertex_data import VertexData
+    import _impl.ps as impl_ps
+
+    def _describe_ps(
+        options : Options = None,
+        material : _gltf_metadata.Material = None,
+        has_tangent : bool = False
+    ) -> impl_ps.ps.Desc:
+        if material is None:
+            material = _gltf_metadata.Material(
+                pbrMetallicRoughness = _gltf_metadata.PbrMetallicRoughness(
+                    baseColorTexture = _gltf_metadata.TextureInfo(index = 0)
+                )
+            )
+        vertex_data_desc = VertexData.Desc(
+            has_tangent = has_tangent, passthru_attrs = ('uv0',)
+        )
+        return impl_ps.ps.describe(
+            material, vertex_data_desc, options or Options()
+        )
+
+    return _describe_ps
+
+@pytest.fixture
+def generate_ps(describe_ps):
+    '''
+    Generates the pixel shader described by `describe_ps` into a string
+    '''
+    from _impl.options import Options
+    import _impl.ps as impl_ps
+
+    def _generate_ps(options : Options = None) -> str:
+        options = options or Options()
+        ps_file = io.StringIO()
+        impl_ps.ps(describe_ps(options), options).generate(ps_file)
+        return ps_file.getvalue()
+
+    return _generate_ps
+
+@pytest.fixture
+def write_gltf():
+    '''
+    Returns a function writing a glTF asset with a single primitive, by
+    default with a base color texture. Only the metadata the shaders depend
+    on is written, as a .glb file without a binary chunk if the path has the
+    .glb extension.
+    '''
+    def _write_gltf(
+        gltf_path : Path,
+        material : dict = None,
+        has_tangent : bool = False
+    ):
+        if material is None:
+            material = {
+                'pbrMetallicRoughness' : {'baseColorTexture' : {'index' : 0}}
+            }
+
+        attributes = {'POSITION' : 0, 'NORMAL' : 1, 'TEXCOORD_0' : 2}
+        if has_tangent:
+            attributes['TANGENT'] = 3
+
+        gltf_json = json.dumps({
+            'asset' : {'version' : '2.0'},
+            'materials' : [material],
+            'meshes' : [{
+                'name' : 'mesh',
+                'primitives' : [
+                    {'attributes' : attributes, 'material' : 0}
+                ]
+            }]
+        }).encode()
+
+        if gltf_path.suffix == '.glb':
+            # The chunks are padded with spaces to 4-byte boundaries
+            gltf_json += b' ' * (-len(gltf_json) % 4)
+            json_chunk = struct.pack('<I4s', len(gltf_json), b'JSON') \
+                + gltf_json
+            gltf_bytes = struct.pack(
+                '<4sII', b'glTF', 2, 12 + len(json_chunk)
+            ) + json_chunk
+        else:
+            gltf_bytes = gltf_json
+
+        gltf_path.parent.mkdir(parents = True, exist_ok = True)
+        gltf_path.write_bytes(gltf_bytes)
+
+    return _write_gltf
+
+@pytest.fixture
+def gltf_dir_path(tmp_path, write_gltf) -> Path:
+    '''
+    Two glTF assets, a.gltf and b.gltf, which don't share any vertex or
+    pixel shaders
+    '''
+    gltf_dir_path = tmp_path / 'gltf'
+    write_gltf(gltf_dir_path / 'a.gltf')
+    write_gltf(
+        gltf_dir_path / 'b.gltf',
+        material = {
+            'pbrMetallicRoughness' : {'baseColorTexture' : {'index' : 0}},
+            'normalTexture' : {'index' : 1}
+        },
+        has_tangent = True
+    )
+    return gltf_dir_path
+
+_stub_tool_template = """#!{python}
+import os, sys
+from pathlib import Path
+
+tool_name = {tool_name!r}
+args = sys.argv[1:]
+
+# spirv-cross reports its revision instead of a version, like the real one
+version_arg = '--revision' if tool_name == 'spirv-cross' else '--version'
+if args and args[0] in ('--version', '--revision'):
+    if args[0] != version_arg:
+        sys.exit(f'{{tool_name}}: unknown option {{args[0]}}')
+    print(f'{{tool_name}} stub')
+    sys.exit()
+
+output_path = None
+for output_arg in ('-Fo', '-o', '--output'):
+    if output_arg in args:
+        output_path = args[args.index(output_arg) + 1]
+
+if output_path is not None and output_path != os.devnull:
+    # The tool name followed by the inputs, so that the outputs change with
+    # the sources
+    output = tool_name.encode() + b'\\n'
+    for arg in args:
+        if arg != output_path and Path(arg).is_file():
+            output += Path(arg).read_bytes()
+    Path(output_path).write_bytes(output)
+"""
+
+def _write_stub_tool(bin_dir_path : Path, tool_name : str):
+    script = _stub_tool_template.format(
+        python = sys.executable, tool_name = tool_name
+    )
+
+    if sys.platform != 'win32':
+        tool_path = bin_dir_path / tool_name
+        tool_path.write_text(script)
+        tool_path.chmod(0o755)
+        return
+
+    # The compilers are launched by name, which only finds executables on
+    # Windows. The stub is a console script launcher, the same as pip
+    # installs: the launcher of distlib runs the Python archive appended to
+    # it with the interpreter named in the shebang line in between.
+    from pip._vendor import distlib
+    launcher_name = 't64.exe' if sys.maxsize > 2 ** 32 else 't32.exe'
+    launcher = (Path(distlib.__file__).parent / launcher_name).read_bytes()
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as archive_file:
+        archive_file.writestr('__main__.py', script)
+
+    (bin_dir_path / f'{tool_name}.exe').write_bytes(
+        launcher
+        + f'#!"{sys.executable}"\n'.encode()
+        + archive.getvalue()
+    )
+
+@pytest.fixture
+def stub_tools(tmp_path, monkeypatch):
+    '''
+    Returns a function replacing the compilers on PATH with stubs, which
+    write the tool name followed by their inputs to their outputs. Only the
+    tools passed to it are found.
+    '''
+    from _compile_cache import get_tool_identity
+
+    def _stub_tools(tool_names = ('dxc', 'spirv-cross', 'glslang')) -> Path:
+        bin_dir_path = tmp_path / 'stub-bin'
+        bin_dir_path.mkdir()
+        for tool_name in tool_names:
+            _write_stub_tool(bin_dir_path, tool_name)
+
+        monkeypatch.setenv('PATH', str(bin_dir_path))
+        get_tool_identity.cache_clear()
+        return bin_dir_path
+
+    yield _stub_tools
+    get_tool_identity.cache_clear()
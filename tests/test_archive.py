@@ -0,0 +1,81 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import _archive
+
+def test_pack(tmp_path):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    (out_dir / 'a-VS.cso').write_bytes(b'vs')
+    (out_dir / 'a-PS.cso').write_bytes(b'ps' * 200)
+    (out_dir / 'frag.spv').write_bytes(b'frag')
+    # Left over by a previous run or failed after the DXIL compilation
+    (out_dir / 'c-PS.cso').write_bytes(b'stale')
+
+    shader_indices = {
+        'asset.gltf' : [[
+            {
+                'dx' : {'vs' : 'a-VS.cso', 'ps' : 'a-PS.cso'},
+                'vk' : {'frag' : 'frag.spv'}
+            },
+            {
+                # Failed to compile
+                'dx' : {'vs' : 'a-VS.cso', 'ps' : 'b-PS.cso'}
+            },
+            {
+                'dx' : {'vs' : 'a-VS.cso', 'ps' : 'c-PS.cso'}
+            }
+        ]]
+    }
+    (out_dir / 'culling-CS.cso').write_bytes(b'cs')
+    pipeline_shader_index = {
+        'light_culling' : {'dx' : {'cs' : 'culling-CS.cso'}}
+    }
+    compiled_shader_names = {
+        'a-VS.cso', 'a-PS.cso', 'frag.spv', 'culling-CS.cso'
+    }
+
+    archive_path = tmp_path / 'shaders.pack'
+    assert _archive.pack(
+        archive_path,
+        out_dir,
+        shader_indices,
+        compiled_shader_names,
+        pipeline_shader_index
+    ) == 4
+
+    toc = _archive.read_toc(archive_path)
+    data = archive_path.read_bytes()
+    assert sorted(toc) == ['a-PS.cso', 'a-VS.cso', 'culling-CS.cso', 'frag.spv']
+    for name, blob in toc.items():
+        assert blob.offset % _archive.alignment == 0
+        assert (
+            data[blob.offset : blob.offset + blob.size]
+            == (out_dir / name).read_bytes()
+        )
+
+    combined_index = json.loads(
+        (tmp_path / 'shaders.pack.json').read_text()
+    )
+    primitives = combined_index['assets']['asset.gltf'][0]
+    assert primitives[0]['vk']['frag'] == toc['frag.spv']._asdict()
+    assert primitives[1]['dx'] == {
+        'vs' : toc['a-VS.cso']._asdict(), 'ps' : None
+    }
+    assert primitives[2]['dx']['ps'] is None
+    assert combined_index['pipeline'] == {
+        'light_culling' : {'dx' : {'cs' : toc['culling-CS.cso']._asdict()}}
+    }
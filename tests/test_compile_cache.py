@@ -0,0 +1,75 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from pathlib import Path
+
+from _compile_cache import CompileCache, get_tool_identity
+
+def _write(path : Path, content : str) -> Path:
+    path.write_text(content)
+    return path
+
+def test_fetch_after_store(tmp_path):
+    cache = CompileCache(tmp_path / 'cache', max_size_bytes = 1024)
+    src_path = _write(tmp_path / 'shader.hlsl', 'float4 main();')
+    key = cache.get_key([src_path], ['ps_6_0'])
+
+    out_paths = [
+        _write(tmp_path / 'shader.cso', 'dxil'),
+        _write(tmp_path / 'shader.hlsl.spv', 'spirv')
+    ]
+    assert not cache.fetch(key, out_paths)
+    cache.store(key, out_paths)
+
+    for out_path in out_paths:
+        out_path.unlink()
+    assert cache.fetch(key, out_paths)
+    assert [p.read_text() for p in out_paths] == ['dxil', 'spirv']
+
+def test_key_depends_on_fields(tmp_path):
+    src_path = _write(tmp_path / 'shader.hlsl', 'float4 main();')
+    assert (
+        CompileCache.get_key([src_path], ['ps_6_0'])
+        != CompileCache.get_key([src_path], ['ps_6_2'])
+    )
+
+def test_trim_evicts_least_recently_used(tmp_path):
+    cache = CompileCache(tmp_path / 'cache', max_size_bytes = 8)
+    out_path = tmp_path / 'shader.cso'
+
+    keys = []
+    for entry_idx in range(3):
+        key = CompileCache.get_key([], [str(entry_idx)])
+        _write(out_path, '0123')
+        cache.store(key, [out_path])
+        entry_path = tmp_path / 'cache' / key[:2] / key
+        os.utime(entry_path, (entry_idx, entry_idx))
+        keys.append(key)
+
+    assert cache.trim() == 1
+    assert not cache.fetch(keys[0], [out_path])
+    assert cache.fetch(keys[1], [out_path])
+    assert cache.fetch(keys[2], [out_path])
+
+def test_tool_identity(stub_tools):
+    bin_dir_path = stub_tools(('dxc', 'spirv-cross'))
+    assert get_tool_identity('glslang') == 'glslang (not found)'
+
+    # spirv-cross doesn't take --version, but the stub reports its revision
+    for exe_name in ('dxc', 'spirv-cross'):
+        identity = get_tool_identity(exe_name)
+        # With the .exe extension on Windows
+        assert identity.startswith(str(bin_dir_path / exe_name))
+        assert identity.rstrip().endswith(f'{exe_name} stub')
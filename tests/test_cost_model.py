@@ -0,0 +1,89 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from _cost_model import CostModel
+from _shader_base import Shader
+import _hlsl
+from _impl.vertex_data import VertexData
+import _gltf_metadata
+
+def test_predict(tmp_path, describe_ps):
+    def _ps_desc(has_tangent : bool, material) -> Shader.Desc:
+        return Shader.Desc(
+            _hlsl.PixelShader,
+            describe_ps(material = material, has_tangent = has_tangent)
+        )
+
+    texture = _gltf_metadata.TextureInfo(index = 0)
+    normal_mapped = _gltf_metadata.Material(
+        normalTexture = texture,
+        pbrMetallicRoughness = _gltf_metadata.PbrMetallicRoughness(
+            baseColorTexture = texture
+        )
+    )
+    vs_desc = Shader.Desc(
+        _hlsl.VertexShader,
+        VertexData.Desc(has_tangent = False, passthru_attrs = ('uv0',))
+    )
+    derivative_tbn_desc = _ps_desc(False, normal_mapped)
+    tangent_desc = _ps_desc(True, normal_mapped)
+    untextured_desc = _ps_desc(False, _gltf_metadata.Material())
+
+    history_path = tmp_path / 'compile-times.json'
+    cost_model = CostModel.load(history_path)
+    assert (
+        cost_model.predict('vs', vs_desc)
+        < cost_model.predict('untextured', untextured_desc)
+        < cost_model.predict('tangent', tangent_desc)
+        < cost_model.predict('derivative_tbn', derivative_tbn_desc)
+    )
+
+    # The recorded times take precedence and calibrate the heuristic
+    vs_units = cost_model.predict('vs', vs_desc)
+    untextured_units = cost_model.predict('untextured', untextured_desc)
+    tangent_units = cost_model.predict('tangent', tangent_desc)
+    cost_model.record('vs', vs_desc, 1.0)
+    cost_model.record('untextured', untextured_desc, 3.0)
+    cost_model.save(history_path)
+
+    cost_model = CostModel.load(history_path)
+    assert cost_model.predict('vs', vs_desc) == 1.0
+    assert cost_model.predict('untextured', untextured_desc) == 3.0
+    assert cost_model.predict('tangent', tangent_desc) == (
+        tangent_units * 4.0 / (vs_units + untextured_units)
+    )
+
+@pytest.mark.parametrize(
+    'history_text',
+    [
+        '{"vs"',
+        '[]',
+        '{"vs" : []}',
+        '{"vs" : {"seconds" : 1.0}}',
+        '{"vs" : {"seconds" : "1.0", "units" : 1.0}}'
+    ]
+)
+def test_malformed_history(tmp_path, history_text):
+    vs_desc = Shader.Desc(
+        _hlsl.VertexShader,
+        VertexData.Desc(has_tangent = False, passthru_attrs = ('uv0',))
+    )
+    history_path = tmp_path / 'compile-times.json'
+    history_path.write_text(history_text)
+
+    # Falls back to the heuristic
+    assert CostModel.load(history_path).predict('vs', vs_desc) \
+        == CostModel().predict('vs', vs_desc)
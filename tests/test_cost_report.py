@@ -0,0 +1,99 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv, struct
+
+import _cost_report
+
+_dxil_disassembly = '''
+; cbuffer cbPerFrame
+define void @main() {
+  %1 = call %dx.types.Handle @dx.op.createHandle(i32 57, i8 0, i32 0, i32 0, i1 false)
+  %2 = call %dx.types.CBufRet.f32 @dx.op.cbufferLoadLegacy.f32(i32 59, %dx.types.Handle %1, i32 3)
+  %3 = extractvalue %dx.types.CBufRet.f32 %2, 0
+  %4 = call %dx.types.ResRet.f32 @dx.op.sampleCmpLevelZero.f32(i32 65, %dx.types.Handle %1, %dx.types.Handle %1, float %3, float %3, float undef, float undef, i32 0, i32 0, i32 undef, float %3)
+
+; <label>:5
+  call void @dx.op.storeOutput.f32(i32 5, i32 0, i32 0, i8 0, float %3)
+  ret void
+}
+
+declare float @dx.op.loadInput.f32(i32, i32, i32, i8, i32)
+'''
+
+def _spirv_instruction(opcode : int, *operands : int) -> list:
+    return [(len(operands) + 1) << 16 | opcode] + list(operands)
+
+def _build_spirv() -> bytes:
+    words = [0x07230203, 0x10000, 0, 20, 0]
+    for instruction in (
+        _spirv_instruction(59, 1, 2, 2),        # OpVariable Uniform
+        _spirv_instruction(59, 1, 3, 0),        # OpVariable UniformConstant
+        _spirv_instruction(54, 4, 5, 0, 6),     # OpFunction
+        _spirv_instruction(248, 7),             # OpLabel
+        _spirv_instruction(59, 8, 9, 7),        # OpVariable Function
+        _spirv_instruction(65, 10, 11, 2, 12),  # OpAccessChain
+        _spirv_instruction(61, 13, 14, 11),     # OpLoad from the cbuffer
+        _spirv_instruction(61, 15, 16, 3),      # OpLoad of the texture
+        _spirv_instruction(87, 17, 18, 16, 14), # OpImageSampleImplicitLod
+        _spirv_instruction(62, 9, 18),          # OpStore
+        _spirv_instruction(253),                # OpReturn
+        _spirv_instruction(56)                  # OpFunctionEnd
+    ):
+        words += instruction
+    return struct.pack(f'<{len(words)}I', *words)
+
+def test_analyze():
+    assert _cost_report.analyze_dxil(_dxil_disassembly) == {
+        'instructions' : 6,
+        'texture_samples' : 1,
+        'values' : 4,
+        'cbuffer_loads' : 1
+    }
+    assert _cost_report.analyze_spirv(_build_spirv()) == {
+        'instructions' : 6,
+        'texture_samples' : 1,
+        'values' : 5,
+        'cbuffer_loads' : 1
+    }
+
+def test_report(tmp_path):
+    (tmp_path / 'a.spv').write_bytes(_build_spirv())
+    (tmp_path / 'b.spv').write_bytes(b'not SPIR-V')
+    (tmp_path / 'c.hlsl.spv').write_bytes(_build_spirv())
+    report = _cost_report.build(
+        tmp_path,
+        {
+            'a.spv' : ['a.spv', 'a.glsl'],
+            'b.spv' : ['b.spv'],
+            'c.cso' : ['c.hlsl.spv']
+        }
+    )
+    assert [row['output'] for row in report['shaders']] == [
+        'a.spv', 'c.hlsl.spv'
+    ]
+    assert report['shaders'][1]['format'] == 'spirv-validation'
+    assert report['totals']['spirv']['instructions'] == 6
+    assert report['totals']['spirv-validation']['instructions'] == 6
+    assert report['failed'] == ['b.spv']
+
+    report_path = tmp_path / 'report.csv'
+    _cost_report.write(report_path, report)
+    with open(report_path, newline = '') as report_file:
+        rows = list(csv.DictReader(report_file))
+    assert [row['shader'] for row in rows] == [
+        'a.spv', 'c.cso', 'total', 'total'
+    ]
+    assert rows[2]['format'] == 'spirv'
+    assert rows[2]['texture_samples'] == '1'
@@ -0,0 +1,91 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ctypes, ctypes.util
+from pathlib import Path
+
+import pytest
+
+import _dxc_library
+
+def test_get_args():
+    assert _dxc_library.get_args(
+        src_path = Path('a') / 'b.hlsl',
+        profile = 'ps_6_2',
+        entry_point_name = 'main',
+        to_spirv = True,
+        o0 = True,
+        extra_args = ['-enable-16bit-types']
+    ) == [
+        str(Path('a') / 'b.hlsl'), '-T', 'ps_6_2', '-E', 'main',
+        '-spirv', '-O0', '-enable-16bit-types'
+    ]
+    assert _dxc_library.get_args(
+        src_path = 'b.hlsl', profile = 'vs_6_0', entry_point_name = 'main'
+    ) == ['b.hlsl', '-T', 'vs_6_0', '-E', 'main']
+
+def test_get_loaded_path():
+    # Any library on the search path would do
+    library_name = ctypes.util.find_library('c')
+    if library_name is None:
+        pytest.skip('The C runtime library is not found')
+
+    library_path = _dxc_library._get_loaded_path(
+        ctypes.CDLL(library_name), 'printf'
+    )
+    assert library_path.is_absolute()
+    assert library_path.is_file()
+
+@pytest.fixture
+def uncached_load():
+    _dxc_library.load.cache_clear()
+    yield _dxc_library.load
+    _dxc_library.load.cache_clear()
+
+def test_load_fallback(tmp_path, monkeypatch, uncached_load):
+    not_a_library_path = tmp_path / 'libdxcompiler.so'
+    not_a_library_path.write_bytes(b'not a shared library')
+    monkeypatch.setattr(
+        _dxc_library,
+        '_get_candidate_paths',
+        lambda: [tmp_path / 'missing' / 'libdxcompiler.so', not_a_library_path]
+    )
+    assert uncached_load() is None
+
+def test_compile(tmp_path, uncached_load):
+    dxc_library = uncached_load()
+    if dxc_library is None:
+        pytest.skip('The dxcompiler library is not found')
+
+    src_path = tmp_path / 'shader.hlsl'
+    src_path.write_text(
+        'float4 main() : SV_Target { return float4(1.0, 0.0, 0.0, 1.0); }\n'
+    )
+    output_path = tmp_path / 'shader.cso'
+    dxc_library.compile(
+        src_path = src_path,
+        profile = 'ps_6_0',
+        entry_point_name = 'main',
+        output_path = output_path
+    )
+    assert output_path.stat().st_size > 0
+
+    src_path.write_text('float4 main() : SV_Target { return undeclared; }\n')
+    with pytest.raises(_dxc_library.CompileError):
+        dxc_library.compile(
+            src_path = src_path,
+            profile = 'ps_6_0',
+            entry_point_name = 'main',
+            output_path = output_path
+        )
@@ -12,19 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os, sys
+import json, os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-tests_dir_path = Path(__file__).parent
-repo_root_dir_path = tests_dir_path.parent
-
-# Add these directories to PYTHONPATH
-src_dir_path = (repo_root_dir_path / 'src').resolve()
-metashade_dir_path = (repo_root_dir_path / 'metashade').resolve()
-sys.path += [str(src_dir_path), str(metashade_dir_path)]
+import pytest
 
 from metashade.util.tests import RefDiffer
 import generate
+from _impl.options import Options, pipeline_profiles
+
+repo_root_dir_path = Path(__file__).parent.parent
 
 class TestGenerate:
     @classmethod
@@ -57,3 +55,164 @@ class TestGenerate:
             serial = True,
             ref_differ = self._ref_differ
         )
+
+def test_invalid_alpha_cutoff_step(tmp_path):
+    with pytest.raises(ValueError):
+        generate.generate(
+            gltf_dir_path = tmp_path,
+            out_dir_path = tmp_path / 'out',
+            serial = True,
+            ref_differ = None,
+            options = Options(alpha_cutoff_step = 0.0)
+        )
+    assert not (tmp_path / 'out').exists()
+
+def _read_outputs(out_dir_path : Path) -> dict:
+    return {
+        path.name : path.read_bytes() for path in out_dir_path.iterdir()
+    }
+
+def _generate_with_stub_tools(
+    gltf_dir_path : Path,
+    out_dir_path : Path,
+    **kwargs
+) -> dict:
+    generate.generate(
+        gltf_dir_path = gltf_dir_path,
+        out_dir_path = out_dir_path,
+        ref_differ = None,
+        **kwargs
+    )
+    return _read_outputs(out_dir_path)
+
+@pytest.mark.parametrize('backend', ['process', 'asyncio'])
+def test_backend(tmp_path, stub_tools, gltf_dir_path, backend):
+    stub_tools()
+    serial_outputs = _generate_with_stub_tools(
+        gltf_dir_path, tmp_path / 'serial', serial = True
+    )
+    assert {'a.json', 'b.json'} <= serial_outputs.keys()
+
+    assert _generate_with_stub_tools(
+        gltf_dir_path, tmp_path / backend, serial = False, backend = backend
+    ) == serial_outputs
+
+def test_trace(tmp_path, stub_tools, gltf_dir_path):
+    stub_tools()
+    trace_path = tmp_path / 'trace.json'
+    _generate_with_stub_tools(
+        gltf_dir_path, tmp_path / 'out', serial = True, trace_path = trace_path
+    )
+    with open(trace_path) as trace_file:
+        trace_events = json.load(trace_file)['traceEvents']
+
+    # A serial run only has the main process
+    assert [
+        event['args']['name'] for event in trace_events if event['ph'] == 'M'
+    ] == ['Main']
+
+    span_events = [event for event in trace_events if event['ph'] == 'X']
+    assert {event['name'] for event in span_events} == {
+        'Parse, generate and compile', 'Load glTF asset', 'Generate',
+        'dxc DXIL', 'dxc SPIR-V', 'spirv-cross', 'glslang'
+    }
+
+    # All the stages are nested in the span of the whole run
+    run_event, = (
+        event for event in span_events
+        if event['name'] == 'Parse, generate and compile'
+    )
+    for event in span_events:
+        assert event['dur'] >= 0
+        assert run_event['ts'] <= event['ts']
+        assert event['ts'] + event['dur'] <= run_event['ts'] + run_event['dur']
+
+@pytest.mark.parametrize('profile_name', list(pipeline_profiles))
+def test_pipeline_profiles(tmp_path, stub_tools, gltf_dir_path, profile_name):
+    pipeline_profile = pipeline_profiles[profile_name]
+    # Only the compilers of the profile are installed
+    stub_tools(pipeline_profile.get_tool_names())
+    outputs = _generate_with_stub_tools(
+        gltf_dir_path,
+        tmp_path / 'out',
+        serial = True,
+        incremental = True,
+        options = Options(pipeline_profile = profile_name)
+    )
+
+    target_names = set()
+    if pipeline_profile.dx12:
+        target_names.add('dx')
+    if pipeline_profile.vulkan:
+        target_names.add('vk')
+    for index_file_name in ('a.json', 'b.json'):
+        for mesh_index in json.loads(outputs[index_file_name]):
+            for primitive_index in mesh_index:
+                assert primitive_index.keys() == target_names
+
+    output_names = outputs.keys()
+    assert any(
+        name.endswith('.cso') for name in output_names
+    ) == pipeline_profile.dx12
+    assert any(
+        name.endswith('.hlsl.spv') for name in output_names
+    ) == pipeline_profile.glsl_validation
+    assert ('GLTFPbrPass-frag.spv' in output_names) == pipeline_profile.vulkan
+
+def test_gltf_and_glb_indices(tmp_path, stub_tools, write_gltf):
+    gltf_dir_path = tmp_path / 'gltf'
+    write_gltf(gltf_dir_path / 'Foo.gltf')
+    write_gltf(
+        gltf_dir_path / 'Foo.glb',
+        material = {'pbrMetallicRoughness' : {'baseColorFactor' : [1] * 4}}
+    )
+
+    stub_tools()
+    outputs = _generate_with_stub_tools(
+        gltf_dir_path, tmp_path / 'out', serial = True
+    )
+    assert {'Foo.json', 'Foo.glb.json'} <= outputs.keys()
+    assert outputs['Foo.json'] != outputs['Foo.glb.json']
+
+class _ScheduledRun:
+    '''
+    Stands in for `generate._Run` with shader descriptions that are their
+    own predicted costs
+    '''
+    def __init__(self):
+        self.results = []
+
+    def predict_cost(self, shader_name, shader_desc) -> float:
+        return shader_desc
+
+    def handle_asset_result(self, asset_result):
+        return dict()
+
+    def handle_result(self, result):
+        self.results.append(result)
+
+def test_pool_schedules_longest_first():
+    costs = [3.0, 1.0, 4.0, 1.5, 9.0, 2.0, 6.0]
+    executed = []
+
+    def _generate_and_compile(shader_desc):
+        executed.append(shader_desc)
+        return shader_desc
+
+    run = _ScheduledRun()
+    with ThreadPoolExecutor(max_workers = 1) as executor:
+        generate._run_on_pool(
+            run = run,
+            executor = executor,
+            num_workers = 1,
+            gltf_paths = [],
+            shader_descs = {
+                f'shader{i}' : cost for i, cost in enumerate(costs)
+            },
+            process_asset = None,
+            generate_and_compile = _generate_and_compile
+        )
+
+    # A single worker runs the jobs in the order of their submission
+    assert executed == sorted(costs, reverse = True)
+    assert sorted(run.results) == sorted(costs)
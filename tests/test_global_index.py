@@ -0,0 +1,59 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import _global_index
+
+_shader_indices = {
+    'a.gltf' : [
+        [
+            {
+                'dx' : {'vs' : 'uv0-VS.cso', 'ps' : 'uv0-PS.cso'},
+                'vk' : {'frag' : 'frag.spv'}
+            },
+            {'vk' : {'frag' : 'frag.spv'}}
+        ],
+        []
+    ],
+    'b.glb' : [[{'dx' : {'vs' : 'uv0-VS.cso', 'ps' : 'uv1-PS.cso'}}]]
+}
+_pipeline_shader_index = {'light_culling' : {'dx' : {'cs' : 'culling-CS.cso'}}}
+
+def test_build():
+    assert _global_index.build(_shader_indices) == {
+        'shaders' : ['frag.spv', 'uv0-PS.cso', 'uv0-VS.cso', 'uv1-PS.cso'],
+        'slots' : ['dx.ps', 'dx.vs', 'vk.frag'],
+        'assets' : {
+            'a.gltf' : [[[1, 2, 0], [-1, -1, 0]], []],
+            'b.glb' : [[[3, 2, -1]]]
+        },
+        'pipeline' : {}
+    }
+
+    index = _global_index.build(_shader_indices, _pipeline_shader_index)
+    assert index['shaders'][0] == 'culling-CS.cso'
+    assert index['assets']['b.glb'] == [[[4, 3, -1]]]
+    assert index['pipeline'] == {'light_culling' : {'dx.cs' : 0}}
+
+def test_binary_matches_json(tmp_path):
+    index = _global_index.build(_shader_indices, _pipeline_shader_index)
+
+    json_path = tmp_path / 'index.json'
+    _global_index.write(json_path, index)
+    binary_path = tmp_path / 'index.bin'
+    _global_index.write(binary_path, index, binary = True)
+
+    assert _global_index.read_binary(binary_path) == index
+    assert json.loads(json_path.read_text()) == index
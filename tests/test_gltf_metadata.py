@@ -0,0 +1,159 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json, struct
+from pathlib import Path
+
+import pytest
+from pygltflib import GLTF2
+
+import _gltf_metadata
+
+_asset = {
+    'asset' : {'version' : '2.0'},
+    'buffers' : [{'uri' : 'missing.bin', 'byteLength' : 1024}],
+    'materials' : [
+        {
+            'name' : 'masked',
+            'pbrMetallicRoughness' : {
+                'baseColorTexture' : {'index' : 0},
+                'metallicRoughnessTexture' : {'index' : 1, 'texCoord' : 1},
+                'baseColorFactor' : [0.5, 0.5, 0.5, 1.0],
+                'roughnessFactor' : 0.25
+            },
+            'normalTexture' : {'index' : 2, 'scale' : 0.5},
+            'alphaMode' : 'MASK',
+            'alphaCutoff' : 0.25
+        },
+        {
+            'occlusionTexture' : {'index' : 0},
+            'emissiveTexture' : {'index' : 1, 'texCoord' : 1},
+            'emissiveFactor' : [1.0, 0.5, 0.0]
+        },
+        {
+            'pbrMetallicRoughness' : {'metallicFactor' : 0.0}
+        }
+    ],
+    'meshes' : [
+        {
+            'name' : 'mesh',
+            'primitives' : [
+                {
+                    'attributes' : {
+                        'POSITION' : 0, 'NORMAL' : 1, 'TANGENT' : 2,
+                        'TEXCOORD_0' : 3, 'TEXCOORD_1' : 4
+                    },
+                    'material' : 0
+                },
+                {
+                    'attributes' : {
+                        'POSITION' : 0, 'NORMAL' : 1, 'COLOR_0' : 5
+                    },
+                    'material' : 1
+                }
+            ]
+        }
+    ]
+}
+
+def _texture_info(texture_info):
+    if texture_info is None:
+        return None
+    # pygltflib leaves the UV set index of some texture types as None
+    return (texture_info.index, texture_info.texCoord or 0)
+
+def _material(material):
+    pbr = material.pbrMetallicRoughness
+    return (
+        material.name,
+        None if pbr is None else (
+            _texture_info(pbr.baseColorTexture),
+            _texture_info(pbr.metallicRoughnessTexture),
+            list(pbr.baseColorFactor),
+            pbr.metallicFactor,
+            pbr.roughnessFactor
+        ),
+        _texture_info(material.normalTexture),
+        _texture_info(material.occlusionTexture),
+        _texture_info(material.emissiveTexture),
+        list(material.emissiveFactor),
+        material.alphaMode,
+        material.alphaCutoff
+    )
+
+def _primitive(primitive):
+    return (
+        tuple(
+            getattr(primitive.attributes, attr_name)
+            for attr_name in _gltf_metadata.Attributes._fields
+        ),
+        primitive.material
+    )
+
+def _write_glb(glb_path : Path, asset : dict, bin_chunk : bytes):
+    json_chunk = json.dumps(asset).encode()
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    bin_chunk += b'\0' * (-len(bin_chunk) % 4)
+
+    chunks = (
+        struct.pack('<I4s', len(json_chunk), b'JSON') + json_chunk
+        + struct.pack('<I4s', len(bin_chunk), b'BIN\0') + bin_chunk
+    )
+    glb_path.write_bytes(
+        struct.pack('<4sII', b'glTF', 2, 12 + len(chunks)) + chunks
+    )
+
+def _assert_matches_pygltflib(gltf_path : Path):
+    reference = GLTF2().load(gltf_path)
+    metadata = _gltf_metadata.load(gltf_path)
+
+    assert (
+        [_material(material) for material in metadata.materials]
+        == [_material(material) for material in reference.materials]
+    )
+    assert (
+        [
+            [_primitive(primitive) for primitive in mesh.primitives]
+            for mesh in metadata.meshes
+        ] == [
+            [_primitive(primitive) for primitive in mesh.primitives]
+            for mesh in reference.meshes
+        ]
+    )
+
+def test_gltf_matches_pygltflib(tmp_path):
+    gltf_path = tmp_path / 'asset.gltf'
+    gltf_path.write_text(json.dumps(_asset))
+    _assert_matches_pygltflib(gltf_path)
+
+def test_glb_matches_pygltflib(tmp_path):
+    glb_path = tmp_path / 'asset.glb'
+    glb_asset = dict(_asset, buffers = [{'byteLength' : 1024}])
+    _write_glb(glb_path, glb_asset, bytes(1024))
+
+    _assert_matches_pygltflib(glb_path)
+    assert (
+        _gltf_metadata.read_json_bytes(glb_path).rstrip()
+        == json.dumps(glb_asset).encode()
+    )
+
+def test_truncated_glb(tmp_path):
+    glb_path = tmp_path / 'asset.glb'
+    _write_glb(glb_path, _asset, b'')
+    glb = glb_path.read_bytes()
+
+    for truncated in (b'', glb[:12], glb[:19], glb[:24]):
+        glb_path.write_bytes(truncated)
+        with pytest.raises(ValueError):
+            _gltf_metadata.read_json_bytes(glb_path)
@@ -0,0 +1,61 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib, queue, subprocess, sys
+
+from _job_log import JobLog, LogConfig
+
+def _get_batches(log_queue) -> list:
+    batches = []
+    while not log_queue.empty():
+        batches.append(log_queue.get())
+    return batches
+
+def test_batches():
+    log_queue = queue.Queue()
+    with JobLog('job', LogConfig(queue = log_queue)) as log:
+        for i in range(JobLog._max_batch_lines + 1):
+            print(i, file = log)
+        assert len(_get_batches(log_queue)) == 1
+
+        print('last', file = log)
+        log.flush()
+        assert [
+            [record.line for record in batch]
+            for batch in _get_batches(log_queue)
+        ] == [[str(JobLog._max_batch_lines), 'last']]
+
+def test_quiet_captures_subprocesses(capfd):
+    def _run(failed : bool) -> list:
+        log_queue = queue.Queue()
+        with JobLog('job', LogConfig(queue = log_queue, quiet = True)) as log, \
+            log.capture_subprocess_output(), \
+            contextlib.redirect_stdout(log):
+            #
+            print('before')
+            subprocess.run(
+                [sys.executable, '-c', 'print("compiler")'], check = True
+            )
+            print('after')
+            if failed:
+                log.mark_failed()
+
+        return [
+            record.line
+            for batch in _get_batches(log_queue) for record in batch
+        ]
+
+    assert _run(failed = False) == []
+    assert _run(failed = True) == ['before', 'compiler', 'after']
+    assert capfd.readouterr().out == ''
@@ -0,0 +1,40 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+from _impl.options import Options
+import _impl._lights as _lights
+
+def test_light_modes(generate_ps):
+    assert 'for (' not in generate_ps(Options(light_mode = 'single'))
+    assert 'applySpotLight(g_lights[iLight]' in generate_ps(
+        Options(light_mode = 'loop')
+    )
+
+    tiled_ps = generate_ps(Options(light_mode = 'tiled'))
+    assert 'StructuredBuffer<uint> g_tileLightLists' in tiled_ps
+    assert f'uint nTilesX = {_lights._num_tiles_x};' in tiled_ps
+    assert 'uint iLight = g_tileLightLists[' in tiled_ps
+    assert 'applySpotLight(g_lights[iLight]' in tiled_ps
+
+def test_light_culling_cs():
+    cs_file = io.StringIO()
+    _lights.generate_light_culling_cs(cs_file)
+    cs = cs_file.getvalue()
+    assert 'cbuffer cbPerFrame' in cs
+    assert f'[numthreads({_lights._num_culling_threads}, 1, 1)]' in cs
+    assert f'uint nTilesX = {_lights._num_tiles_x};' in cs
+    assert 'round(1.0 / g_fInvScreenResolution.x)' in _lights._num_tiles_x
+    assert '{' + 'tile_size}' not in cs
@@ -0,0 +1,182 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+
+import pytest
+
+import generate
+from _manifest import Manifest
+
+def _generate(gltf_dir_path : Path, out_dir_path : Path):
+    generate.generate(
+        gltf_dir_path = gltf_dir_path,
+        out_dir_path = out_dir_path,
+        serial = True,
+        ref_differ = None,
+        incremental = True
+    )
+
+def _get_mtimes(out_dir_path : Path) -> dict:
+    return {
+        path.name : path.stat().st_mtime_ns
+        for path in out_dir_path.iterdir()
+        if path.name != Manifest._file_name
+    }
+
+def _get_shader_outputs(
+    out_dir_path : Path,
+    index_file_name : str,
+    stage : str
+) -> set:
+    '''
+    The names of the files generated for a DX12 shader of a single-primitive
+    asset
+    '''
+    with open(out_dir_path / index_file_name) as shader_index_file:
+        shader_index = json.load(shader_index_file)
+    shader_stem = Path(shader_index[0][0]['dx'][stage]).stem
+    return {
+        path.name for path in out_dir_path.iterdir()
+        if path.name.startswith(shader_stem + '.')
+    }
+
+@pytest.fixture
+def out_dir_path(tmp_path, stub_tools, gltf_dir_path) -> Path:
+    '''
+    The outputs of an initial incremental run
+    '''
+    stub_tools()
+    out_dir_path = tmp_path / 'out'
+    _generate(gltf_dir_path, out_dir_path)
+    return out_dir_path
+
+def test_unchanged(gltf_dir_path, out_dir_path):
+    mtimes = _get_mtimes(out_dir_path)
+    assert mtimes
+
+    _generate(gltf_dir_path, out_dir_path)
+    assert _get_mtimes(out_dir_path) == mtimes
+
+def test_edited_asset(gltf_dir_path, out_dir_path, write_gltf):
+    mtimes = _get_mtimes(out_dir_path)
+    ps_outputs = _get_shader_outputs(out_dir_path, 'a.json', 'ps')
+    assert ps_outputs
+
+    write_gltf(
+        gltf_dir_path / 'a.gltf',
+        material = {
+            'pbrMetallicRoughness' : {'baseColorTexture' : {'index' : 0}},
+            'alphaMode' : 'MASK'
+        }
+    )
+    _generate(gltf_dir_path, out_dir_path)
+    new_mtimes = _get_mtimes(out_dir_path)
+
+    # Only the pixel shader of the edited asset is replaced
+    new_ps_outputs = _get_shader_outputs(out_dir_path, 'a.json', 'ps')
+    assert new_ps_outputs
+    assert new_ps_outputs.isdisjoint(mtimes)
+    assert ps_outputs.isdisjoint(new_mtimes)
+
+    # The other shaders, including the vertex shader of the edited asset,
+    # aren't recompiled
+    for name in mtimes.keys() - ps_outputs - {'a.json'}:
+        assert new_mtimes[name] == mtimes[name]
+
+def test_deleted_asset(gltf_dir_path, out_dir_path):
+    b_outputs = {'b.json'}
+    for stage in ('vs', 'ps'):
+        b_outputs |= _get_shader_outputs(out_dir_path, 'b.json', stage)
+    mtimes = _get_mtimes(out_dir_path)
+
+    (gltf_dir_path / 'b.gltf').unlink()
+    _generate(gltf_dir_path, out_dir_path)
+
+    # The outputs of the other asset, including the ones shared with the
+    # deleted one, are kept
+    assert _get_mtimes(out_dir_path) == {
+        name : mtime for name, mtime in mtimes.items()
+        if name not in b_outputs
+    }
+
+@pytest.mark.parametrize('manifest_text', [None, '{"generator_hash"', '[]'])
+def test_invalid_manifest(gltf_dir_path, out_dir_path, manifest_text):
+    mtimes = _get_mtimes(out_dir_path)
+
+    manifest_path = out_dir_path / Manifest._file_name
+    if manifest_text is None:
+        manifest_path.unlink()
+    else:
+        manifest_path.write_text(manifest_text)
+
+    # Falls back to a full build
+    _generate(gltf_dir_path, out_dir_path)
+    new_mtimes = _get_mtimes(out_dir_path)
+    assert new_mtimes.keys() == mtimes.keys()
+    for name, mtime in mtimes.items():
+        assert new_mtimes[name] != mtime
+
+    assert Manifest.load(out_dir_path).get_shader_usage_by_asset().keys() == {
+        'a.gltf', 'b.gltf'
+    }
+
+def test_watch_poll(gltf_dir_path, out_dir_path, write_gltf, monkeypatch):
+    num_runs = 0
+    generate_func = generate.generate
+
+    def _counting_generate(**kwargs):
+        nonlocal num_runs
+        num_runs += 1
+        generate_func(**kwargs)
+
+    monkeypatch.setattr(generate, 'generate', _counting_generate)
+    watcher = generate._Watcher(
+        gltf_dir_path,
+        out_dir_path = out_dir_path,
+        serial = True,
+        ref_differ = None
+    )
+
+    # The watch starts with a run, which finds the outputs up to date
+    mtimes = _get_mtimes(out_dir_path)
+    assert watcher.poll()
+    assert num_runs == 1
+    assert _get_mtimes(out_dir_path) == mtimes
+
+    # Nothing to do while the assets are unchanged
+    assert watcher.poll()
+    assert num_runs == 1
+
+    ps_outputs = _get_shader_outputs(out_dir_path, 'a.json', 'ps')
+    write_gltf(
+        gltf_dir_path / 'a.gltf',
+        material = {
+            'pbrMetallicRoughness' : {'baseColorTexture' : {'index' : 0}},
+            'alphaMode' : 'MASK'
+        }
+    )
+
+    # The edit is only processed once it has settled for a poll
+    assert watcher.poll()
+    assert num_runs == 1
+    assert watcher.poll()
+    assert num_runs == 2
+
+    # Incrementally, only replacing the pixel shader of the edited asset
+    new_mtimes = _get_mtimes(out_dir_path)
+    assert ps_outputs.isdisjoint(new_mtimes)
+    for name in mtimes.keys() - ps_outputs - {'a.json'}:
+        assert new_mtimes[name] == mtimes[name]
@@ -0,0 +1,135 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+from _permutations import PermutationRegistry, get_report
+from _shader_base import Shader
+import _hlsl, _glsl
+from _impl.options import Options
+from _impl.vertex_data import VertexData
+import _gltf_metadata
+import _impl.ps as impl_ps
+
+def test_registry_dedups_permutations(tmp_path):
+    registry = PermutationRegistry(tmp_path, Options())
+    desc = VertexData.Desc(has_tangent = False, passthru_attrs = ('uv0',))
+
+    names = [
+        registry.register(Shader.Desc(_hlsl.VertexShader, desc))
+        for _ in range(3)
+    ]
+    other_name = registry.register(
+        Shader.Desc(_hlsl.VertexShader, desc._replace(has_tangent = True))
+    )
+
+    assert len(set(names)) == 1
+    assert other_name != names[0]
+    assert registry.get_usage() == {names[0] : 3, other_name : 1}
+    assert set(registry.get_shader_dict()) == {names[0], other_name}
+
+def test_desc_pickling(tmp_path, describe_ps):
+    options = Options()
+    for shader_desc in (
+        Shader.Desc(
+            _hlsl.VertexShader,
+            VertexData.Desc(
+                has_tangent = True, passthru_attrs = ('uv0', 'rgbaColor0')
+            )
+        ),
+        Shader.Desc(_hlsl.PixelShader, describe_ps(options)),
+        Shader.Desc(_glsl.FragmentShader, None)
+    ):
+        unpickled_desc = pickle.loads(pickle.dumps(shader_desc))
+        assert unpickled_desc == shader_desc
+
+        shader = shader_desc.create(tmp_path / 'a', options)
+        unpickled_shader = unpickled_desc.create(tmp_path / 'b', options)
+        assert unpickled_shader.get_index_name() == shader.get_index_name()
+        assert [path.name for path in unpickled_shader.get_output_paths()] \
+            == [path.name for path in shader.get_output_paths()]
+
+        # The recreated shader generates the same source
+        src_texts = []
+        for shader in (shader, unpickled_shader):
+            shader._src_path.parent.mkdir(exist_ok = True)
+            shader._generate(ref_differ = None)
+            src_texts.append(shader._src_path.read_text())
+        assert src_texts[0] == src_texts[1]
+
+def test_alpha_cutoff_permutations():
+    vertex_data_desc = VertexData.Desc(
+        has_tangent = False, passthru_attrs = ('uv0',)
+    )
+
+    def _get_ps_ids(options : Options):
+        return {
+            impl_ps.ps(
+                impl_ps.ps.describe(
+                    _gltf_metadata.Material(
+                        alphaMode = 'MASK', alphaCutoff = alpha_cutoff
+                    ),
+                    vertex_data_desc,
+                    options
+                ),
+                options
+            ).get_id()
+            for alpha_cutoff in (0.5, 0.49, 0.3333, None)
+        }
+
+    assert len(_get_ps_ids(Options())) == 3
+    assert len(_get_ps_ids(Options(alpha_cutoff_step = 0.25))) == 2
+    assert _get_ps_ids(Options(alpha_cutoff_mode = 'uniform')) == {
+        'GltfPbr-uv0-MASK-PS'
+    }
+
+def test_identity_factor_permutations():
+    vertex_data_desc = VertexData.Desc(
+        has_tangent = False, passthru_attrs = ('uv0',)
+    )
+    materials = (
+        _gltf_metadata.Material(),
+        _gltf_metadata.Material(
+            pbrMetallicRoughness = _gltf_metadata.PbrMetallicRoughness(
+                baseColorFactor = [0.5, 0.5, 0.5, 1.0], metallicFactor = 0.0
+            ),
+            emissiveFactor = [1.0, 1.0, 1.0]
+        )
+    )
+
+    def _get_ps_ids(options : Options):
+        return [
+            impl_ps.ps(
+                impl_ps.ps.describe(material, vertex_data_desc, options),
+                options
+            ).get_id()
+            for material in materials
+        ]
+
+    assert _get_ps_ids(Options()) == ['GltfPbr-uv0-PS'] * 2
+    assert _get_ps_ids(Options(bake_identity_factors = True)) == [
+        'GltfPbr-uv0-Ibc_m_r_e-PS', 'GltfPbr-uv0-Ir-PS'
+    ]
+
+def test_report_aggregates_assets():
+    report = get_report({
+        'a.gltf' : {'common' : 2, 'rare' : 1},
+        'b.gltf' : {'common' : 3}
+    })
+
+    assert report['permutations'] == [
+        {'name' : 'common', 'primitives' : 5, 'assets' : ['a.gltf', 'b.gltf']},
+        {'name' : 'rare', 'primitives' : 1, 'assets' : ['a.gltf']}
+    ]
+    assert report['outliers'] == ['rare']
@@ -0,0 +1,37 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import _hlsl
+from _impl.options import Options
+
+def test_color_precision(tmp_path, describe_ps, generate_ps):
+    for color_precision, type_name, profile in (
+        ('min16float', 'min16float3', 'ps_6_0'),
+        ('float16', 'float16_t3', 'ps_6_2')
+    ):
+        options = Options(color_precision = color_precision)
+        ps = generate_ps(options)
+
+        assert f'{type_name} pbrBrdf(float3 L' in ps
+        assert f'{type_name} applySpotLight(' in ps
+        # The uniforms keep the full precision
+        assert '\tfloat3 rgbColor;' in ps
+        assert f'{type_name} rgbColor;' not in ps
+
+        shader = _hlsl.PixelShader(tmp_path, describe_ps(options), options)
+        assert shader._get_hlsl_profile() == profile
+
+    shader = _hlsl.PixelShader(tmp_path, describe_ps(), Options())
+    assert shader._get_hlsl_profile() == 'ps_6_0'
+    assert shader._get_dxc_extra_args() == []
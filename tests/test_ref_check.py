@@ -0,0 +1,81 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json, os, pickle
+
+from _ref_check import RefChecker, check_all
+
+def _write_dirs(tmp_path):
+    ref_dir = tmp_path / 'ref'
+    out_dir = tmp_path / 'out'
+    ref_dir.mkdir()
+    out_dir.mkdir()
+
+    for name, text in (('same.hlsl', 'a\nb\n'), ('changed.hlsl', 'a\nb\n')):
+        (ref_dir / name).write_text(text)
+    (out_dir / 'same.hlsl').write_text('a\nb\n')
+    (out_dir / 'changed.hlsl').write_text('a\nc\n')
+    (out_dir / 'new.hlsl').write_text('a\n')
+    return ref_dir, out_dir
+
+def test_check_all(tmp_path):
+    ref_dir, out_dir = _write_dirs(tmp_path)
+    index_path = tmp_path / 'index.json'
+
+    ref_checker = RefChecker(ref_dir, index_path)
+    ref_checker.update_index()
+    assert set(json.loads(index_path.read_text())) == {
+        'same.hlsl', 'changed.hlsl'
+    }
+
+    # As in a worker process, which loads the saved index
+    ref_checker = pickle.loads(pickle.dumps(ref_checker))
+    errors = check_all(
+        ref_checker,
+        [out_dir / name for name in ('same.hlsl', 'changed.hlsl', 'new.hlsl')]
+    )
+
+    assert len(errors) == 2
+    assert '-b\n+c' in errors[0]
+    assert errors[1].startswith('No reference')
+
+def test_stale_index(tmp_path):
+    ref_dir, out_dir = _write_dirs(tmp_path)
+    index_path = tmp_path / 'index.json'
+    RefChecker(ref_dir, index_path).update_index()
+
+    # The reference is updated to match after the index has been saved, with
+    # the same size but a different modification time
+    (ref_dir / 'changed.hlsl').write_text('a\nc\n')
+    os.utime(ref_dir / 'changed.hlsl', ns = (0, 0))
+
+    assert check_all(
+        RefChecker(ref_dir, index_path), [out_dir / 'changed.hlsl']
+    ) == []
+
+def test_check_all_without_index(tmp_path):
+    ref_dir, out_dir = _write_dirs(tmp_path)
+    ref_checker = RefChecker(ref_dir)
+    ref_checker.update_index()
+
+    errors = check_all(
+        ref_checker,
+        [out_dir / name for name in ('same.hlsl', 'changed.hlsl', 'new.hlsl')]
+    )
+    assert len(errors) == 2
+    assert '-b\n+c' in errors[0]
+    assert errors[1].startswith('No reference')
+
+    # The references are compared byte for byte rather than hashed
+    assert ref_checker._get_index() == dict()
@@ -0,0 +1,41 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from _impl.options import Options
+
+def _get_pcf_shadow(ps : str) -> str:
+    start = ps.index('float getPcfShadow(')
+    return ps[start : ps.index('\n}', start)]
+
+def test_shadow_filters(generate_ps):
+    for shadow_filter, num_samples in {
+        'pcf1x1' : 1, 'pcf3x3' : 9, 'pcf5x5' : 25, 'poisson' : 8
+    }.items():
+        pcf_shadow = _get_pcf_shadow(
+            generate_ps(Options(shadow_filter = shadow_filter))
+        )
+        assert pcf_shadow.count('.SampleCmpLevelZero(') == num_samples
+        assert 'GatherCmp' not in pcf_shadow
+
+    gather_shadow = _get_pcf_shadow(
+        generate_ps(Options(shadow_filter = 'gather'))
+    )
+    assert gather_shadow.count('.GatherCmp(') == 4
+    assert 'SampleCmp' not in gather_shadow
+
+    poisson_shadow = _get_pcf_shadow(
+        generate_ps(Options(shadow_filter = 'poisson'))
+    )
+    assert '.GetDimensions(f2ShadowMapSize.x, f2ShadowMapSize.y)' \
+        in poisson_shadow
@@ -0,0 +1,36 @@
+# Copyright 2026 Pavlo Penenko
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+from _impl.options import Options
+import _impl.shared_include as shared_include
+
+def test_shared_include(generate_ps):
+    include_file = io.StringIO()
+    shared_include.generate(include_file, for_ps = True)
+    include = include_file.getvalue()
+    assert 'float D_Ggx(' in include
+    assert 'struct PbrParams' in include
+
+    inlined_ps = generate_ps()
+    assert '#include' not in inlined_ps
+    assert 'float D_Ggx(' in inlined_ps
+
+    ps = generate_ps(Options(shared_include = True))
+    assert f'#include "{shared_include.get_file_name(for_ps = True)}"' in ps
+    # The included symbols are still used, but not defined again
+    assert 'float D_Ggx(' not in ps
+    assert 'struct PbrParams' not in ps
+    assert 'pbrBrdf(' in ps